@@ -1,14 +1,23 @@
 import streamlit as st
-from streamlit_oauth import OAuth2Component
-from groq import Groq
+from firebase_setup import firebase_status, get_db, start_firebase_warmup
+from theme_assets import inject_theme
+from prewarm import start_import_prewarm
+from session_cookie import forget_session_user, remember_session_user, restore_session_user
+from streaming import stream_reply
+from context_window import build_context_messages
+from summaries import latest_summary, schedule_summary_update
+import chat_store
+from user_store import ensure_user, get_known_users
+from generation import get_generation_worker
+from metrics import get_metrics, metrics_for, start_metrics_server
+from transcript import render_transcript
 import json
 import re
 from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
 import hashlib
-import os
-import requests
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # Page configuration
 st.set_page_config(
@@ -18,908 +27,27 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize Firebase (only once) - FIXED
-if not firebase_admin._apps:
-    try:
-        # Try to get credentials from secrets first
-        if "firebase_credentials" in st.secrets:
-            cred_dict = {
-                "type": st.secrets["firebase_credentials"]["type"],
-                "project_id": st.secrets["firebase_credentials"]["project_id"],
-                "private_key_id": st.secrets["firebase_credentials"]["private_key_id"],
-                "private_key": st.secrets["firebase_credentials"]["private_key"].replace('\\n', '\n'),
-                "client_email": st.secrets["firebase_credentials"]["client_email"],
-                "client_id": st.secrets["firebase_credentials"]["client_id"],
-                "auth_uri": st.secrets["firebase_credentials"]["auth_uri"],
-                "token_uri": st.secrets["firebase_credentials"]["token_uri"],
-                "auth_provider_x509_cert_url": st.secrets["firebase_credentials"]["auth_provider_x509_cert_url"],
-                "client_x509_cert_url": st.secrets["firebase_credentials"]["client_x509_cert_url"],
-            }
-            if "universe_domain" in st.secrets["firebase_credentials"]:
-                cred_dict["universe_domain"] = st.secrets["firebase_credentials"]["universe_domain"]
-            cred = credentials.Certificate(cred_dict)
-            firebase_admin.initialize_app(cred)
-            db = firestore.client()
-        elif os.path.exists("firebase-credentials.json"):
-            cred = credentials.Certificate("firebase-credentials.json")
-            firebase_admin.initialize_app(cred)
-            db = firestore.client()
-        else:
-            # If no credentials available, allow app to run without Firebase (for demo)
-            st.warning("⚠️ Firebase credentials not found. Some features may be limited.")
-            db = None
-    except Exception as e:
-        st.warning(f"⚠️ Firebase initialization issue: {str(e)}. App will continue with limited features.")
-        db = None
-else:
-    try:
-        db = firestore.client()
-    except:
-        db = None
+# Firebase is set up on first use, shared by all sessions, and warmed up
+# in the background so the auth screen doesn't wait for it
+if st.secrets.get("firebase_warmup", True):
+    start_firebase_warmup()
+
+# Groq, Firestore and OAuth are imported where they're first used; load
+# them in the background while the auth screen is up
+start_import_prewarm()
+
+# Per-stage timings and Firestore/token counts, labelled with this app
+metrics = metrics_for("app_auraglow")
+run_started = time.perf_counter()
+if st.secrets.get("metrics_port"):
+    start_metrics_server(int(st.secrets["metrics_port"]))
 
 # ==========================================
 # AURAGLOW DESIGN SYSTEM
 # Minimalist, Clean, Luxurious Skincare Brand
 # ==========================================
 
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Playfair+Display:wght@400;500;600;700&display=swap');
-    
-    /* === AURAGLOW COLOR PALETTE === */
-    :root {
-        --primary-bg: #FAFAF8;
-        --secondary-bg: #FFFFFF;
-        --accent-gold: #D4AF37;
-        --accent-rose: #E8D5C4;
-        --accent-sage: #9CAF88;
-        --text-primary: #2C2C2C;
-        --text-secondary: #6B6B6B;
-        --text-muted: #9B9B9B;
-        --border-light: #E8E8E6;
-        --border-medium: #D4D4D2;
-        --shadow-sm: 0 1px 3px rgba(0, 0, 0, 0.05);
-        --shadow-md: 0 4px 12px rgba(0, 0, 0, 0.08);
-        --shadow-lg: 0 8px 24px rgba(0, 0, 0, 0.12);
-        --gradient-primary: linear-gradient(135deg, #D4AF37 0%, #E8D5C4 100%);
-        --gradient-subtle: linear-gradient(180deg, #FAFAF8 0%, #FFFFFF 100%);
-    }
-    
-    /* === DARK MODE SUPPORT (Optional) === */
-    @media (prefers-color-scheme: dark) {
-        :root {
-            --primary-bg: #1A1A1A;
-            --secondary-bg: #242424;
-            --text-primary: #F5F5F5;
-            --text-secondary: #B0B0B0;
-            --text-muted: #808080;
-            --border-light: #3A3A3A;
-            --border-medium: #4A4A4A;
-        }
-    }
-    
-    /* === BASE STYLES === */
-    * {
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-        box-sizing: border-box;
-    }
-    
-    /* Hide Streamlit default elements */
-    #MainMenu, footer, header {visibility: hidden !important;}
-    .stDeployButton {display: none !important;}
-    [data-testid="stToolbar"] {display: none !important;}
-    
-    /* === MAIN APP BACKGROUND === */
-    .stApp {
-        background: var(--primary-bg) !important;
-        color: var(--text-primary) !important;
-    }
-    
-    .block-container {
-        padding: 0 !important;
-        max-width: 100% !important;
-    }
-    
-    /* === SIDEBAR STYLING (Desktop) === */
-    [data-testid="stSidebar"] {
-        background: var(--secondary-bg) !important;
-        border-right: 1px solid var(--border-light) !important;
-        padding: 0 !important;
-        min-width: 280px !important;
-        max-width: 280px !important;
-        box-shadow: var(--shadow-sm);
-    }
-    
-    [data-testid="stSidebar"] > div:first-child {
-        background: transparent !important;
-        padding: 1.5rem 1rem !important;
-    }
-    
-    /* === AURAGLOW LOGO === */
-    .auraglow-logo {
-        text-align: center;
-        padding: 2rem 1rem 1.5rem;
-        margin-bottom: 1.5rem;
-        border-bottom: 1px solid var(--border-light);
-    }
-    
-    .auraglow-logo-icon {
-        font-size: 2.5rem;
-        margin-bottom: 0.75rem;
-        display: block;
-    }
-    
-    .auraglow-logo-text {
-        font-family: 'Playfair Display', serif;
-        font-size: 1.75rem;
-        font-weight: 600;
-        color: var(--text-primary);
-        letter-spacing: -0.02em;
-        margin: 0;
-        background: var(--gradient-primary);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-    
-    .auraglow-logo-tagline {
-        font-size: 0.75rem;
-        color: var(--text-muted);
-        text-transform: uppercase;
-        letter-spacing: 0.1em;
-        margin-top: 0.5rem;
-    }
-    
-    /* === USER PROFILE SECTION === */
-    .user-profile {
-        padding: 1rem;
-        margin: 0.5rem 0;
-        background: var(--primary-bg);
-        border: 1px solid var(--border-light);
-        border-radius: 12px;
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-        transition: all 0.2s ease;
-    }
-    
-    .user-profile:hover {
-        background: var(--secondary-bg);
-        box-shadow: var(--shadow-sm);
-    }
-    
-    .user-avatar {
-        width: 40px;
-        height: 40px;
-        border-radius: 50%;
-        object-fit: cover;
-        flex-shrink: 0;
-        border: 2px solid var(--border-light);
-    }
-    
-    .user-info {
-        flex: 1;
-        min-width: 0;
-        overflow: hidden;
-    }
-    
-    .user-name {
-        font-size: 0.875rem;
-        font-weight: 600;
-        color: var(--text-primary);
-        margin: 0;
-        white-space: nowrap;
-        overflow: hidden;
-        text-overflow: ellipsis;
-    }
-    
-    .user-email {
-        font-size: 0.75rem;
-        color: var(--text-secondary);
-        margin: 0;
-        white-space: nowrap;
-        overflow: hidden;
-        text-overflow: ellipsis;
-    }
-    
-    /* === SIDEBAR BUTTONS === */
-    [data-testid="stSidebar"] .stButton button {
-        background: var(--secondary-bg) !important;
-        color: var(--text-primary) !important;
-        border: 1px solid var(--border-light) !important;
-        border-radius: 10px !important;
-        padding: 0.75rem 1rem !important;
-        font-size: 0.875rem !important;
-        font-weight: 500 !important;
-        transition: all 0.2s ease !important;
-        text-align: left !important;
-        width: 100% !important;
-        min-height: 44px !important;
-        margin: 0.25rem 0 !important;
-        box-shadow: none !important;
-    }
-    
-    [data-testid="stSidebar"] .stButton button:hover {
-        background: var(--primary-bg) !important;
-        border-color: var(--accent-gold) !important;
-        box-shadow: var(--shadow-sm) !important;
-    }
-    
-    /* New Chat Button - Primary Style */
-    [data-testid="stSidebar"] .stButton:first-of-type button {
-        background: var(--gradient-primary) !important;
-        color: white !important;
-        border: none !important;
-        font-weight: 600 !important;
-    }
-    
-    [data-testid="stSidebar"] .stButton:first-of-type button:hover {
-        opacity: 0.9;
-        transform: translateY(-1px);
-        box-shadow: var(--shadow-md) !important;
-    }
-    
-    /* Chat History Items */
-    [data-testid="stSidebar"] h3 {
-        font-size: 0.75rem !important;
-        font-weight: 600 !important;
-        color: var(--text-muted) !important;
-        text-transform: uppercase !important;
-        letter-spacing: 0.05em !important;
-        margin: 1.5rem 0.75rem 0.5rem 0.75rem !important;
-        padding: 0 !important;
-    }
-    
-    [data-testid="stSidebar"] hr {
-        border-color: var(--border-light) !important;
-        margin: 0.75rem 0.5rem !important;
-    }
-    
-    /* Sign Out Button */
-    [data-testid="stSidebar"] .stButton:last-of-type button {
-        color: #DC2626 !important;
-        border-color: rgba(220, 38, 38, 0.2) !important;
-    }
-    
-    [data-testid="stSidebar"] .stButton:last-of-type button:hover {
-        background: rgba(220, 38, 38, 0.05) !important;
-        border-color: rgba(220, 38, 38, 0.4) !important;
-    }
-    
-    /* === MAIN CHAT INTERFACE === */
-    .main-chat-container {
-        display: flex;
-        flex-direction: column;
-        height: 100vh;
-        max-width: 1200px;
-        margin: 0 auto;
-        background: var(--primary-bg);
-    }
-    
-    /* === HEADER (Desktop) === */
-    .chat-header {
-        background: var(--secondary-bg);
-        border-bottom: 1px solid var(--border-light);
-        padding: 1rem 2rem;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-        position: sticky;
-        top: 0;
-        z-index: 100;
-        box-shadow: var(--shadow-sm);
-    }
-    
-    .header-left {
-        display: flex;
-        align-items: center;
-        gap: 1rem;
-    }
-    
-    .header-logo {
-        font-family: 'Playfair Display', serif;
-        font-size: 1.5rem;
-        font-weight: 600;
-        background: var(--gradient-primary);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-    
-    .header-actions {
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-    
-    .header-btn {
-        width: 36px;
-        height: 36px;
-        border-radius: 8px;
-        border: 1px solid var(--border-light);
-        background: var(--secondary-bg);
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        cursor: pointer;
-        transition: all 0.2s ease;
-    }
-    
-    .header-btn:hover {
-        background: var(--primary-bg);
-        border-color: var(--accent-gold);
-    }
-    
-    /* === CONVERSATION PANE === */
-    .conversation-pane {
-        flex: 1;
-        overflow-y: auto;
-        padding: 2rem 2rem;
-        scroll-behavior: smooth;
-    }
-    
-    /* Chat Messages */
-    [data-testid="stChatMessage"] {
-        background: transparent !important;
-        padding: 1rem 0 !important;
-        margin: 0 !important;
-        animation: fadeInUp 0.3s ease-out;
-    }
-    
-    @keyframes fadeInUp {
-        from {
-            opacity: 0;
-            transform: translateY(10px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    /* User Messages - Right Aligned */
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarUser"]) {
-        display: flex;
-        justify-content: flex-end;
-    }
-    
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarUser"]) [data-testid="stChatMessageContent"] {
-        background: var(--gradient-primary) !important;
-        color: white !important;
-        border-radius: 18px 18px 4px 18px !important;
-        padding: 1rem 1.25rem !important;
-        max-width: 70% !important;
-        box-shadow: var(--shadow-md);
-        border: none !important;
-    }
-    
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarUser"]) p {
-        color: white !important;
-        margin: 0 !important;
-        font-size: 0.9375rem !important;
-        line-height: 1.6 !important;
-    }
-    
-    /* Assistant Messages - Left Aligned */
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarAssistant"]) [data-testid="stChatMessageContent"] {
-        background: var(--secondary-bg) !important;
-        border: 1px solid var(--border-light) !important;
-        border-radius: 18px 18px 18px 4px !important;
-        padding: 1rem 1.25rem !important;
-        max-width: 70% !important;
-        box-shadow: var(--shadow-sm);
-    }
-    
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarAssistant"]) p {
-        color: var(--text-primary) !important;
-        margin: 0 !important;
-        font-size: 0.9375rem !important;
-        line-height: 1.7 !important;
-    }
-    
-    /* Avatar Styling */
-    [data-testid="stChatMessageAvatarUser"] {
-        width: 32px !important;
-        height: 32px !important;
-        border-radius: 50% !important;
-        background: var(--accent-sage) !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-        font-size: 1rem !important;
-        box-shadow: var(--shadow-sm);
-    }
-    
-    [data-testid="stChatMessageAvatarAssistant"] {
-        width: 32px !important;
-        height: 32px !important;
-        border-radius: 50% !important;
-        background: var(--accent-rose) !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-        font-size: 1rem !important;
-        box-shadow: var(--shadow-sm);
-    }
-    
-    /* === MESSAGE COMPOSER === */
-    .message-composer {
-        background: var(--secondary-bg);
-        border-top: 1px solid var(--border-light);
-        padding: 1.5rem 2rem;
-        position: sticky;
-        bottom: 0;
-        z-index: 100;
-        box-shadow: 0 -2px 8px rgba(0, 0, 0, 0.04);
-    }
-    
-    [data-testid="stChatInputContainer"] {
-        background: transparent !important;
-        border: none !important;
-        padding: 0 !important;
-        margin: 0 !important;
-    }
-    
-    .stChatInput {
-        max-width: 100% !important;
-        margin: 0 !important;
-    }
-    
-    .stChatInput textarea {
-        background: var(--primary-bg) !important;
-        border: 1.5px solid var(--border-light) !important;
-        border-radius: 24px !important;
-        padding: 0.875rem 3.5rem 0.875rem 1.25rem !important;
-        font-size: 0.9375rem !important;
-        color: var(--text-primary) !important;
-        min-height: 52px !important;
-        max-height: 200px !important;
-        resize: none !important;
-        box-shadow: var(--shadow-sm) !important;
-        transition: all 0.2s ease !important;
-    }
-    
-    .stChatInput textarea:focus {
-        border-color: var(--accent-gold) !important;
-        outline: none !important;
-        box-shadow: 0 0 0 3px rgba(212, 175, 55, 0.1) !important;
-    }
-    
-    .stChatInput textarea::placeholder {
-        color: var(--text-muted) !important;
-    }
-    
-    /* Send Button */
-    .stChatInput button {
-        background: var(--gradient-primary) !important;
-        border: none !important;
-        color: white !important;
-        position: absolute !important;
-        right: 0.5rem !important;
-        bottom: 0.5rem !important;
-        width: 40px !important;
-        height: 40px !important;
-        border-radius: 50% !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-        box-shadow: var(--shadow-sm) !important;
-        transition: all 0.2s ease !important;
-    }
-    
-    .stChatInput button:hover {
-        transform: scale(1.05);
-        box-shadow: var(--shadow-md) !important;
-    }
-    
-    /* Quick Action Buttons */
-    .quick-actions {
-        display: flex;
-        gap: 0.5rem;
-        margin-top: 0.75rem;
-        flex-wrap: wrap;
-    }
-    
-    .quick-action-btn {
-        padding: 0.5rem 1rem;
-        background: var(--primary-bg);
-        border: 1px solid var(--border-light);
-        border-radius: 20px;
-        font-size: 0.8125rem;
-        color: var(--text-secondary);
-        cursor: pointer;
-        transition: all 0.2s ease;
-        white-space: nowrap;
-    }
-    
-    .quick-action-btn:hover {
-        background: var(--secondary-bg);
-        border-color: var(--accent-gold);
-        color: var(--text-primary);
-    }
-    
-    /* === WELCOME SCREEN === */
-    .welcome-screen {
-        max-width: 800px;
-        margin: 0 auto;
-        padding: 4rem 2rem;
-        text-align: center;
-    }
-    
-    .welcome-icon {
-        font-size: 4rem;
-        margin-bottom: 1.5rem;
-        display: block;
-    }
-    
-    .welcome-title {
-        font-family: 'Playfair Display', serif;
-        font-size: 2.5rem;
-        font-weight: 600;
-        color: var(--text-primary);
-        margin-bottom: 1rem;
-        letter-spacing: -0.02em;
-    }
-    
-    .welcome-subtitle {
-        font-size: 1.125rem;
-        color: var(--text-secondary);
-        line-height: 1.6;
-        margin-bottom: 2rem;
-    }
-    
-    .suggestion-cards {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-        gap: 1rem;
-        margin-top: 2rem;
-    }
-    
-    .suggestion-card {
-        background: var(--secondary-bg);
-        border: 1px solid var(--border-light);
-        border-radius: 16px;
-        padding: 1.5rem;
-        cursor: pointer;
-        transition: all 0.2s ease;
-        text-align: left;
-    }
-    
-    .suggestion-card:hover {
-        transform: translateY(-2px);
-        box-shadow: var(--shadow-md);
-        border-color: var(--accent-gold);
-    }
-    
-    .suggestion-card-icon {
-        font-size: 2rem;
-        margin-bottom: 0.75rem;
-        display: block;
-    }
-    
-    .suggestion-card-title {
-        font-size: 1rem;
-        font-weight: 600;
-        color: var(--text-primary);
-        margin-bottom: 0.5rem;
-    }
-    
-    .suggestion-card-desc {
-        font-size: 0.875rem;
-        color: var(--text-secondary);
-        line-height: 1.5;
-    }
-    
-    /* === AUTHENTICATION SCREEN === */
-    .auth-container {
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-        min-height: 100vh !important;
-        width: 100vw !important;
-        padding: 2rem !important;
-        background: var(--gradient-subtle) !important;
-        position: fixed !important;
-        top: 0 !important;
-        left: 0 !important;
-        z-index: 10000 !important;
-        overflow-y: auto !important;
-    }
-    
-    .auth-card {
-        max-width: 480px;
-        width: 100%;
-        text-align: center;
-        background: var(--secondary-bg);
-        padding: 3rem 2.5rem;
-        border-radius: 24px;
-        border: 1px solid var(--border-light);
-        box-shadow: var(--shadow-lg);
-        margin: auto;
-    }
-    
-    .auth-logo {
-        font-family: 'Playfair Display', serif;
-        font-size: 2.5rem;
-        font-weight: 600;
-        background: var(--gradient-primary);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        margin-bottom: 0.5rem;
-    }
-    
-    .auth-icon {
-        font-size: 3.5rem;
-        margin-bottom: 1rem;
-    }
-    
-    .auth-title {
-        font-size: 1.75rem;
-        font-weight: 600;
-        color: var(--text-primary);
-        margin-bottom: 0.5rem;
-    }
-    
-    .auth-subtitle {
-        font-size: 0.9375rem;
-        color: var(--text-secondary);
-        margin-bottom: 2rem;
-        line-height: 1.6;
-    }
-    
-    /* Auth Form Inputs */
-    .stTextInput > div > div > input,
-    .stTextInput > div > div > input:focus {
-        background: var(--primary-bg) !important;
-        border: 1.5px solid var(--border-light) !important;
-        border-radius: 12px !important;
-        padding: 0.875rem 1rem !important;
-        color: var(--text-primary) !important;
-        font-size: 0.9375rem !important;
-        transition: all 0.2s ease !important;
-    }
-    
-    .stTextInput > div > div > input:focus {
-        border-color: var(--accent-gold) !important;
-        box-shadow: 0 0 0 3px rgba(212, 175, 55, 0.1) !important;
-    }
-    
-    .stTextInput label {
-        color: var(--text-primary) !important;
-        font-weight: 500 !important;
-        font-size: 0.875rem !important;
-        margin-bottom: 0.5rem !important;
-    }
-    
-    /* Auth Buttons */
-    .stButton > button {
-        width: 100% !important;
-        background: var(--gradient-primary) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 12px !important;
-        padding: 0.875rem 1.5rem !important;
-        font-size: 0.9375rem !important;
-        font-weight: 600 !important;
-        transition: all 0.2s ease !important;
-        min-height: 48px !important;
-        box-shadow: var(--shadow-sm) !important;
-    }
-    
-    .stButton > button:hover {
-        opacity: 0.9;
-        transform: translateY(-1px);
-        box-shadow: var(--shadow-md) !important;
-    }
-    
-    .auth-divider {
-        display: flex;
-        align-items: center;
-        margin: 1.5rem 0;
-        color: var(--text-muted);
-        font-size: 0.875rem;
-    }
-    
-    .auth-divider::before,
-    .auth-divider::after {
-        content: '';
-        flex: 1;
-        height: 1px;
-        background: var(--border-light);
-    }
-    
-    .auth-divider::before {
-        margin-right: 1rem;
-    }
-    
-    .auth-divider::after {
-        margin-left: 1rem;
-    }
-    
-    .auth-toggle {
-        margin-top: 1.5rem;
-        color: var(--text-secondary);
-        font-size: 0.9375rem;
-    }
-    
-    .auth-toggle a {
-        color: var(--accent-gold);
-        text-decoration: none;
-        font-weight: 600;
-        cursor: pointer;
-    }
-    
-    .auth-toggle a:hover {
-        text-decoration: underline;
-    }
-    
-    /* === MOBILE RESPONSIVE === */
-    @media (max-width: 768px) {
-        /* Mobile Menu Button */
-        .mobile-menu-btn {
-            display: flex;
-            position: fixed;
-            top: 1rem;
-            left: 1rem;
-            z-index: 9999;
-            width: 44px;
-            height: 44px;
-            background: var(--secondary-bg);
-            border: 1px solid var(--border-light);
-            border-radius: 12px;
-            cursor: pointer;
-            align-items: center;
-            justify-content: center;
-            transition: all 0.2s ease;
-            box-shadow: var(--shadow-md);
-        }
-        
-        .mobile-menu-btn:active {
-            transform: scale(0.95);
-        }
-        
-        /* Sidebar - Mobile */
-        [data-testid="stSidebar"] {
-            position: fixed !important;
-            left: -100% !important;
-            top: 0 !important;
-            height: 100vh !important;
-            width: 85vw !important;
-            max-width: 320px !important;
-            z-index: 9998 !important;
-            transition: left 0.3s cubic-bezier(0.4, 0, 0.2, 1) !important;
-            box-shadow: 4px 0 24px rgba(0, 0, 0, 0.15) !important;
-        }
-        
-        [data-testid="stSidebar"][data-visible="true"] {
-            left: 0 !important;
-        }
-        
-        /* Sidebar Overlay */
-        .sidebar-overlay {
-            display: none;
-            position: fixed;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: rgba(0, 0, 0, 0.4);
-            z-index: 9997;
-            backdrop-filter: blur(4px);
-        }
-        
-        .sidebar-overlay.active {
-            display: block;
-        }
-        
-        /* Main Content - Mobile */
-        .main-chat-container {
-            padding-top: 4rem;
-        }
-        
-        .chat-header {
-            padding: 1rem 1rem;
-            position: fixed;
-            top: 0;
-            left: 0;
-            right: 0;
-            width: 100%;
-        }
-        
-        .conversation-pane {
-            padding: 1rem 1rem !important;
-        }
-        
-        .message-composer {
-            padding: 1rem 1rem !important;
-        }
-        
-        /* Chat Messages - Mobile */
-        [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarUser"]) [data-testid="stChatMessageContent"],
-        [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarAssistant"]) [data-testid="stChatMessageContent"] {
-            max-width: 85% !important;
-            padding: 0.875rem 1rem !important;
-        }
-        
-        /* Welcome Screen - Mobile */
-        .welcome-screen {
-            padding: 2rem 1rem !important;
-        }
-        
-        .welcome-title {
-            font-size: 2rem !important;
-        }
-        
-        .welcome-subtitle {
-            font-size: 1rem !important;
-        }
-        
-        .suggestion-cards {
-            grid-template-columns: 1fr !important;
-        }
-        
-        /* Auth Screen - Mobile */
-        .auth-container {
-            padding: 1.5rem !important;
-        }
-        
-        .auth-card {
-            padding: 2rem 1.5rem !important;
-        }
-        
-        .auth-title {
-            font-size: 1.5rem !important;
-        }
-        
-        .stChatInput textarea {
-            min-height: 48px !important;
-            font-size: 16px !important; /* Prevents zoom on iOS */
-        }
-    }
-    
-    /* === ACCESSIBILITY === */
-    /* Focus indicators for keyboard navigation */
-    button:focus-visible,
-    input:focus-visible,
-    textarea:focus-visible {
-        outline: 2px solid var(--accent-gold);
-        outline-offset: 2px;
-    }
-    
-    /* Screen reader only text */
-    .sr-only {
-        position: absolute;
-        width: 1px;
-        height: 1px;
-        padding: 0;
-        margin: -1px;
-        overflow: hidden;
-        clip: rect(0, 0, 0, 0);
-        white-space: nowrap;
-        border-width: 0;
-    }
-    
-    /* Scrollbar Styling */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: transparent;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--border-medium);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: var(--text-muted);
-    }
-</style>
-""", unsafe_allow_html=True)
+inject_theme("app_auraglow")
 
 # Mobile Menu Script
 st.markdown("""
@@ -1005,99 +133,226 @@ Your tone should be:
 
 Always prioritize customer satisfaction and provide accurate, helpful information about AuraGlow's organic skincare products."""
 
+# Render replies token-by-token as they arrive instead of behind a spinner
+STREAM_RESPONSES = True
+
+# Prompt tokens of history sent with each request; older turns are dropped first
+CONTEXT_TOKEN_BUDGET = 3000
+
+# Seconds a user's "Recent Chats" list may be served from memory; writes
+# invalidate it explicitly, so this only bounds staleness from other devices
+CHAT_LIST_CACHE_TTL = 60
+
+# Seconds opening a chat waits for its background save before reading it back
+CHAT_SAVE_WAIT = 5
+
 # ==========================================
 # HELPER FUNCTIONS
 # ==========================================
 
 def create_user_in_firestore(user_id, email, name, photo_url):
-    """Create user document in Firestore"""
+    """Create the user document on first sign-in, then keep last_login roughly current"""
+    db = get_db()
     if db is None:
         return
     try:
-        user_ref = db.collection('users').document(user_id)
-        user_ref.set({
-            'email': email,
-            'name': name,
-            'photo_url': photo_url,
-            'created_at': firestore.SERVER_TIMESTAMP,
-            'last_login': firestore.SERVER_TIMESTAMP
-        }, merge=True)
+        started = time.perf_counter()
+        if ensure_user(db, user_id, {'email': email, 'name': name, 'photo_url': photo_url}):
+            metrics.observe("firestore_write", time.perf_counter() - started)
+            metrics.count("firestore_writes_total")
     except Exception as e:
         st.warning(f"Could not save user data: {str(e)}")
 
-def save_chat_to_firestore(user_id, messages):
-    """Save chat session to Firestore"""
-    if db is None or not messages:
-        return None
-    try:
-        chat_ref = db.collection('users').document(user_id).collection('chats').document()
-        chat_ref.set({
-            'messages': messages,
-            'created_at': firestore.SERVER_TIMESTAMP,
-            'updated_at': firestore.SERVER_TIMESTAMP,
-            'message_count': len(messages)
-        })
-        return chat_ref.id
-    except Exception as e:
-        st.warning(f"Could not save chat: {str(e)}")
-        return None
+@st.cache_resource
+def get_chat_list_cache():
+    """Process-wide cache of sidebar chat lists, keyed by user id"""
+    return chat_store.ChatListCache(ttl=CHAT_LIST_CACHE_TTL)
+
+@st.cache_resource
+def get_chat_writer():
+    """Process-wide background writer for chat turns"""
+    return chat_store.ChatWriter(on_saved=get_chat_list_cache().invalidate, metrics=metrics)
+
+def persist_current_chat(user_id):
+    """Hand the current chat's unsaved messages to the background writer.
+
+    Returns at once; the chat id is already known, so there is nothing to
+    wait for.
+    """
+    messages = st.session_state.messages
+    if st.session_state.persisted_count >= len(messages):
+        return
+    db = get_db()
+    if db is None:
+        return
+    get_chat_writer().save(db, user_id, st.session_state.current_chat_id,
+                           [dict(msg) for msg in messages], st.session_state.persisted_count)
+    st.session_state.persisted_count = len(messages)
+
+def fetch_chat_list(db, user_id, limit):
+    """Recent Chats straight from Firestore; a query bills at least one read"""
+    with metrics.timer("firestore_read"):
+        chats = chat_store.list_chats(db, user_id, limit)
+    metrics.count("firestore_reads_total", max(1, len(chats)))
+    return chats
+
+def fetch_chat(db, user_id, chat_id):
+    """One chat straight from Firestore: its document plus its messages"""
+    with metrics.timer("firestore_read"):
+        chat = chat_store.load_chat(db, user_id, chat_id)
+    metrics.count("firestore_reads_total", 1 + max(1, len(chat['messages'])))
+    return chat
 
 def load_user_chats(user_id, limit=10):
-    """Load user's recent chats from Firestore"""
+    """Load the index (title, preview, count) of the user's recent chats"""
+    db = get_db()
     if db is None:
         return []
     try:
-        chats_ref = db.collection('users').document(user_id).collection('chats')
-        chats = chats_ref.order_by('updated_at', direction=firestore.Query.DESCENDING).limit(limit).stream()
-        
-        chat_list = []
-        for chat in chats:
-            chat_data = chat.to_dict()
-            chat_list.append({
-                'id': chat.id,
-                'messages': chat_data.get('messages', []),
-                'created_at': chat_data.get('created_at'),
-                'preview': chat_data['messages'][0]['content'][:50] + "..." if chat_data.get('messages') else "Empty chat"
-            })
-        return chat_list
+        return get_chat_list_cache().get(user_id, limit, lambda: fetch_chat_list(db, user_id, limit))
     except Exception as e:
         st.warning(f"Could not load chats: {str(e)}")
         return []
 
-def update_chat_in_firestore(user_id, chat_id, messages):
-    """Update existing chat session"""
+def load_chat(user_id, chat_id):
+    """Load the full transcript and summary of one chat"""
+    db = get_db()
+    if db is None:
+        return None
+    try:
+        return fetch_chat(db, user_id, chat_id)
+    except Exception as e:
+        st.warning(f"Could not load chat: {str(e)}")
+        return None
+
+def save_chat_summary(user_id, chat_id, summary, upto):
+    """Store the rolling summary next to the chat's messages.
+
+    Runs in a background worker, so failures are dropped instead of shown.
+    """
+    db = get_db()
     if db is None:
         return
     try:
+        # Merged rather than updated: the chat's first save may still be queued
         chat_ref = db.collection('users').document(user_id).collection('chats').document(chat_id)
-        chat_ref.update({
-            'messages': messages,
-            'updated_at': firestore.SERVER_TIMESTAMP,
-            'message_count': len(messages)
-        })
-    except Exception as e:
-        st.warning(f"Could not update chat: {str(e)}")
+        chat_ref.set({
+            'summary': summary,
+            'summary_upto': upto
+        }, merge=True)
+        metrics.count("firestore_writes_total")
+    except Exception:
+        pass
+
+def groq_scheduler_stats():
+    from groq_scheduler import get_request_scheduler
+    return get_request_scheduler().stats()
+
+def groq_connection_stats():
+    from groq_client import groq_pool_stats
+    return groq_pool_stats()
+
+@st.cache_resource
+def export_stats():
+    """Publish the shared caches' and workers' stats as gauges, once per process"""
+    registry = get_metrics()
+    registry.add_collector("groq_scheduler", groq_scheduler_stats)
+    registry.add_collector("groq_pool", groq_connection_stats)
+    registry.add_collector("chat_list_cache", get_chat_list_cache().stats)
+    registry.add_collector("chat_writer", get_chat_writer().stats)
+    registry.add_collector("known_users", get_known_users().stats)
+    return registry
+
+export_stats()
+
+def reply_job_key():
+    """Key of the current chat's background reply: (session, chat)"""
+    return (st.session_state.session_key, st.session_state.current_chat_id)
+
+def reply_in_flight():
+    """True when the reply worker owns persisting the current chat's reply"""
+    job = get_generation_worker().get(reply_job_key())
+    if job is None or job.error is not None:
+        return False
+    return not job.done or bool(job.text)
+
+@st.cache_resource
+def get_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+def prefetch_latest_chat(user_id):
+    """Warm Recent Chats and load the newest chat in the background.
+
+    Runs when a session is restored from the cookie, so reopening the chat
+    the user was last in doesn't wait on Firestore.
+    """
+    chat_list_cache = get_chat_list_cache()
+    
+    def load():
+        db = get_db()
+        if db is None:
+            return None
+        try:
+            # Same cache key as the sidebar's load_user_chats()
+            chats = chat_list_cache.get(user_id, 10, lambda: fetch_chat_list(db, user_id, 10))
+            if not chats:
+                return None
+            return {'chat_id': chats[0]['id'], 'chat': fetch_chat(db, user_id, chats[0]['id'])}
+        except Exception:
+            return None
+    
+    st.session_state.prefetched_chat = (time.monotonic(), get_prefetch_executor().submit(load))
+
+def take_prefetched_chat(chat_id):
+    """The prefetched transcript of ``chat_id`` if it is ready and recent, else None"""
+    prefetched = st.session_state.pop('prefetched_chat', None)
+    if prefetched is None:
+        return None
+    started, future = prefetched
+    if not future.done() or time.monotonic() - started > CHAT_LIST_CACHE_TTL:
+        return None
+    result = future.result()
+    if result is None or result['chat_id'] != chat_id:
+        return None
+    return result['chat']
 
 # ==========================================
 # SESSION STATE INITIALIZATION
 # ==========================================
 
 if "user" not in st.session_state:
-    st.session_state.user = None
+    # A valid session cookie signs the user straight back in
+    st.session_state.user = restore_session_user()
+    if st.session_state.user is not None:
+        prefetch_latest_chat(st.session_state.user['id'])
+
+if "session_cookie_user" not in st.session_state:
+    # Whose token the browser's cookie holds; a restored user's is already there
+    st.session_state.session_cookie_user = st.session_state.user['id'] if st.session_state.user else None
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
 if "current_chat_id" not in st.session_state:
-    st.session_state.current_chat_id = None
+    st.session_state.current_chat_id = chat_store.new_chat_id()  # Made locally, before the first save
+
+if "persisted_count" not in st.session_state:
+    st.session_state.persisted_count = 0  # Messages of the current chat handed to the chat writer
+
+if "session_key" not in st.session_state:
+    st.session_state.session_key = uuid.uuid4().hex  # Ties background replies to this browser session
+
+if "chat_summary" not in st.session_state:
+    st.session_state.chat_summary = {"text": "", "upto": 0}
 
 if "auth_mode" not in st.session_state:
     st.session_state.auth_mode = "signup"  # Show signup form first
 
-if "client" not in st.session_state:
+# The auth screen never calls the model, so the client waits for sign-in
+if st.session_state.user is not None and "client" not in st.session_state:
+    from groq_client import get_groq_client
     try:
-        api_key = st.secrets["GROQ_API_KEY"]
-        st.session_state.client = Groq(api_key=api_key)
+        st.session_state.client = get_groq_client()
     except:
         st.error("⚠️ Groq API Key Missing")
         st.stop()
@@ -1203,13 +458,8 @@ def show_auth_screen():
             st.markdown("<div class='auth-divider'>OR</div>", unsafe_allow_html=True)
             
             try:
-                oauth2 = OAuth2Component(
-                    st.secrets["oauth"]["client_id"],
-                    st.secrets["oauth"]["client_secret"],
-                    "https://accounts.google.com/o/oauth2/v2/auth",
-                    "https://oauth2.googleapis.com/token",
-                    "https://oauth2.googleapis.com/token"
-                )
+                from google_auth import get_oauth_component, google_user_info
+                oauth2 = get_oauth_component()
                 
                 result = oauth2.authorize_button(
                     name="Continue with Google",
@@ -1222,8 +472,7 @@ def show_auth_screen():
                 )
                 
                 if result and "token" in result:
-                    headers = {"Authorization": f"Bearer {result['token']['access_token']}"}
-                    user_info = requests.get("https://www.googleapis.com/oauth2/v1/userinfo", headers=headers).json()
+                    user_info = google_user_info(result['token'])
                     
                     user_id = user_info.get("id", hashlib.md5(user_info["email"].encode()).hexdigest())
                     
@@ -1285,13 +534,8 @@ def show_auth_screen():
             st.markdown("<div class='auth-divider'>OR</div>", unsafe_allow_html=True)
             
             try:
-                oauth2 = OAuth2Component(
-                    st.secrets["oauth"]["client_id"],
-                    st.secrets["oauth"]["client_secret"],
-                    "https://accounts.google.com/o/oauth2/v2/auth",
-                    "https://oauth2.googleapis.com/token",
-                    "https://oauth2.googleapis.com/token"
-                )
+                from google_auth import get_oauth_component, google_user_info
+                oauth2 = get_oauth_component()
                 
                 result = oauth2.authorize_button(
                     name="Sign in with Google",
@@ -1304,8 +548,7 @@ def show_auth_screen():
                 )
                 
                 if result and "token" in result:
-                    headers = {"Authorization": f"Bearer {result['token']['access_token']}"}
-                    user_info = requests.get("https://www.googleapis.com/oauth2/v1/userinfo", headers=headers).json()
+                    user_info = google_user_info(result['token'])
                     
                     user_id = user_info.get("id", hashlib.md5(user_info["email"].encode()).hexdigest())
                     
@@ -1326,15 +569,165 @@ def show_auth_screen():
         
         st.markdown("</div>", unsafe_allow_html=True)
 
+@st.fragment
+def chat_area(user):
+    """Welcome screen, new turns, chat input and the live reply.
+
+    Runs as a fragment: sending a message reruns only this function, so the
+    sidebar (and its Recent Chats query) and the earlier transcript are not
+    rebuilt and re-sent on every turn.
+    """
+    first_save = st.session_state.persisted_count == 0
+    
+    save_error = get_chat_writer().take_error(user['id'], st.session_state.current_chat_id)
+    if save_error is not None:
+        st.warning(f"Could not save chat: {str(save_error)}")
+    
+    if len(st.session_state.messages) == 0:
+        st.markdown(f"""
+        <div class="welcome-screen">
+            <span class="welcome-icon">✨</span>
+            <h1 class="welcome-title">Hello, {user['name']}!</h1>
+            <p class="welcome-subtitle">I'm your AuraGlow skincare assistant. How can I help you today?</p>
+            
+            <div class="suggestion-cards">
+                <div class="suggestion-card" onclick="document.querySelector('[data-testid=\\"stChatInput\\"] textarea').value='What products are best for sensitive skin?'; document.querySelector('[data-testid=\\"stChatInput\\"] textarea').focus();">
+                    <span class="suggestion-card-icon">🌿</span>
+                    <div class="suggestion-card-title">Product Recommendations</div>
+                    <div class="suggestion-card-desc">Get personalized skincare recommendations</div>
+                </div>
+                <div class="suggestion-card" onclick="document.querySelector('[data-testid=\\"stChatInput\\"] textarea').value='Track my order'; document.querySelector('[data-testid=\\"stChatInput\\"] textarea').focus();">
+                    <span class="suggestion-card-icon">📦</span>
+                    <div class="suggestion-card-title">Track Order</div>
+                    <div class="suggestion-card-desc">Check your order status and delivery</div>
+                </div>
+                <div class="suggestion-card" onclick="document.querySelector('[data-testid=\\"stChatInput\\"] textarea').value='What ingredients are in your products?'; document.querySelector('[data-testid=\\"stChatInput\\"] textarea').focus();">
+                    <span class="suggestion-card-icon">🧪</span>
+                    <div class="suggestion-card-title">Product Ingredients</div>
+                    <div class="suggestion-card-desc">Learn about our organic ingredients</div>
+                </div>
+                <div class="suggestion-card" onclick="document.querySelector('[data-testid=\\"stChatInput\\"] textarea').value='I need help with a return'; document.querySelector('[data-testid=\\"stChatInput\\"] textarea').focus();">
+                    <span class="suggestion-card-icon">🔄</span>
+                    <div class="suggestion-card-title">Customer Service</div>
+                    <div class="suggestion-card-desc">Returns, exchanges, and support</div>
+                </div>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Turns added since the last full run; earlier ones are drawn outside
+    for message in st.session_state.messages[st.session_state.transcript_rendered:]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+    
+    # Message Composer
+    st.markdown('<div class="message-composer">', unsafe_allow_html=True)
+    
+    if prompt := st.chat_input("Ask about products, ingredients, orders, or skincare advice..."):
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        
+        with st.chat_message("user"):
+            st.markdown(prompt)
+        
+        st.session_state.chat_summary = latest_summary(
+            st.session_state.current_chat_id,
+            st.session_state.chat_summary
+        )
+        messages = build_context_messages(
+            SYSTEM_PROMPT,
+            st.session_state.messages,
+            budget=CONTEXT_TOKEN_BUDGET,
+            summary=st.session_state.chat_summary
+        )
+        
+        # Save the prompt now: a chat reopened before the reply is done
+        # must load with it, so the worker only has the reply to add
+        persist_current_chat(user['id'])
+        
+        # Generate on the background worker so a rerun (any sidebar click)
+        # doesn't throw away the reply; the worker also queues it for saving
+        client = st.session_state.client
+        user_id = user['id']
+        chat_id = st.session_state.current_chat_id
+        history = [dict(msg) for msg in st.session_state.messages]
+        start = st.session_state.persisted_count
+        db = get_db()
+        chat_writer = get_chat_writer()
+        
+        def save_reply(job):
+            if job.ttft is not None:
+                metrics.observe("ttft", job.ttft)
+            if job.total_time is not None:
+                metrics.observe("llm", job.total_time)
+            metrics.record_usage(job.usage)
+            if job.text and db is not None:
+                turn = history + [{"role": "assistant", "content": job.text}]
+                chat_writer.save(db, user_id, chat_id, turn, start)
+                job.result = {'persisted_count': len(turn)}
+        
+        get_generation_worker().submit(
+            reply_job_key(),
+            lambda: stream_reply(client, messages, max_tokens=300, stream=STREAM_RESPONSES),
+            on_complete=save_reply
+        )
+    
+    # Attach to this chat's reply, whether it started in this run or before a rerun
+    job = get_generation_worker().get(reply_job_key())
+    if job is not None and job.done and len(st.session_state.messages) >= job.result.get('persisted_count', float('inf')):
+        # Saved while the user was in another chat and loaded back with it
+        get_generation_worker().discard(job.key)
+        job = None
+    if job is not None:
+        with st.chat_message("assistant"):
+            if not job.done and st.button("⏹ Stop generating", key="stop_generating"):
+                job.cancel()
+            st.write_stream(job.stream())
+        get_generation_worker().discard(job.key)
+        
+        if job.error is not None:
+            st.error(f"Error: {str(job.error)}")
+        elif job.text:
+            st.session_state.messages.append({"role": "assistant", "content": job.text})
+            st.session_state.last_ttft = job.ttft
+            st.session_state.persisted_count = job.result.get('persisted_count', st.session_state.persisted_count)
+            
+            # Fold older turns into the summary off the critical path
+            chat_id = st.session_state.current_chat_id
+            user_id = user['id']
+            schedule_summary_update(
+                st.session_state.client,
+                chat_id,
+                st.session_state.messages,
+                st.session_state.chat_summary,
+                on_saved=lambda text, upto: save_chat_summary(user_id, chat_id, text, upto)
+            )
+    
+    st.markdown('</div>', unsafe_allow_html=True)  # Close message-composer
+    
+    # A chat saved for the first time belongs in Recent Chats
+    if first_save and st.session_state.persisted_count:
+        st.rerun()
+
+
 # ==========================================
 # MAIN APPLICATION
 # ==========================================
 
 if st.session_state.user is None:
+    if st.session_state.pop('forget_session_cookie', False):
+        forget_session_user()
     show_auth_screen()
 else:
     user = st.session_state.user
     
+    # Remember the sign-in so a reload doesn't go through Google again
+    if st.session_state.session_cookie_user != user['id']:
+        remember_session_user(user)
+        st.session_state.session_cookie_user = user['id']
+    
+    if get_db() is None:
+        st.warning(f"⚠️ {firebase_status()['error']}. App will continue with limited features.")
+    
     # Sidebar
     with st.sidebar:
         # AuraGlow Logo
@@ -1359,43 +752,83 @@ else:
         
         # New Chat Button
         if st.button("➕ New Chat", use_container_width=True):
-            if st.session_state.messages and st.session_state.current_chat_id:
-                update_chat_in_firestore(user['id'], st.session_state.current_chat_id, st.session_state.messages)
-            elif st.session_state.messages:
-                st.session_state.current_chat_id = save_chat_to_firestore(user['id'], st.session_state.messages)
+            # A reply still generating saves itself when done
+            if not reply_in_flight():
+                persist_current_chat(user['id'])
             
             st.session_state.messages = []
-            st.session_state.current_chat_id = None
+            st.session_state.current_chat_id = chat_store.new_chat_id()
+            st.session_state.persisted_count = 0
+            st.session_state.chat_summary = {"text": "", "upto": 0}
             st.rerun()
         
         st.divider()
         
         # Chat History
         st.subheader("Recent Chats")
+        # Checked before loading: once a save lands, the list is reloaded fresh
+        open_chat_id = st.session_state.current_chat_id
+        save_pending = get_chat_writer().is_pending(user['id'], open_chat_id)
         user_chats = load_user_chats(user['id'])
+        if save_pending and not any(chat['id'] == open_chat_id for chat in user_chats):
+            # Still on its way to Firestore; list it without waiting
+            user_chats = [chat_store.pending_chat_entry(open_chat_id, st.session_state.messages)] + user_chats[:9]
         
         if user_chats:
             for chat in user_chats:
-                if st.button(chat['preview'], key=f"chat_{chat['id']}", use_container_width=True):
-                    st.session_state.messages = chat['messages']
-                    st.session_state.current_chat_id = chat['id']
-                    st.rerun()
+                if st.button(chat['title'], key=f"chat_{chat['id']}", help=chat['preview'], use_container_width=True):
+                    # Only now fetch the transcript; the list holds index fields only
+                    get_chat_writer().wait(user['id'], chat['id'], timeout=CHAT_SAVE_WAIT)
+                    loaded = take_prefetched_chat(chat['id']) or load_chat(user['id'], chat['id'])
+                    if loaded is not None:
+                        st.session_state.messages = loaded['messages']
+                        st.session_state.current_chat_id = chat['id']
+                        st.session_state.persisted_count = len(loaded['messages'])
+                        st.session_state.chat_summary = loaded['summary']
+                        st.rerun()
         else:
             st.caption("No previous chats")
         
+        # Diagnostics (opt-in with show_diagnostics = true in secrets)
+        if st.secrets.get("show_diagnostics", False):
+            with st.expander("⚙️ Diagnostics"):
+                st.caption("Latency by stage (ms)")
+                st.table(get_metrics().summary())
+                st.caption("Tokens and Firestore operations")
+                st.json(get_metrics().counters())
+                from groq_client import groq_pool_stats
+                from groq_scheduler import get_request_scheduler
+                st.caption("Groq connection pool (shared by all sessions)")
+                st.json(groq_pool_stats())
+                st.caption("Groq request scheduler (rate limits and queueing)")
+                st.json(get_request_scheduler().stats())
+                st.caption("Recent Chats cache")
+                st.json(get_chat_list_cache().stats())
+                st.caption("Chat writer (background saves)")
+                st.json(get_chat_writer().stats())
+                st.caption("Firebase")
+                st.json(firebase_status())
+                st.caption("Known users (skipped login writes)")
+                st.json(get_known_users().stats())
+                st.caption("Background imports (seconds)")
+                st.json(start_import_prewarm())
+        
         st.divider()
         
         # Sign Out
         if st.button("🚪 Sign Out", use_container_width=True):
-            if st.session_state.messages:
-                if st.session_state.current_chat_id:
-                    update_chat_in_firestore(user['id'], st.session_state.current_chat_id, st.session_state.messages)
-                else:
-                    save_chat_to_firestore(user['id'], st.session_state.messages)
+            if not reply_in_flight():
+                persist_current_chat(user['id'])
             
+            get_chat_list_cache().invalidate(user['id'])
             st.session_state.user = None
+            st.session_state.session_cookie_user = None
+            st.session_state.forget_session_cookie = True
+            st.session_state.pop('prefetched_chat', None)
             st.session_state.messages = []
-            st.session_state.current_chat_id = None
+            st.session_state.current_chat_id = chat_store.new_chat_id()
+            st.session_state.persisted_count = 0
+            st.session_state.chat_summary = {"text": "", "upto": 0}
             st.rerun()
     
     # Main Chat Area
@@ -1421,80 +854,18 @@ else:
     # Conversation Pane
     st.markdown('<div class="conversation-pane">', unsafe_allow_html=True)
     
-    if len(st.session_state.messages) == 0:
-        st.markdown(f"""
-        <div class="welcome-screen">
-            <span class="welcome-icon">✨</span>
-            <h1 class="welcome-title">Hello, {user['name']}!</h1>
-            <p class="welcome-subtitle">I'm your AuraGlow skincare assistant. How can I help you today?</p>
-            
-            <div class="suggestion-cards">
-                <div class="suggestion-card" onclick="document.querySelector('[data-testid=\\"stChatInput\\"] textarea').value='What products are best for sensitive skin?'; document.querySelector('[data-testid=\\"stChatInput\\"] textarea').focus();">
-                    <span class="suggestion-card-icon">🌿</span>
-                    <div class="suggestion-card-title">Product Recommendations</div>
-                    <div class="suggestion-card-desc">Get personalized skincare recommendations</div>
-                </div>
-                <div class="suggestion-card" onclick="document.querySelector('[data-testid=\\"stChatInput\\"] textarea').value='Track my order'; document.querySelector('[data-testid=\\"stChatInput\\"] textarea').focus();">
-                    <span class="suggestion-card-icon">📦</span>
-                    <div class="suggestion-card-title">Track Order</div>
-                    <div class="suggestion-card-desc">Check your order status and delivery</div>
-                </div>
-                <div class="suggestion-card" onclick="document.querySelector('[data-testid=\\"stChatInput\\"] textarea').value='What ingredients are in your products?'; document.querySelector('[data-testid=\\"stChatInput\\"] textarea').focus();">
-                    <span class="suggestion-card-icon">🧪</span>
-                    <div class="suggestion-card-title">Product Ingredients</div>
-                    <div class="suggestion-card-desc">Learn about our organic ingredients</div>
-                </div>
-                <div class="suggestion-card" onclick="document.querySelector('[data-testid=\\"stChatInput\\"] textarea').value='I need help with a return'; document.querySelector('[data-testid=\\"stChatInput\\"] textarea').focus();">
-                    <span class="suggestion-card-icon">🔄</span>
-                    <div class="suggestion-card-title">Customer Service</div>
-                    <div class="suggestion-card-desc">Returns, exchanges, and support</div>
-                </div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-    else:
-        # Display messages
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
+    # The transcript so far is drawn once per full run, newest page first;
+    # chat_area only redraws the turns added after it
+    st.session_state.transcript_rendered = render_transcript(
+        st.session_state.messages,
+        st.session_state.current_chat_id
+    )
     
     st.markdown('</div>', unsafe_allow_html=True)  # Close conversation-pane
     
-    # Message Composer
-    st.markdown('<div class="message-composer">', unsafe_allow_html=True)
+    # Everything up to the chat area: sidebar, Recent Chats and transcript
+    metrics.observe("render", time.perf_counter() - run_started)
     
-    if prompt := st.chat_input("Ask about products, ingredients, orders, or skincare advice..."):
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        
-        with st.chat_message("user"):
-            st.markdown(prompt)
-        
-        with st.chat_message("assistant"):
-            with st.spinner(""):
-                try:
-                    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-                    for msg in st.session_state.messages:
-                        messages.append({"role": msg["role"], "content": msg["content"]})
-                    
-                    response = st.session_state.client.chat.completions.create(
-                        model="llama-3.3-70b-versatile",
-                        messages=messages,
-                        temperature=0.7,
-                        max_tokens=300
-                    )
-                    assistant_response = response.choices[0].message.content
-                    
-                    st.markdown(assistant_response)
-                    st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-                    
-                    if st.session_state.current_chat_id:
-                        update_chat_in_firestore(user['id'], st.session_state.current_chat_id, st.session_state.messages)
-                    else:
-                        st.session_state.current_chat_id = save_chat_to_firestore(user['id'], st.session_state.messages)
-                    
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+    chat_area(user)
     
-    st.markdown('</div>', unsafe_allow_html=True)  # Close message-composer
     st.markdown('</div>', unsafe_allow_html=True)  # Close main-chat-container
-
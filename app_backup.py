@@ -1,7 +1,11 @@
 import streamlit as st
-from groq import Groq
+from groq_client import get_groq_client
+from theme_assets import inject_theme
+from context_window import build_context_messages
+from crisis import CRISIS_RESOURCES, CRISIS_RESPONSE
+from intents import CRISIS, RESET, route_intents
 import json
-import re
+from json_extract import extract_json, message_json
 
 # Page configuration
 st.set_page_config(
@@ -14,354 +18,8 @@ st.set_page_config(
 # Tailwind CSS + Custom Modern Styling
 st.markdown("""
 <link href="https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css" rel="stylesheet">
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
-    
-    /* Global Reset & Variables */
-    * {
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-    }
-    
-    :root {
-        --primary: #6366f1;
-        --primary-dark: #4f46e5;
-        --secondary: #8b5cf6;
-        --success: #10b981;
-        --danger: #ef4444;
-        --bg-main: #f9fafb;
-        --bg-card: #ffffff;
-        --text-primary: #111827;
-        --text-secondary: #6b7280;
-        --border-color: #e5e7eb;
-        --shadow-sm: 0 1px 2px 0 rgba(0, 0, 0, 0.05);
-        --shadow-md: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-        --shadow-lg: 0 10px 15px -3px rgba(0, 0, 0, 0.1);
-        --shadow-xl: 0 20px 25px -5px rgba(0, 0, 0, 0.1);
-    }
-    
-    /* Dark mode support */
-    @media (prefers-color-scheme: dark) {
-        :root {
-            --bg-main: #0f172a;
-            --bg-card: #1e293b;
-            --text-primary: #f1f5f9;
-            --text-secondary: #cbd5e1;
-            --border-color: #334155;
-        }
-    }
-    
-    /* Hide Streamlit Elements */
-    #MainMenu, footer, header {visibility: hidden;}
-    .stDeployButton {display: none;}
-    
-    /* Main App Background */
-    .stApp {
-        background: var(--bg-main);
-    }
-    
-    /* Remove default padding */
-    .block-container {
-        padding-top: 2rem !important;
-        padding-bottom: 2rem !important;
-        max-width: 100% !important;
-    }
-    
-    /* Header Styling */
-    .app-header {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1.5rem 2rem;
-        border-radius: 24px;
-        margin-bottom: 2rem;
-        box-shadow: var(--shadow-xl);
-        animation: slideDown 0.5s ease-out;
-    }
-    
-    .app-header h1 {
-        color: white;
-        font-size: 2rem;
-        font-weight: 700;
-        margin: 0;
-        letter-spacing: -0.02em;
-    }
-    
-    .app-header p {
-        color: rgba(255, 255, 255, 0.9);
-        font-size: 0.95rem;
-        margin: 0.5rem 0 0 0;
-        font-weight: 400;
-    }
-    
-    /* Chat Container */
-    .chat-container {
-        max-width: 800px;
-        margin: 0 auto;
-        padding: 0 1rem;
-    }
-    
-    /* Chat Messages - Complete Redesign */
-    .stChatMessage {
-        background: transparent !important;
-        padding: 1rem 0 !important;
-        border: none !important;
-        margin-bottom: 1.5rem !important;
-    }
-    
-    /* User Message */
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarUser"]) {
-        display: flex;
-        justify-content: flex-end;
-    }
-    
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarUser"]) [data-testid="stChatMessageContent"] {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
-        color: white !important;
-        border-radius: 20px 20px 4px 20px !important;
-        padding: 1rem 1.25rem !important;
-        max-width: 75% !important;
-        box-shadow: var(--shadow-md);
-        animation: slideInRight 0.3s ease-out;
-    }
-    
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarUser"]) p {
-        color: white !important;
-        margin: 0 !important;
-        font-size: 0.95rem;
-        line-height: 1.6;
-    }
-    
-    /* Assistant Message */
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarAssistant"]) [data-testid="stChatMessageContent"] {
-        background: var(--bg-card) !important;
-        border: 1px solid var(--border-color) !important;
-        border-radius: 20px 20px 20px 4px !important;
-        padding: 1rem 1.25rem !important;
-        max-width: 75% !important;
-        box-shadow: var(--shadow-sm);
-        animation: slideInLeft 0.3s ease-out;
-    }
-    
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarAssistant"]) p {
-        color: var(--text-primary) !important;
-        margin: 0 !important;
-        font-size: 0.95rem;
-        line-height: 1.7;
-    }
-    
-    /* Avatar Styling */
-    [data-testid="stChatMessageAvatarUser"], 
-    [data-testid="stChatMessageAvatarAssistant"] {
-        width: 40px !important;
-        height: 40px !important;
-        border-radius: 50% !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-        font-size: 1.25rem !important;
-        box-shadow: var(--shadow-md);
-    }
-    
-    [data-testid="stChatMessageAvatarUser"] {
-        background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%) !important;
-    }
-    
-    [data-testid="stChatMessageAvatarAssistant"] {
-        background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%) !important;
-    }
-    
-    /* Chat Input - Modern Design */
-    .stChatInputContainer {
-        background: var(--bg-card) !important;
-        border: 2px solid var(--border-color) !important;
-        border-radius: 28px !important;
-        padding: 0.5rem 1rem !important;
-        box-shadow: var(--shadow-lg) !important;
-        transition: all 0.3s ease !important;
-        margin-top: 2rem !important;
-    }
-    
-    .stChatInputContainer:focus-within {
-        border-color: var(--primary) !important;
-        box-shadow: 0 0 0 4px rgba(99, 102, 241, 0.1), var(--shadow-xl) !important;
-    }
-    
-    .stChatInput input {
-        border: none !important;
-        background: transparent !important;
-        padding: 0.75rem 0.5rem !important;
-        font-size: 0.95rem !important;
-        color: var(--text-primary) !important;
-    }
-    
-    .stChatInput input::placeholder {
-        color: var(--text-secondary) !important;
-        font-weight: 400;
-    }
-    
-    .stChatInput input:focus {
-        outline: none !important;
-        box-shadow: none !important;
-    }
-    
-    /* Sidebar Modern Design */
-    [data-testid="stSidebar"] {
-        background: var(--bg-card) !important;
-        border-right: 1px solid var(--border-color) !important;
-        box-shadow: var(--shadow-lg);
-    }
-    
-    [data-testid="stSidebar"] [data-testid="stMarkdownContainer"] {
-        padding: 1rem;
-    }
-    
-    /* Button Styling */
-    .stButton button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 12px !important;
-        padding: 0.75rem 1.5rem !important;
-        font-weight: 600 !important;
-        font-size: 0.9rem !important;
-        transition: all 0.3s ease !important;
-        box-shadow: var(--shadow-md);
-        letter-spacing: 0.01em;
-    }
-    
-    .stButton button:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: var(--shadow-lg) !important;
-        background: linear-gradient(135deg, #764ba2 0%, #667eea 100%) !important;
-    }
-    
-    .stButton button:active {
-        transform: translateY(0) !important;
-    }
-    
-    /* Expander Styling */
-    .streamlit-expanderHeader {
-        background: var(--bg-card) !important;
-        border-radius: 12px !important;
-        border: 1px solid var(--border-color) !important;
-        padding: 1rem !important;
-        font-weight: 600 !important;
-        color: var(--text-primary) !important;
-        transition: all 0.3s ease;
-    }
-    
-    .streamlit-expanderHeader:hover {
-        border-color: var(--primary) !important;
-        background: rgba(99, 102, 241, 0.05) !important;
-    }
-    
-    .streamlit-expanderContent {
-        background: var(--bg-card) !important;
-        border: 1px solid var(--border-color) !important;
-        border-top: none !important;
-        border-radius: 0 0 12px 12px !important;
-        padding: 1rem !important;
-    }
-    
-    /* Spinner */
-    .stSpinner > div {
-        border-top-color: var(--primary) !important;
-    }
-    
-    /* Alert/Error boxes */
-    .stAlert {
-        background: var(--bg-card) !important;
-        border: 1px solid var(--border-color) !important;
-        border-radius: 12px !important;
-        padding: 1rem !important;
-        box-shadow: var(--shadow-sm);
-    }
-    
-    /* Divider */
-    hr {
-        margin: 1.5rem 0;
-        border: none;
-        height: 1px;
-        background: var(--border-color);
-    }
-    
-    /* Animations */
-    @keyframes slideDown {
-        from {
-            opacity: 0;
-            transform: translateY(-20px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    @keyframes slideInRight {
-        from {
-            opacity: 0;
-            transform: translateX(20px);
-        }
-        to {
-            opacity: 1;
-            transform: translateX(0);
-        }
-    }
-    
-    @keyframes slideInLeft {
-        from {
-            opacity: 0;
-            transform: translateX(-20px);
-        }
-        to {
-            opacity: 1;
-            transform: translateX(0);
-        }
-    }
-    
-    @keyframes fadeIn {
-        from {
-            opacity: 0;
-        }
-        to {
-            opacity: 1;
-        }
-    }
-    
-    /* Scrollbar Styling */
-    ::-webkit-scrollbar {
-        width: 10px;
-        height: 10px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: var(--bg-main);
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--border-color);
-        border-radius: 5px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: var(--text-secondary);
-    }
-    
-    /* Responsive Design */
-    @media (max-width: 768px) {
-        .app-header h1 {
-            font-size: 1.5rem;
-        }
-        
-        .chat-container {
-            padding: 0 0.5rem;
-        }
-        
-        [data-testid="stChatMessageContent"] {
-            max-width: 90% !important;
-        }
-    }
-</style>
 """, unsafe_allow_html=True)
+inject_theme("app_backup")
 
 # System prompt for Clarity
 SYSTEM_PROMPT = """You are 'Clarity', an expert AI Wellness Companion designed to provide emotional support, stress relief, and promote mental clarity. Your persona is warm, empathetic, calm, and reassuring, acting as a supportive, non-judgmental companion.
@@ -399,14 +57,16 @@ OUTPUT FORMAT:
 If a tool or structured output is required, use JSON only.
 Otherwise, use plain text. DO NOT use Markdown, code blocks, or formatting unless necessary for clarity."""
 
+# Prompt tokens of history sent with each request; older turns are dropped first
+CONTEXT_TOKEN_BUDGET = 3000
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
 if "client" not in st.session_state:
     try:
-        api_key = st.secrets["GROQ_API_KEY"]
-        st.session_state.client = Groq(api_key=api_key)
+        st.session_state.client = get_groq_client()
     except KeyError:
         st.error("⚠️ **API Key Missing**: Please configure GROQ_API_KEY in Streamlit secrets.")
         st.stop()
@@ -414,23 +74,6 @@ if "client" not in st.session_state:
         st.error(f"❌ **Failed to initialize Groq API**: {str(e)}")
         st.stop()
 
-# Helper function to check for reset command
-def should_reset_conversation(user_input):
-    """Check if user wants to start over"""
-    reset_keywords = ["start over", "reset", "clear conversation", "new conversation", "begin again"]
-    return any(keyword in user_input.lower() for keyword in reset_keywords)
-
-# Helper function to extract JSON from response
-def extract_json_from_response(text):
-    """Extract JSON block from response if present"""
-    json_match = re.search(r'\{[^{}]*\}', text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group())
-        except json.JSONDecodeError:
-            pass
-    return None
-
 # Create centered container
 col1, col2, col3 = st.columns([1, 4, 1])
 
@@ -449,19 +92,20 @@ with col2:
     # Display chat history
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
-            content = message["content"]
-            json_data = extract_json_from_response(content)
+            # JSON is parsed once per message and kept on it
+            json_data = message_json(message)
             if json_data:
                 st.json(json_data)
             else:
-                st.markdown(content)
+                st.markdown(message["content"])
     
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Chat input
     if prompt := st.chat_input("How are you feeling today? Share what's on your mind..."):
-        # Check for reset command
-        if should_reset_conversation(prompt):
+        # Reset, crisis and the other local intents, all in one pass
+        intents = route_intents(prompt)
+        if RESET in intents:
             st.session_state.messages = []
             st.rerun()
         
@@ -486,36 +130,41 @@ with col2:
         with st.chat_message("assistant"):
             with st.spinner("Clarity is thinking..."):
                 try:
-                    # Build messages array with system prompt and history
-                    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-                    
-                    # Add conversation history
-                    for msg in st.session_state.messages:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
-                    
-                    # Send message to Groq
-                    response = st.session_state.client.chat.completions.create(
-                        model="llama-3.3-70b-versatile",
-                        messages=messages,
-                        temperature=0.7,
-                        max_tokens=200
-                    )
-                    assistant_response = response.choices[0].message.content
-                    
-                    # Display response
-                    json_data = extract_json_from_response(assistant_response)
-                    if json_data:
-                        st.json(json_data)
-                    else:
+                    if CRISIS in intents:
+                        # Fixed protocol reply straight away, no model round-trip
+                        assistant_response = CRISIS_RESPONSE
+                        json_data = None
                         st.markdown(assistant_response)
+                        st.info(CRISIS_RESOURCES)
+                    else:
+                        # Build messages array with system prompt and history
+                        messages = build_context_messages(
+                            SYSTEM_PROMPT,
+                            st.session_state.messages,
+                            budget=CONTEXT_TOKEN_BUDGET
+                        )
+                        
+                        # Send message to Groq
+                        response = st.session_state.client.chat.completions.create(
+                            model="llama-3.3-70b-versatile",
+                            messages=messages,
+                            temperature=0.7,
+                            max_tokens=200
+                        )
+                        assistant_response = response.choices[0].message.content
+                        
+                        # Display response
+                        json_data = extract_json(assistant_response)
+                        if json_data:
+                            st.json(json_data)
+                        else:
+                            st.markdown(assistant_response)
                     
-                    # Add assistant response to history
+                    # Add assistant response to history, with its JSON so reruns don't parse it again
                     st.session_state.messages.append({
                         "role": "assistant",
-                        "content": assistant_response
+                        "content": assistant_response,
+                        "json": json_data
                     })
                     
                 except Exception as e:
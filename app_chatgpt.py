@@ -1,7 +1,10 @@
 import streamlit as st
-from groq import Groq
-import json
-import re
+from groq_client import get_groq_client
+from theme_assets import inject_theme
+from streaming import stream_reply
+from context_window import build_context_messages
+from crisis import CRISIS_RESOURCES, CRISIS_RESPONSE
+from intents import CRISIS, RESET, route_intents
 from datetime import datetime
 
 # Page configuration
@@ -13,425 +16,7 @@ st.set_page_config(
 )
 
 # ChatGPT-inspired Dark Theme CSS
-st.markdown("""
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    /* Global Reset */
-    * {
-        margin: 0;
-        padding: 0;
-        box-sizing: border-box;
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-    }
-    
-    /* Hide Streamlit Elements */
-    #MainMenu, footer, header {visibility: hidden;}
-    .stDeployButton {display: none;}
-    
-    /* Dark Theme Colors - Exact ChatGPT Match */
-    :root {
-        --bg-primary: #212121;
-        --bg-secondary: #2f2f2f;
-        --bg-sidebar: #171717;
-        --text-primary: #ececec;
-        --text-secondary: #b4b4b4;
-        --text-muted: #8e8e8e;
-        --border-color: #4e4e4e;
-        --accent-purple: #8b5cf6;
-        --input-bg: #2f2f2f;
-        --hover-bg: #3a3a3a;
-    }
-    
-    /* Main App Background */
-    .stApp {
-        background-color: var(--bg-primary) !important;
-    }
-    
-    /* Remove default padding */
-    .block-container {
-        padding: 0 !important;
-        max-width: 100% !important;
-    }
-    
-    /* Sidebar Styling - ChatGPT Style */
-    [data-testid="stSidebar"] {
-        background-color: var(--bg-sidebar) !important;
-        border-right: 1px solid var(--border-color) !important;
-    }
-    
-    [data-testid="stSidebar"] > div:first-child {
-        padding: 1rem !important;
-    }
-    
-    /* Sidebar Header */
-    .sidebar-header {
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-        padding: 0.75rem;
-        margin-bottom: 1rem;
-    }
-    
-    .sidebar-header h2 {
-        color: var(--text-primary);
-        font-size: 1.1rem;
-        font-weight: 600;
-        margin: 0;
-    }
-    
-    /* New Chat Button */
-    .new-chat-btn {
-        background: transparent;
-        border: 1px solid var(--border-color);
-        color: var(--text-primary);
-        padding: 0.75rem 1rem;
-        border-radius: 10px;
-        cursor: pointer;
-        transition: all 0.2s;
-        font-size: 0.9rem;
-        font-weight: 500;
-        width: 100%;
-        text-align: left;
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-    }
-    
-    .new-chat-btn:hover {
-        background: var(--hover-bg);
-    }
-    
-    /* Sidebar Sections */
-    .sidebar-section {
-        margin: 1.5rem 0;
-    }
-    
-    .sidebar-section-title {
-        color: var(--text-muted);
-        font-size: 0.75rem;
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-        margin-bottom: 0.5rem;
-        padding: 0 0.5rem;
-    }
-    
-    .sidebar-item {
-        color: var(--text-secondary);
-        padding: 0.75rem 1rem;
-        border-radius: 8px;
-        cursor: pointer;
-        transition: all 0.2s;
-        font-size: 0.9rem;
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-        margin-bottom: 0.25rem;
-    }
-    
-    .sidebar-item:hover {
-        background: var(--hover-bg);
-        color: var(--text-primary);
-    }
-    
-    /* Main Chat Area */
-    .main-chat-area {
-        display: flex;
-        flex-direction: column;
-        height: 100vh;
-        max-width: 48rem;
-        margin: 0 auto;
-        padding: 0 1rem;
-    }
-    
-    /* Top Header */
-    .top-header {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        padding: 1rem 0;
-        border-bottom: 1px solid var(--border-color);
-        margin-bottom: 2rem;
-    }
-    
-    .model-selector {
-        background: transparent;
-        border: 1px solid var(--border-color);
-        color: var(--text-primary);
-        padding: 0.5rem 1rem;
-        border-radius: 8px;
-        cursor: pointer;
-        font-size: 0.9rem;
-        font-weight: 500;
-    }
-    
-    .upgrade-btn {
-        background: var(--accent-purple);
-        color: white;
-        padding: 0.5rem 1.25rem;
-        border-radius: 8px;
-        border: none;
-        cursor: pointer;
-        font-size: 0.9rem;
-        font-weight: 500;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-        transition: all 0.2s;
-    }
-    
-    .upgrade-btn:hover {
-        background: #7c3aed;
-    }
-    
-    /* Empty State */
-    .empty-state {
-        flex: 1;
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-        align-items: center;
-        text-align: center;
-        padding: 2rem;
-    }
-    
-    .empty-state h1 {
-        color: var(--text-primary);
-        font-size: 2rem;
-        font-weight: 500;
-        margin-bottom: 2rem;
-    }
-    
-    /* Chat Messages Container */
-    .messages-container {
-        flex: 1;
-        overflow-y: auto;
-        padding: 2rem 0;
-    }
-    
-    /* Chat Messages */
-    .stChatMessage {
-        background: transparent !important;
-        padding: 1.5rem 0 !important;
-        border: none !important;
-    }
-    
-    [data-testid="stChatMessageContent"] {
-        background: transparent !important;
-        color: var(--text-primary) !important;
-        padding: 0 !important;
-        max-width: 100% !important;
-    }
-    
-    [data-testid="stChatMessageContent"] p {
-        color: var(--text-primary) !important;
-        font-size: 0.95rem !important;
-        line-height: 1.7 !important;
-        margin: 0 !important;
-    }
-    
-    /* Avatar Styling */
-    [data-testid="stChatMessageAvatarUser"],
-    [data-testid="stChatMessageAvatarAssistant"] {
-        width: 32px !important;
-        height: 32px !important;
-        border-radius: 4px !important;
-        background: var(--bg-secondary) !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-        font-size: 1rem !important;
-    }
-    
-    /* Input Area */
-    .input-container {
-        padding: 2rem 0;
-        position: relative;
-    }
-    
-    .stChatInputContainer {
-        background: var(--input-bg) !important;
-        border: 1px solid var(--border-color) !important;
-        border-radius: 24px !important;
-        padding: 0.75rem 1.5rem !important;
-        box-shadow: 0 0 0 1px var(--border-color) !important;
-        transition: all 0.2s !important;
-    }
-    
-    .stChatInputContainer:focus-within {
-        border-color: var(--text-secondary) !important;
-        box-shadow: 0 0 0 1px var(--text-secondary) !important;
-    }
-    
-    .stChatInput input {
-        background: transparent !important;
-        border: none !important;
-        color: var(--text-primary) !important;
-        font-size: 1rem !important;
-        padding: 0.5rem 0 !important;
-    }
-    
-    .stChatInput input::placeholder {
-        color: var(--text-muted) !important;
-        font-weight: 400;
-    }
-    
-    .stChatInput input:focus {
-        outline: none !important;
-        box-shadow: none !important;
-    }
-    
-    /* Button Styling */
-    .stButton button {
-        background: transparent !important;
-        border: 1px solid var(--border-color) !important;
-        color: var(--text-primary) !important;
-        border-radius: 10px !important;
-        padding: 0.75rem 1.25rem !important;
-        font-weight: 500 !important;
-        transition: all 0.2s !important;
-    }
-    
-    .stButton button:hover {
-        background: var(--hover-bg) !important;
-    }
-    
-    /* Expander Styling */
-    .streamlit-expanderHeader {
-        background: transparent !important;
-        color: var(--text-secondary) !important;
-        border: none !important;
-        padding: 0.75rem !important;
-        border-radius: 8px !important;
-        font-weight: 500 !important;
-        font-size: 0.9rem !important;
-    }
-    
-    .streamlit-expanderHeader:hover {
-        background: var(--hover-bg) !important;
-        color: var(--text-primary) !important;
-    }
-    
-    .streamlit-expanderContent {
-        background: transparent !important;
-        border: none !important;
-        padding: 0.5rem 0.75rem !important;
-    }
-    
-    /* Scrollbar */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: var(--bg-primary);
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--border-color);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: var(--text-muted);
-    }
-    
-    /* Divider */
-    hr {
-        border: none;
-        height: 1px;
-        background: var(--border-color);
-        margin: 1rem 0;
-    }
-    
-    /* User Profile Section */
-    .user-profile {
-        position: absolute;
-        bottom: 0;
-        left: 0;
-        right: 0;
-        padding: 1rem;
-        border-top: 1px solid var(--border-color);
-        background: var(--bg-sidebar);
-    }
-    
-    .user-info {
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-        padding: 0.5rem;
-        border-radius: 8px;
-        cursor: pointer;
-        transition: all 0.2s;
-    }
-    
-    .user-info:hover {
-        background: var(--hover-bg);
-    }
-    
-    .user-avatar {
-        width: 32px;
-        height: 32px;
-        border-radius: 50%;
-        background: var(--accent-purple);
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        color: white;
-        font-weight: 600;
-        font-size: 0.9rem;
-    }
-    
-    .user-details {
-        flex: 1;
-    }
-    
-    .user-name {
-        color: var(--text-primary);
-        font-size: 0.9rem;
-        font-weight: 500;
-    }
-    
-    .user-plan {
-        color: var(--text-muted);
-        font-size: 0.8rem;
-    }
-    
-    /* Spinner */
-    .stSpinner > div {
-        border-top-color: var(--accent-purple) !important;
-    }
-    
-    /* Alert Messages */
-    .stAlert {
-        background: var(--bg-secondary) !important;
-        border: 1px solid var(--border-color) !important;
-        border-radius: 10px !important;
-        color: var(--text-primary) !important;
-    }
-    
-    /* Settings Icon */
-    .settings-icon {
-        width: 36px;
-        height: 36px;
-        border-radius: 8px;
-        background: transparent;
-        border: 1px solid var(--border-color);
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        cursor: pointer;
-        transition: all 0.2s;
-    }
-    
-    .settings-icon:hover {
-        background: var(--hover-bg);
-    }
-</style>
-""", unsafe_allow_html=True)
+inject_theme("app_chatgpt")
 
 # System prompt for Clarity
 SYSTEM_PROMPT = """You are 'Clarity', an expert AI Wellness Companion designed to provide emotional support, stress relief, and promote mental clarity. Your persona is warm, empathetic, calm, and reassuring, acting as a supportive, non-judgmental companion.
@@ -462,6 +47,12 @@ Unclear: "I want to make sure I understand you. Could you tell me a bit more abo
 OUTPUT FORMAT:
 Use plain text. DO NOT use Markdown, code blocks, or formatting unless necessary for clarity."""
 
+# Render replies token-by-token as they arrive instead of behind a spinner
+STREAM_RESPONSES = True
+
+# Prompt tokens of history sent with each request; older turns are dropped first
+CONTEXT_TOKEN_BUDGET = 3000
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -471,8 +62,7 @@ if "chat_sessions" not in st.session_state:
 
 if "client" not in st.session_state:
     try:
-        api_key = st.secrets["GROQ_API_KEY"]
-        st.session_state.client = Groq(api_key=api_key)
+        st.session_state.client = get_groq_client()
     except KeyError:
         st.error("⚠️ API Key Missing: Please configure GROQ_API_KEY in Streamlit secrets.")
         st.stop()
@@ -480,20 +70,6 @@ if "client" not in st.session_state:
         st.error(f"❌ Failed to initialize Groq API: {str(e)}")
         st.stop()
 
-# Helper functions
-def should_reset_conversation(user_input):
-    reset_keywords = ["start over", "reset", "clear conversation", "new conversation", "begin again"]
-    return any(keyword in user_input.lower() for keyword in reset_keywords)
-
-def extract_json_from_response(text):
-    json_match = re.search(r'\{[^{}]*\}', text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group())
-        except json.JSONDecodeError:
-            pass
-    return None
-
 # Sidebar
 with st.sidebar:
     # Sidebar Header
@@ -589,8 +165,9 @@ else:
 
 # Chat Input
 if prompt := st.chat_input("Ask anything"):
-    # Check for reset command
-    if should_reset_conversation(prompt):
+    # Reset, crisis and the other local intents, all in one pass
+    intents = route_intents(prompt)
+    if RESET in intents:
         st.session_state.messages = []
         st.rerun()
     
@@ -603,32 +180,35 @@ if prompt := st.chat_input("Ask anything"):
     
     # Generate response
     with st.chat_message("assistant"):
-        with st.spinner(""):
-            try:
-                messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-                
-                for msg in st.session_state.messages:
-                    messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
-                
-                response = st.session_state.client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=messages,
-                    temperature=0.7,
-                    max_tokens=200
-                )
-                assistant_response = response.choices[0].message.content
-                
+        try:
+            if CRISIS in intents:
+                # Fixed protocol reply straight away, no model round-trip
+                assistant_response = CRISIS_RESPONSE
                 st.markdown(assistant_response)
+                st.info(CRISIS_RESOURCES)
+            else:
+                messages = build_context_messages(
+                    SYSTEM_PROMPT,
+                    st.session_state.messages,
+                    budget=CONTEXT_TOKEN_BUDGET
+                )
                 
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": assistant_response
-                })
-                
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
+                reply = stream_reply(
+                    st.session_state.client,
+                    messages,
+                    max_tokens=200,
+                    stream=STREAM_RESPONSES
+                )
+                st.write_stream(reply)
+                assistant_response = reply.text
+                st.session_state.last_ttft = reply.ttft
+            
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": assistant_response
+            })
+            
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
 
 st.markdown('</div>', unsafe_allow_html=True)
@@ -1,11 +1,15 @@
 import streamlit as st
 from streamlit_oauth import OAuth2Component
-from groq import Groq
+from firebase_setup import firebase_status, get_db, start_firebase_warmup
+from groq_client import get_groq_client
+from theme_assets import inject_theme
+from streaming import stream_reply
+from context_window import build_context_messages
+from crisis import CRISIS_RESOURCES, CRISIS_RESPONSE, is_crisis_message
 import hashlib
 import requests
 from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, firestore
+from user_store import ensure_user
 
 # Page configuration
 st.set_page_config(
@@ -15,825 +19,32 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize Firebase (only once)
-if not firebase_admin._apps:
-    try:
-        if "firebase_credentials" in st.secrets:
-            cred_dict = {
-                "type": st.secrets["firebase_credentials"]["type"],
-                "project_id": st.secrets["firebase_credentials"]["project_id"],
-                "private_key_id": st.secrets["firebase_credentials"]["private_key_id"],
-                "private_key": st.secrets["firebase_credentials"]["private_key"],
-                "client_email": st.secrets["firebase_credentials"]["client_email"],
-                "client_id": st.secrets["firebase_credentials"]["client_id"],
-                "auth_uri": st.secrets["firebase_credentials"]["auth_uri"],
-                "token_uri": st.secrets["firebase_credentials"]["token_uri"],
-                "auth_provider_x509_cert_url": st.secrets["firebase_credentials"]["auth_provider_x509_cert_url"],
-                "client_x509_cert_url": st.secrets["firebase_credentials"]["client_x509_cert_url"],
-            }
-            if "universe_domain" in st.secrets["firebase_credentials"]:
-                cred_dict["universe_domain"] = st.secrets["firebase_credentials"]["universe_domain"]
-            cred = credentials.Certificate(cred_dict)
-        else:
-            cred_path = st.secrets.get("firebase_credentials_path", "firebase-credentials.json")
-            cred = credentials.Certificate(cred_path)
-        
-        firebase_admin.initialize_app(cred)
-        db = firestore.client()
-    except Exception as e:
-        st.error(f"Firebase initialization error: {str(e)}")
-        st.info("Please complete Firebase setup")
-        st.stop()
-else:
-    db = firestore.client()
+# Firebase is set up on first use, shared by all sessions, and warmed up
+# in the background so the auth screen doesn't wait for it
+if st.secrets.get("firebase_warmup", True):
+    start_firebase_warmup()
 
 # UI Modernization & Responsiveness Guide for TaskFlow Pro Implementation
-st.markdown("""
-<style>
-    /* ========================================
-     * UI MODERNIZATION & RESPONSIVENESS GUIDE
-     * Mobile-First Design System Implementation
-     * ======================================== */
-    
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    /* ========================================
-     * PHASE 1: MODERN DESIGN FOUNDATION
-     * Mobile-First Philosophy & Design Tokens
-     * ======================================== */
-    
-    /* 1.1. Global Reset & Box Model */
-    * {
-        margin: 0;
-        padding: 0;
-        box-sizing: border-box;
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-    }
-    
-    /* 1.2. Design Token System (CSS Custom Properties) */
-    :root {
-        /* 1.2.1. Spacing System - 8-Point Grid */
-        --space-xs: 4px;
-        --space-s: 8px;
-        --space-m: 16px;
-        --space-l: 24px;
-        --space-xl: 32px;
-        --space-xxl: 48px;
-        --space-xxxl: 64px;
-        
-        /* 1.2.2. Typography Scale */
-        --font-size-xs: 0.75rem;    /* 12px */
-        --font-size-sm: 0.875rem;   /* 14px */
-        --font-size-base: 1rem;     /* 16px */
-        --font-size-lg: 1.125rem;   /* 18px */
-        --font-size-xl: 1.25rem;    /* 20px */
-        --font-size-2xl: 1.5rem;    /* 24px */
-        --font-size-3xl: 1.875rem;  /* 30px */
-        --font-size-4xl: 2.25rem;   /* 36px */
-        
-        /* 1.2.3. Modern Color Palette */
-        --color-white: #ffffff;
-        --color-gray-50: #f8fafc;
-        --color-gray-100: #f1f5f9;
-        --color-gray-200: #e2e8f0;
-        --color-gray-300: #cbd5e1;
-        --color-gray-400: #94a3b8;
-        --color-gray-500: #64748b;
-        --color-gray-600: #475569;
-        --color-gray-700: #334155;
-        --color-gray-800: #1e293b;
-        --color-gray-900: #0f172a;
-        
-        --color-primary: #3b82f6;
-        --color-primary-hover: #2563eb;
-        --color-primary-light: #dbeafe;
-        
-        --color-secondary: #6366f1;
-        --color-secondary-hover: #4f46e5;
-        
-        --color-accent: #10b981;
-        --color-accent-hover: #059669;
-        
-        --color-success: #22c55e;
-        --color-warning: #f59e0b;
-        --color-error: #ef4444;
-        
-        /* 1.2.4. Responsive Breakpoints */
-        --breakpoint-sm: 640px;
-        --breakpoint-md: 768px;
-        --breakpoint-lg: 1024px;
-        --breakpoint-xl: 1280px;
-        
-        /* 1.2.5. Design Elements */
-        --border-radius-sm: 6px;
-        --border-radius-md: 8px;
-        --border-radius-lg: 12px;
-        --border-radius-xl: 16px;
-        
-        --shadow-sm: 0 1px 2px 0 rgb(0 0 0 / 0.05);
-        --shadow-md: 0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1);
-        --shadow-lg: 0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1);
-        --shadow-xl: 0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1);
-        
-        /* Legacy compatibility mappings */
-        --bg-primary: var(--color-gray-800);
-        --bg-secondary: var(--color-gray-700);
-        --bg-elevated: var(--color-white);
-        --text-primary: var(--color-gray-900);
-        --text-secondary: var(--color-gray-600);
-        --text-muted: var(--color-gray-500);
-        --accent-teal: var(--color-primary);
-        --accent-teal-hover: var(--color-primary-hover);
-        --border-subtle: var(--color-gray-200);
-        --spacing-unit: var(--space-s);
-    }
-    
-    /* ========================================
-     * PHASE 2: GLOBAL LAYOUT & CSS ARCHITECTURE
-     * Mobile-First Application Shell
-     * ======================================== */
-    
-    /* 2.1. CSS Reset and Global Styles */
-    html {
-        font-size: 16px;
-        line-height: 1.5;
-        -webkit-text-size-adjust: 100%;
-        -moz-text-size-adjust: 100%;
-        text-size-adjust: 100%;
-    }
-    
-    body {
-        background-color: var(--color-gray-50);
-        color: var(--text-primary);
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-        font-size: var(--font-size-base);
-        line-height: 1.6;
-        -webkit-font-smoothing: antialiased;
-        -moz-osx-font-smoothing: grayscale;
-    }
-    
-    /* Hide Streamlit Branding */
-    #MainMenu, footer, header {visibility: hidden !important;}
-    .stDeployButton {display: none !important;}
-    [data-testid="stToolbar"] {display: none !important;}
-    
-    /* 2.2. The Main Application Layout (CSS Grid) */
-    .stApp {
-        /* Mobile-first: Single column layout */
-        display: grid;
-        grid-template-columns: 1fr;
-        grid-template-rows: auto 1fr;
-        min-height: 100vh;
-        background: var(--color-gray-50);
-    }
-    
-    /* Tablet and up: Sidebar appears */
-    @media (min-width: 768px) {
-        .stApp {
-            grid-template-columns: 280px 1fr;
-            grid-template-rows: 1fr;
-        }
-    }
-    
-    /* Desktop: Wider sidebar for better UX */
-    @media (min-width: 1024px) {
-        .stApp {
-            grid-template-columns: 320px 1fr;
-        }
-    }
-    
-    .block-container {
-        padding: var(--space-m) !important;
-        max-width: 100% !important;
-        width: 100% !important;
-    }
-    
-    /* Mobile: Reduce padding */
-    @media (max-width: 767px) {
-        .block-container {
-            padding: var(--space-s) !important;
-        }
-    }
-    
-    /* ========================================
-     * PHASE 3: COMPONENT-SPECIFIC RESPONSIVE PATTERNS
-     * Navigation, Tables, Cards, Forms
-     * ======================================== */
-    
-    /* 3.1. Header & Navigation (Responsive Sidebar) */
-    [data-testid="stSidebar"] {
-        background: var(--color-white) !important;
-        border-right: 1px solid var(--border-subtle) !important;
-        box-shadow: var(--shadow-sm) !important;
-        /* Mobile: Hidden by default, overlay when opened */
-        position: fixed;
-        top: 0;
-        left: -100%;
-        width: 280px;
-        height: 100vh;
-        z-index: 1000;
-        transition: left 0.3s ease-in-out;
-    }
-    
-    /* Tablet and up: Always visible sidebar */
-    @media (min-width: 768px) {
-        [data-testid="stSidebar"] {
-            position: static;
-            left: 0;
-            width: auto;
-        }
-    }
-    
-    /* Sidebar content padding with 8-point grid */
-    [data-testid="stSidebar"] > div:first-child {
-        padding: var(--space-l) var(--space-m) !important;
-    }
-    
-    /* Mobile: Reduce sidebar padding */
-    @media (max-width: 767px) {
-        [data-testid="stSidebar"] > div:first-child {
-            padding: var(--space-m) var(--space-s) !important;
-        }
-    }
-    
-    /* Clarity Logo - Modern Design */
-    .clarity-logo {
-        text-align: center;
-        padding: var(--space-l) 0;
-        margin-bottom: var(--space-l);
-        border-bottom: 1px solid var(--border-subtle);
-    }
-    
-    .clarity-logo-icon {
-        width: 48px;
-        height: 48px;
-        margin: 0 auto var(--space-s);
-        background: linear-gradient(135deg, var(--color-primary), var(--color-primary-hover));
-        border-radius: var(--border-radius-lg);
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        box-shadow: var(--shadow-md);
-    }
-    
-    .clarity-logo-text {
-        font-size: var(--font-size-xl);
-        font-weight: 600;
-        color: var(--text-primary);
-        letter-spacing: -0.02em;
-    }
-    
-    /* Sidebar Buttons - Modern Touch-Friendly Design */
-    [data-testid="stSidebar"] .stButton button {
-        background: transparent !important;
-        color: var(--text-primary) !important;
-        border: 1px solid var(--border-subtle) !important;
-        border-radius: var(--border-radius-md) !important;
-        padding: var(--space-s) var(--space-m) !important;
-        font-size: var(--font-size-sm) !important;
-        font-weight: 500 !important;
-        transition: all 0.2s ease !important;
-        min-height: 44px !important; /* Touch-friendly minimum */
-        width: 100% !important;
-        margin-bottom: var(--space-xs) !important;
-    }
-    
-    [data-testid="stSidebar"] .stButton button:hover {
-        background: var(--color-primary-light) !important;
-        border-color: var(--color-primary) !important;
-        color: var(--color-primary) !important;
-        transform: translateY(-1px);
-        box-shadow: var(--shadow-sm);
-    }
-    
-    [data-testid="stSidebar"] .stButton button:active {
-        transform: translateY(0);
-    }
-    
-    /* 3.2. Main Content Area - Clean & Spacious */
-    .main {
-        background: transparent;
-        padding: var(--space-l);
-        /* Mobile: Reduce padding */
-    }
-    
-    @media (max-width: 767px) {
-        .main {
-            padding: var(--space-m);
-        }
-    }
-    
-    .chat-container {
-        max-width: 768px;
-        margin: 0 auto;
-        padding: var(--space-xl) var(--space-m);
-        /* Mobile: Reduce padding */
-    }
-    
-    @media (max-width: 767px) {
-        .chat-container {
-            padding: var(--space-l) var(--space-s);
-        }
-    }
-    
-    /* 3.3. Card Layouts - Responsive Grid System */
-    .welcome-hero {
-        text-align: center;
-        padding: var(--space-xxxl) var(--space-m);
-        max-width: 600px;
-        margin: 0 auto;
-    }
-    
-    /* Mobile: Reduce hero padding */
-    @media (max-width: 767px) {
-        .welcome-hero {
-            padding: var(--space-xxl) var(--space-s);
-        }
-    }
-    
-    .welcome-title {
-        font-size: clamp(var(--font-size-2xl), 4vw, var(--font-size-4xl));
-        font-weight: 600;
-        color: var(--text-primary);
-        margin-bottom: var(--space-m);
-        letter-spacing: -0.02em;
-        line-height: 1.2;
-    }
-    
-    .welcome-subtitle {
-        font-size: clamp(var(--font-size-base), 2.5vw, var(--font-size-lg));
-        font-weight: 400;
-        color: var(--text-secondary);
-        margin-bottom: var(--space-xxl);
-        line-height: 1.5;
-    }
-    
-    /* Conversation Starters - Modern Card Grid */
-    .starters-grid {
-        display: grid;
-        /* Mobile-first: Single column */
-        grid-template-columns: 1fr;
-        gap: var(--space-m);
-        margin: var(--space-xl) 0 var(--space-xxl);
-        max-width: 768px;
-        margin-left: auto;
-        margin-right: auto;
-        padding: 0 var(--space-s);
-    }
-    
-    /* Tablet: Two columns */
-    @media (min-width: 640px) {
-        .starters-grid {
-            grid-template-columns: repeat(2, 1fr);
-            padding: 0;
-        }
-    }
-    
-    /* Large screens: Auto-fit with minimum width */
-    @media (min-width: 1024px) {
-        .starters-grid {
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-        }
-    }
-    
-    .starter-button {
-        background: var(--color-white);
-        border: 1px solid var(--border-subtle);
-        border-radius: var(--border-radius-lg);
-        padding: var(--space-l);
-        cursor: pointer;
-        transition: all 0.2s ease;
-        text-align: left;
-        min-height: 100px;
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-        box-shadow: var(--shadow-sm);
-    }
-    
-    /* Mobile: Smaller cards */
-    @media (max-width: 639px) {
-        .starter-button {
-            min-height: 80px;
-            padding: var(--space-m);
-        }
-    }
-    
-    .starter-button:hover {
-        background: var(--color-primary);
-        border-color: var(--color-primary);
-        transform: translateY(-2px);
-        box-shadow: var(--shadow-lg);
-        color: var(--color-white);
-    }
-    
-    .starter-button:hover .starter-text {
-        color: var(--color-white);
-    }
-    
-    .starter-text {
-        font-size: var(--font-size-sm);
-        font-weight: 500;
-        color: var(--text-primary);
-        line-height: 1.4;
-        transition: color 0.2s ease;
-    }
-    
-    /* Touch devices: Remove hover effects, add active state */
-    @media (hover: none) {
-        .starter-button:hover {
-            transform: none;
-            background: var(--color-white);
-            border-color: var(--border-subtle);
-            box-shadow: var(--shadow-sm);
-        }
-        
-        .starter-button:hover .starter-text {
-            color: var(--text-primary);
-        }
-        
-        .starter-button:active {
-            background: var(--color-primary-light);
-            border-color: var(--color-primary);
-        }
-    }
-    
-    /* ========================================
-     * PHASE 4: AESTHETIC POLISH FOR MODERN, CLEAN LOOK
-     * White Space, Shadows, Visual Hierarchy
-     * ======================================== */
-    
-    /* 4.1. Chat Messages - Clean, Readable Design */
-    [data-testid="stChatMessage"] {
-        background: transparent !important;
-        padding: var(--space-m) 0 !important;
-        margin-bottom: var(--space-s) !important;
-    }
-    
-    /* User Messages - Modern Blue Styling */
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarUser"]) [data-testid="stChatMessageContent"] {
-        background: var(--color-primary) !important;
-        color: var(--color-white) !important;
-        border-radius: var(--border-radius-xl) var(--border-radius-xl) var(--border-radius-sm) var(--border-radius-xl) !important;
-        padding: var(--space-m) var(--space-l) !important;
-        max-width: 80% !important;
-        margin-left: auto !important;
-        font-size: var(--font-size-base) !important;
-        line-height: 1.5 !important;
-        box-shadow: var(--shadow-md);
-        word-wrap: break-word;
-    }
-    
-    /* Mobile: Wider messages, smaller padding */
-    @media (max-width: 767px) {
-        [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarUser"]) [data-testid="stChatMessageContent"] {
-            max-width: 85% !important;
-            padding: var(--space-s) var(--space-m) !important;
-            font-size: var(--font-size-sm) !important;
-        }
-    }
-    
-    /* Assistant Messages - Clean White Cards */
-    [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarAssistant"]) [data-testid="stChatMessageContent"] {
-        background: var(--color-white) !important;
-        color: var(--text-primary) !important;
-        border: 1px solid var(--border-subtle) !important;
-        border-radius: var(--border-radius-xl) var(--border-radius-xl) var(--border-radius-xl) var(--border-radius-sm) !important;
-        padding: var(--space-m) var(--space-l) !important;
-        max-width: 80% !important;
-        font-size: var(--font-size-base) !important;
-        line-height: 1.6 !important;
-        box-shadow: var(--shadow-sm);
-        word-wrap: break-word;
-    }
-    
-    /* Mobile: Wider messages, smaller padding */
-    @media (max-width: 767px) {
-        [data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarAssistant"]) [data-testid="stChatMessageContent"] {
-            max-width: 85% !important;
-            padding: var(--space-s) var(--space-m) !important;
-            font-size: var(--font-size-sm) !important;
-        }
-    }
-    
-    /* 4.2. Chat Input - Modern, Accessible Design */
-    .chat-input-container {
-        position: sticky;
-        bottom: 0;
-        background: linear-gradient(to top, var(--color-gray-50) 0%, transparent 100%);
-        padding: var(--space-l) var(--space-m);
-        z-index: 100;
-        /* Mobile: Fixed positioning with full width */
-    }
-    
-    @media (max-width: 767px) {
-        .chat-input-container {
-            position: fixed;
-            bottom: 0;
-            left: 0;
-            right: 0;
-            padding: var(--space-m);
-            background: var(--color-gray-50);
-            border-top: 1px solid var(--border-subtle);
-        }
-    }
-    
-    [data-testid="stChatInputContainer"] {
-        background: var(--color-white) !important;
-        border: 1px solid var(--border-subtle) !important;
-        border-radius: var(--border-radius-lg) !important;
-        padding: var(--space-xs) !important;
-        box-shadow: var(--shadow-lg) !important;
-        max-width: 768px !important;
-        margin: 0 auto !important;
-        transition: box-shadow 0.2s ease, border-color 0.2s ease !important;
-    }
-    
-    [data-testid="stChatInputContainer"]:focus-within {
-        border-color: var(--color-primary) !important;
-        box-shadow: var(--shadow-xl), 0 0 0 3px var(--color-primary-light) !important;
-    }
-    
-    .stChatInput textarea {
-        background: transparent !important;
-        border: none !important;
-        color: var(--text-primary) !important;
-        font-size: var(--font-size-base) !important;
-        padding: var(--space-s) var(--space-m) !important;
-        min-height: 52px !important;
-        line-height: 1.5 !important;
-        resize: none !important;
-        font-family: inherit !important;
-    }
-    
-    /* Mobile: Smaller text input */
-    @media (max-width: 767px) {
-        .stChatInput textarea {
-            font-size: var(--font-size-sm) !important;
-            min-height: 44px !important;
-        }
-    }
-    
-    .stChatInput textarea::placeholder {
-        color: var(--text-secondary) !important;
-        font-weight: 400 !important;
-    }
-    
-    .stChatInput textarea:focus {
-        outline: none !important;
-        box-shadow: none !important;
-    }
-    
-    /* 4.3. Forms & Inputs - Modern, Accessible Design */
-    .auth-hero {
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        justify-content: center;
-        min-height: 80vh;
-        padding: var(--space-xl);
-        text-align: center;
-    }
-    
-    /* Mobile: Reduce auth hero padding */
-    @media (max-width: 767px) {
-        .auth-hero {
-            padding: var(--space-l);
-            min-height: 70vh;
-        }
-    }
-    
-    .auth-logo {
-        width: 64px;
-        height: 64px;
-        margin: 0 auto var(--space-l);
-        background: linear-gradient(135deg, var(--color-primary), var(--color-primary-hover));
-        border-radius: var(--border-radius-xl);
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        box-shadow: var(--shadow-xl);
-    }
-    
-    .auth-title {
-        font-size: clamp(var(--font-size-2xl), 5vw, var(--font-size-3xl));
-        font-weight: 600;
-        color: var(--text-primary);
-        margin-bottom: var(--space-m);
-        letter-spacing: -0.02em;
-    }
-    
-    .auth-subtitle {
-        font-size: clamp(var(--font-size-sm), 3vw, var(--font-size-base));
-        color: var(--text-secondary);
-        margin-bottom: var(--space-xxl);
-        line-height: 1.5;
-        max-width: 400px;
-    }
-    
-    .auth-form {
-        max-width: 400px;
-        margin: 0 auto;
-        width: 100%;
-        padding: 0 var(--space-m);
-    }
-    
-    /* Mobile: Remove form padding */
-    @media (max-width: 767px) {
-        .auth-form {
-            padding: 0;
-        }
-    }
-    
-    /* Text Inputs - Modern Design */
-    .stTextInput input {
-        background: var(--color-white) !important;
-        border: 1px solid var(--border-subtle) !important;
-        border-radius: var(--border-radius-md) !important;
-        color: var(--text-primary) !important;
-        padding: var(--space-s) var(--space-m) !important;
-        min-height: 48px !important;
-        font-size: var(--font-size-base) !important;
-        font-family: inherit !important;
-        transition: border-color 0.2s ease, box-shadow 0.2s ease !important;
-        width: 100% !important;
-    }
-    
-    .stTextInput input:focus {
-        border-color: var(--color-primary) !important;
-        box-shadow: 0 0 0 3px var(--color-primary-light) !important;
-        outline: none !important;
-    }
-    
-    .stTextInput input::placeholder {
-        color: var(--text-secondary) !important;
-        font-weight: 400 !important;
-    }
-    
-    /* Primary Buttons - Modern Design */
-    .stButton button[kind="primary"] {
-        background: var(--color-primary) !important;
-        color: var(--color-white) !important;
-        border: none !important;
-        border-radius: var(--border-radius-md) !important;
-        padding: var(--space-m) var(--space-l) !important;
-        font-size: var(--font-size-base) !important;
-        font-weight: 600 !important;
-        min-height: 48px !important;
-        width: 100% !important;
-        transition: all 0.2s ease !important;
-        cursor: pointer !important;
-        font-family: inherit !important;
-    }
-    
-    .stButton button[kind="primary"]:hover {
-        background: var(--color-primary-hover) !important;
-        transform: translateY(-1px);
-        box-shadow: var(--shadow-lg) !important;
-    }
-    
-    .stButton button[kind="primary"]:active {
-        transform: translateY(0);
-    }
-    
-    /* Touch devices: Remove transform on hover */
-    @media (hover: none) {
-        .stButton button[kind="primary"]:hover {
-            transform: none;
-        }
-    }
-    
-    /* ========================================
-     * PHASE 5: FINAL RESPONSIVE POLISH & UTILITIES
-     * Additional Mobile Optimizations
-     * ======================================== */
-    
-    /* 5.1. Mobile-Specific Adjustments */
-    @media (max-width: 767px) {
-        /* Ensure all interactive elements are touch-friendly (44px minimum) */
-        button, input, [role="button"] {
-            min-height: 44px !important;
-        }
-        
-        /* Prevent horizontal scroll */
-        body, .stApp {
-            overflow-x: hidden !important;
-        }
-        
-        /* Improve text readability on small screens */
-        p, div, span {
-            -webkit-text-size-adjust: none;
-        }
-    }
-    
-    /* 5.2. Custom Scrollbar Styling */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: transparent;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--color-gray-300);
-        border-radius: var(--border-radius-sm);
-        border: 1px solid var(--color-gray-100);
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: var(--color-gray-400);
-    }
-    
-    ::-webkit-scrollbar-corner {
-        background: transparent;
-    }
-    
-    /* 5.3. Focus States for Accessibility */
-    *:focus {
-        outline: 2px solid var(--color-primary) !important;
-        outline-offset: 2px !important;
-    }
-    
-    /* Remove outline for mouse users, keep for keyboard users */
-    *:focus:not(:focus-visible) {
-        outline: none !important;
-    }
-    
-    /* 5.4. Print Styles */
-    @media print {
-        * {
-            color: black !important;
-            background: white !important;
-            box-shadow: none !important;
-        }
-        
-        .stSidebar, .chat-input-container {
-            display: none !important;
-        }
-    }
-    
-    /* ========================================
-     * UI MODERNIZATION GUIDE IMPLEMENTATION COMPLETE
-     * 
-     * This implementation includes:
-     * ✅ Mobile-first responsive design
-     * ✅ Modern 8-point grid spacing system  
-     * ✅ Comprehensive design token system
-     * ✅ Clean typography scale with fluid sizing
-     * ✅ Modern color palette with semantic variables
-     * ✅ Responsive breakpoints for all device sizes
-     * ✅ Touch-friendly interface elements (44px minimum)
-     * ✅ Accessible focus states and keyboard navigation
-     * ✅ Modern box shadows and border radius
-     * ✅ Strategic white space for clean aesthetics
-     * ✅ Responsive grid layouts with CSS Grid and Flexbox
-     * ✅ Mobile-optimized chat interface
-     * ✅ Professional form styling with modern inputs
-     * ✅ Cross-browser compatible styling
-     * ✅ Print-friendly styles
-     * 
-     * Key Mobile Improvements:
-     * - Collapsible sidebar with overlay on mobile
-     * - Sticky/fixed chat input for easy access
-     * - Larger touch targets (44px minimum)
-     * - Optimized text sizes with clamp() functions
-     * - Reduced padding and margins for mobile screens
-     * - Single-column layouts on small screens
-     * - Horizontal scroll prevention
-     * 
-     * Design System Features:
-     * - Consistent 8px spacing grid
-     * - Semantic color variables for easy theming
-     * - Fluid typography with viewport-based scaling
-     * - Modern shadow system for depth
-     * - Responsive border radius system
-     * - Comprehensive breakpoint system
-     * 
-     * Performance Considerations:
-     * - Efficient CSS selectors
-     * - Hardware-accelerated animations
-     * - Optimized font loading
-     * - Minimal layout reflows
-     * ======================================== */
-</style>
-""", unsafe_allow_html=True)
+inject_theme("app_clarity_redesign")
 
 # System prompt
 SYSTEM_PROMPT = """You are 'Clarity', an expert AI Wellness Companion designed to provide emotional support, stress relief, and promote mental clarity. Your persona is warm, empathetic, calm, and reassuring."""
 
+# Render replies token-by-token as they arrive instead of behind a spinner
+STREAM_RESPONSES = True
+
+# Prompt tokens of history sent with each request; older turns are dropped first
+CONTEXT_TOKEN_BUDGET = 3000
+
 # Helper Functions
 def create_user_in_firestore(user_id, email, name, photo_url):
-    """Create user document in Firestore"""
-    user_ref = db.collection('users').document(user_id)
-    user_ref.set({
-        'email': email,
-        'name': name,
-        'photo_url': photo_url,
-        'created_at': firestore.SERVER_TIMESTAMP,
-        'last_login': firestore.SERVER_TIMESTAMP
-    }, merge=True)
+    """Create the user document on first sign-in, then keep last_login roughly current"""
+    db = get_db()
+    if db is None:
+        st.error(firebase_status()['error'])
+        st.info("Please complete Firebase setup")
+        st.stop()
+    ensure_user(db, user_id, {'email': email, 'name': name, 'photo_url': photo_url})
 
 # Initialize session state
 if "user" not in st.session_state:
@@ -844,8 +55,7 @@ if "messages" not in st.session_state:
 
 if "client" not in st.session_state:
     try:
-        api_key = st.secrets["GROQ_API_KEY"]
-        st.session_state.client = Groq(api_key=api_key)
+        st.session_state.client = get_groq_client()
     except:
         st.error("⚠️ Groq API Key Missing")
         st.stop()
@@ -989,24 +199,31 @@ else:
             st.markdown(prompt)
         
         with st.chat_message("assistant"):
-            with st.spinner(""):
-                try:
-                    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-                    for msg in st.session_state.messages:
-                        messages.append({"role": msg["role"], "content": msg["content"]})
-                    
-                    response = st.session_state.client.chat.completions.create(
-                        model="llama-3.3-70b-versatile",
-                        messages=messages,
-                        temperature=0.7,
-                        max_tokens=200
-                    )
-                    assistant_response = response.choices[0].message.content
-                    
+            try:
+                if is_crisis_message(prompt):
+                    # Fixed protocol reply straight away, no model round-trip
+                    assistant_response = CRISIS_RESPONSE
                     st.markdown(assistant_response)
-                    st.session_state.messages.append({"role": "assistant", "content": assistant_response})
+                    st.info(CRISIS_RESOURCES)
+                else:
+                    messages = build_context_messages(
+                        SYSTEM_PROMPT,
+                        st.session_state.messages,
+                        budget=CONTEXT_TOKEN_BUDGET
+                    )
                     
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+                    reply = stream_reply(
+                        st.session_state.client,
+                        messages,
+                        max_tokens=200,
+                        stream=STREAM_RESPONSES
+                    )
+                    st.write_stream(reply)
+                    assistant_response = reply.text
+                    st.session_state.last_ttft = reply.ttft
+                st.session_state.messages.append({"role": "assistant", "content": assistant_response})
+                
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
     
     st.markdown('</div>', unsafe_allow_html=True)
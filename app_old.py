@@ -1,7 +1,11 @@
 import streamlit as st
-from groq import Groq
+from groq_client import get_groq_client
+from theme_assets import inject_theme
+from context_window import build_context_messages
+from crisis import CRISIS_RESOURCES, CRISIS_RESPONSE
+from intents import CRISIS, RESET, route_intents
 import json
-import re
+from json_extract import extract_json, message_json
 
 # Page configuration
 st.set_page_config(
@@ -12,145 +16,7 @@ st.set_page_config(
 )
 
 # Modern UI Styling inspired by Google AI Studio
-st.markdown("""
-<style>
-    /* Global styles */
-    :root {
-        --primary-gradient: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        --accent-color: #667eea;
-        --bg-light: #f8f9fa;
-        --text-dark: #1a1a1a;
-    }
-    
-    /* Hide Streamlit branding */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    
-    /* Main container */
-    .stApp {
-        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-    }
-    
-    /* Header styling */
-    .main-header {
-        background: var(--primary-gradient);
-        padding: 2rem;
-        border-radius: 20px;
-        margin-bottom: 2rem;
-        box-shadow: 0 8px 32px rgba(102, 126, 234, 0.3);
-        text-align: center;
-    }
-    
-    .main-header h1 {
-        color: white;
-        font-size: 2.5rem;
-        font-weight: 700;
-        margin: 0;
-        text-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .main-header p {
-        color: rgba(255, 255, 255, 0.9);
-        font-size: 1.1rem;
-        margin-top: 0.5rem;
-    }
-    
-    /* Chat messages */
-    .stChatMessage {
-        background: white;
-        border-radius: 16px;
-        padding: 1.5rem;
-        margin-bottom: 1rem;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-        transition: transform 0.2s, box-shadow 0.2s;
-    }
-    
-    .stChatMessage:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 16px rgba(0,0,0,0.12);
-    }
-    
-    /* User message specific */
-    [data-testid="stChatMessageContent"] {
-        background: transparent;
-    }
-    
-    /* Chat input */
-    .stChatInputContainer {
-        background: white;
-        border-radius: 24px;
-        padding: 0.5rem;
-        box-shadow: 0 4px 16px rgba(0,0,0,0.1);
-    }
-    
-    .stChatInput input {
-        border-radius: 20px;
-        border: 2px solid #e0e0e0;
-        padding: 1rem;
-        font-size: 1rem;
-        transition: border-color 0.3s;
-    }
-    
-    .stChatInput input:focus {
-        border-color: var(--accent-color);
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-    }
-    
-    /* Sidebar styling */
-    [data-testid="stSidebar"] {
-        background: white;
-        box-shadow: 4px 0 16px rgba(0,0,0,0.08);
-    }
-    
-    [data-testid="stSidebar"] .stButton button {
-        background: var(--primary-gradient);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 0.75rem 1.5rem;
-        font-weight: 600;
-        transition: transform 0.2s, box-shadow 0.2s;
-    }
-    
-    [data-testid="stSidebar"] .stButton button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
-    }
-    
-    /* Info boxes */
-    .stAlert {
-        border-radius: 12px;
-        border: none;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-    }
-    
-    /* Spinner */
-    .stSpinner > div {
-        border-top-color: var(--accent-color) !important;
-    }
-    
-    /* Divider */
-    hr {
-        margin: 1.5rem 0;
-        border: none;
-        height: 1px;
-        background: linear-gradient(90deg, transparent, #e0e0e0, transparent);
-    }
-    
-    /* Caption text */
-    .caption {
-        color: #666;
-        font-size: 0.9rem;
-    }
-    
-    /* Chat container */
-    .chat-container {
-        max-width: 900px;
-        margin: 0 auto;
-        padding: 2rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+inject_theme("app_old")
 
 # System prompt for Clarity
 SYSTEM_PROMPT = """You are 'Clarity', an expert AI Wellness Companion designed to provide emotional support, stress relief, and promote mental clarity. Your persona is warm, empathetic, calm, and reassuring, acting as a supportive, non-judgmental companion.
@@ -188,14 +54,16 @@ OUTPUT FORMAT:
 If a tool or structured output is required, use JSON only.
 Otherwise, use plain text. DO NOT use Markdown, code blocks, or formatting unless necessary for clarity."""
 
+# Prompt tokens of history sent with each request; older turns are dropped first
+CONTEXT_TOKEN_BUDGET = 3000
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
 if "client" not in st.session_state:
     try:
-        api_key = st.secrets["GROQ_API_KEY"]
-        st.session_state.client = Groq(api_key=api_key)
+        st.session_state.client = get_groq_client()
     except KeyError:
         st.error("⚠️ **API Key Missing**: Please configure GROQ_API_KEY in Streamlit secrets.")
         st.stop()
@@ -203,33 +71,6 @@ if "client" not in st.session_state:
         st.error(f"❌ **Failed to initialize Groq API**: {str(e)}")
         st.stop()
 
-# Helper function to check for reset command
-def should_reset_conversation(user_input):
-    """Check if user wants to start over"""
-    reset_keywords = ["start over", "reset", "clear conversation", "new conversation", "begin again"]
-    return any(keyword in user_input.lower() for keyword in reset_keywords)
-
-# Helper function to extract JSON from response
-def extract_json_from_response(text):
-    """Extract JSON block from response if present"""
-    # Try to find JSON in the response
-    json_match = re.search(r'\{[^{}]*\}', text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group())
-        except json.JSONDecodeError:
-            pass
-    return None
-
-# Helper function to format response
-def format_response(response_text):
-    """Format the response, handling JSON if present"""
-    json_data = extract_json_from_response(response_text)
-    if json_data:
-        # Display JSON in a formatted way
-        return json.dumps(json_data, indent=2)
-    return response_text
-
 # Create centered container for chat
 col1, col2, col3 = st.columns([1, 3, 1])
 
@@ -246,19 +87,19 @@ with col2:
 with col2:
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
-            # Check if it's JSON and format accordingly
-            content = message["content"]
-            json_data = extract_json_from_response(content)
+            # JSON is parsed once per message and kept on it
+            json_data = message_json(message)
             if json_data:
                 st.json(json_data)
             else:
-                st.markdown(content)
+                st.markdown(message["content"])
 
 # Chat input in center column
 with col2:
     if prompt := st.chat_input("Share what's on your mind..."):
-        # Check for reset command
-        if should_reset_conversation(prompt):
+        # Reset, crisis and the other local intents, all in one pass
+        intents = route_intents(prompt)
+        if RESET in intents:
             st.session_state.messages = []
             st.rerun()
         
@@ -283,38 +124,41 @@ with col2:
         with st.chat_message("assistant"):
             with st.spinner("Clarity is thinking..."):
                 try:
-                    # Build messages array with system prompt and history
-                    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-                    
-                    # Add conversation history
-                    for msg in st.session_state.messages:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
-                    
-                    # Send message to Groq
-                    response = st.session_state.client.chat.completions.create(
-                        model="llama-3.3-70b-versatile",
-                        messages=messages,
-                        temperature=0.7,
-                        max_tokens=200
-                    )
-                    assistant_response = response.choices[0].message.content
-                    
-                    # Format and display response
-                    formatted_response = format_response(assistant_response)
-                    json_data = extract_json_from_response(assistant_response)
-                    
-                    if json_data:
-                        st.json(json_data)
+                    if CRISIS in intents:
+                        # Fixed protocol reply straight away, no model round-trip
+                        assistant_response = CRISIS_RESPONSE
+                        json_data = None
+                        st.markdown(assistant_response)
+                        st.info(CRISIS_RESOURCES)
                     else:
-                        st.markdown(formatted_response)
+                        # Build messages array with system prompt and history
+                        messages = build_context_messages(
+                            SYSTEM_PROMPT,
+                            st.session_state.messages,
+                            budget=CONTEXT_TOKEN_BUDGET
+                        )
+                        
+                        # Send message to Groq
+                        response = st.session_state.client.chat.completions.create(
+                            model="llama-3.3-70b-versatile",
+                            messages=messages,
+                            temperature=0.7,
+                            max_tokens=200
+                        )
+                        assistant_response = response.choices[0].message.content
+                        
+                        # Display response
+                        json_data = extract_json(assistant_response)
+                        if json_data:
+                            st.json(json_data)
+                        else:
+                            st.markdown(assistant_response)
                     
-                    # Add assistant response to history
+                    # Add assistant response to history, with its JSON so reruns don't parse it again
                     st.session_state.messages.append({
                         "role": "assistant",
-                        "content": assistant_response
+                        "content": assistant_response,
+                        "json": json_data
                     })
                     
                 except Exception as e:
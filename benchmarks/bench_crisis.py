@@ -0,0 +1,42 @@
+"""Per-message cost of the local crisis detector.
+
+    python benchmarks/bench_crisis.py
+
+is_crisis_message runs on every prompt before the Groq call, so it must stay
+far below anything a user could notice. Prints microseconds per message for
+short, typical and long inputs, matching and not. Which messages it should
+match is checked in tests/test_crisis.py.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crisis import is_crisis_message  # noqa: E402
+
+SAMPLES = {
+    "short, no match": "I feel a bit stressed today",
+    "short, match": "I want to kill myself",
+    "typical, no match": (
+        "Work has been overwhelming lately and I can't sleep. My manager keeps adding "
+        "deadlines and I don't know how to say no without letting everyone down."
+    ),
+    "typical, match": (
+        "Work has been overwhelming lately and I can't sleep. Honestly some nights I "
+        "think everyone would be better off without me."
+    ),
+    "long (2 KB), no match": "I keep replaying the conversation with my sister. " * 40,
+}
+
+
+def main():
+    number = 20000
+    print(f"{'input':<24} {'chars':>6} {'match':>6} {'us/msg':>8}")
+    for label, text in SAMPLES.items():
+        seconds = min(timeit.repeat(lambda: is_crisis_message(text), number=number, repeat=5))
+        print(f"{label:<24} {len(text):>6} {str(is_crisis_message(text)):>6} {seconds / number * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Websocket deltas sent for one chat turn, full rerun vs chat_area fragment.
+
+    python benchmarks/bench_deltas.py --app app_with_auth.py --history 40
+
+Runs the app headless with streamlit.testing's AppTest, signed in as a
+test user with a transcript of ``--history`` messages already loaded, and
+sends one message. Replies come from benchmarks/mock_groq_server.py, so no
+API key is needed. Firestore is left unconfigured.
+
+Every ForwardMsg delta produced during the turn is counted. Before
+chat_area became a fragment, a turn reran the whole script, so every delta
+(sidebar, full transcript, input) went over the websocket. Now only the
+deltas tagged with the fragment's id are re-sent. AppTest always does a
+full run, so the tag is what separates the two.
+
+Measured with the defaults (40 messages of history, mock replies):
+
+    app                commit    full rerun           chat_area fragment
+    app_with_auth.py   4a0371f   159 deltas, 37.2 KB  69 deltas, 19.3 KB
+    app_auraglow.py    4a0371f   167 deltas, 37.8 KB  71 deltas, 19.5 KB
+    app_with_auth.py   7492b84   141 deltas, 34.3 KB  70 deltas, 19.4 KB
+    app_auraglow.py    7492b84   149 deltas, 34.9 KB  72 deltas, 19.6 KB
+
+So a turn sends about 45% of the deltas and half the bytes it did before.
+The full rerun got cheaper after 4a0371f once the transcript was paged
+("Load earlier messages"); the fragment is still all a turn sends.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.runtime.forward_msg_queue import ForwardMsgQueue  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from mock_groq_server import build_parser as server_parser, start_server  # noqa: E402
+
+USER = {
+    "id": "bench-user",
+    "email": "bench@example.com",
+    "name": "Bench",
+    "photo_url": "https://ui-avatars.com/api/?name=Bench"
+}
+
+
+def record_deltas():
+    """Patch ForwardMsgQueue so every enqueued delta is also kept in a list"""
+    recorded = []
+    enqueue = ForwardMsgQueue.enqueue
+
+    def recording_enqueue(self, msg):
+        if msg.WhichOneof("type") == "delta":
+            recorded.append((msg.delta.fragment_id, msg.ByteSize()))
+        return enqueue(self, msg)
+
+    ForwardMsgQueue.enqueue = recording_enqueue
+    return recorded
+
+
+def history(count):
+    messages = []
+    for i in range(count // 2):
+        messages.append({"role": "user", "content": f"Question {i}: I've been sleeping badly and feel on edge."})
+        messages.append({"role": "assistant", "content": f"Answer {i}: That sounds exhausting. " * 6})
+    return messages
+
+
+def check(at, step):
+    """Stop on an exception in the app; AppTest records it instead of raising"""
+    if at.exception:
+        raise SystemExit(f"{step} failed: {at.exception[0].value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="app_with_auth.py")
+    parser.add_argument("--history", type=int, default=40, help="messages already in the chat")
+    args = parser.parse_args()
+
+    server = start_server(server_parser().parse_args(["--port", "0", "--rpm", "1000", "--latency", "0.05"]))
+    os.environ["GROQ_BASE_URL"] = server.base_url
+    os.chdir(ROOT)
+
+    at = AppTest.from_file(os.path.join(ROOT, args.app), default_timeout=60)
+    at.secrets["GROQ_API_KEY"] = "mock"
+    at.session_state["user"] = USER
+    at.session_state["messages"] = history(args.history)
+    at.run()
+    check(at, "first run")
+
+    recorded = record_deltas()
+    at.chat_input[0].set_value("I can't switch off after work.").run()
+    check(at, "chat turn")
+
+    fragment_ids = {fragment_id for fragment_id, _ in recorded if fragment_id}
+    full = len(recorded)
+    full_bytes = sum(size for _, size in recorded)
+    in_fragment = [size for fragment_id, size in recorded if fragment_id]
+
+    print(f"{args.app}: one turn with {args.history} messages of history")
+    print(f"  full rerun (before)    {full:>5} deltas  {full_bytes / 1024:>8.1f} KB")
+    print(f"  chat_area fragment     {len(in_fragment):>5} deltas  {sum(in_fragment) / 1024:>8.1f} KB")
+    if not fragment_ids:
+        print("  (no fragment deltas recorded: is chat_area decorated with st.fragment?)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
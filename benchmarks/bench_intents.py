@@ -0,0 +1,66 @@
+"""Per-message cost of local intent routing, old checks vs route_intents.
+
+    python benchmarks/bench_intents.py
+
+Before intents.py every prompt went through should_reset_conversation (a
+substring scan for five phrases) and then is_crisis_message (one regex).
+route_intents answers reset, crisis, breathing, mood check-in and journal
+in a single regex pass. Prints microseconds per message for both and which
+inputs the two disagree on. Which messages should reset is checked in
+tests/test_intents.py.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crisis import is_crisis_message  # noqa: E402
+from intents import CRISIS, RESET, route_intents  # noqa: E402
+
+SAMPLES = {
+    "short, no match": "I feel a bit stressed today",
+    "short, reset": "let's start over",
+    "short, crisis": "I want to kill myself",
+    "reset in a sentence": "I don't want to reset my life goals",
+    "typical, no match": (
+        "Work has been overwhelming lately and I can't sleep. My manager keeps adding "
+        "deadlines and I don't know how to say no without letting everyone down."
+    ),
+    "typical, breathing": (
+        "Work has been overwhelming lately and I can't sleep. Could you walk me through "
+        "a breathing exercise before bed?"
+    ),
+    "long (2 KB), no match": "I keep replaying the conversation with my sister. " * 40,
+}
+
+
+def should_reset_conversation(user_input):
+    """The check the apps used before intents.py"""
+    reset_keywords = ["start over", "reset", "clear conversation", "new conversation", "begin again"]
+    return any(keyword in user_input.lower() for keyword in reset_keywords)
+
+
+def old_checks(text):
+    return should_reset_conversation(text), is_crisis_message(text)
+
+
+def main():
+    number = 20000
+    print(f"{'input':<24} {'chars':>6} {'old us':>8} {'new us':>8}  intents")
+    disagreements = []
+    for label, text in SAMPLES.items():
+        old = min(timeit.repeat(lambda: old_checks(text), number=number, repeat=5))
+        new = min(timeit.repeat(lambda: route_intents(text), number=number, repeat=5))
+        intents = route_intents(text)
+        print(f"{label:<24} {len(text):>6} {old / number * 1e6:>8.2f} {new / number * 1e6:>8.2f}  "
+              f"{', '.join(sorted(intents)) or '-'}")
+        if old_checks(text) != (RESET in intents, CRISIS in intents):
+            disagreements.append((label, old_checks(text), intents))
+
+    for label, (reset, crisis), intents in disagreements:
+        print(f"\n{label}: old reset={reset} crisis={crisis}, new {sorted(intents) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""JSON extraction from replies, old regex vs json_extract.
+
+    python benchmarks/bench_json_extract.py
+
+app_old.py and app_backup.py used to run ``re.search(r'\\{[^{}]*\\}')`` over
+every message in the history on every rerun. That pattern can't match an
+object with another object inside it. json_extract scans a reply once,
+nested objects included, and keeps the result on the message. Prints
+microseconds per reply for both and the keys each one found, the cost of
+one history rerun with the old per-message parse and with the kept result,
+and milliseconds for pasted text full of braces, which must stay linear.
+"""
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import JsonScanner, extract_json, message_json  # noqa: E402
+
+SAMPLES = {
+    "plain reply": (
+        "That sounds like a lot to carry. It makes sense that you're tired after a week like this. "
+        "Would you like to try a short grounding exercise together?"
+    ),
+    "flat tool call": '{"tool_call": "start_meditation", "duration": 5, "type": "guided", "theme": "anxiety relief"}',
+    "nested summary": (
+        'Here is your summary: {"summary": {"stress": "high", "sleep_hours": [5, 6, 4]}, '
+        '"suggested_action": {"type": "meditation", "duration": 10}}'
+    ),
+    "brace in prose": 'I hear you :-{ here is a plan: {"tool_call": "set_reminder", "time": "21:00"}',
+    "long (2 KB) reply": "I keep thinking about what you said about your sister and the move. " * 30,
+}
+
+
+def old_extract(text):
+    """The helper the apps used before json_extract.py"""
+    json_match = re.search(r'\{[^{}]*\}', text, re.DOTALL)
+    if json_match:
+        try:
+            return json.loads(json_match.group())
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+# Messages a user could paste; each is a worst case for a brace scanner
+PATHOLOGICAL = {
+    "4000 open braces": "{" * 4000,
+    '4000 x { "a" (24 KB)': '{ "a" ' * 4000,
+    "nested 4000 deep": '{"a":' * 4000 + "1" + "}" * 4000,
+    "4000 deep, trailing commas": '{"a":' * 4000 + "1" + ",}" * 4000,
+}
+
+
+def keys(found):
+    return ",".join(found) if found else "-"
+
+
+def streamed(text, size=4):
+    scanner = JsonScanner()
+    for start in range(0, len(text), size):
+        scanner.feed(text[start:start + size])
+    return scanner.finish()
+
+
+def main():
+    number = 20000
+    print(f"{'reply':<20} {'chars':>6} {'old us':>8} {'new us':>8}  keys found (old / new)")
+    for label, text in SAMPLES.items():
+        old = min(timeit.repeat(lambda: old_extract(text), number=number, repeat=5))
+        new = min(timeit.repeat(lambda: extract_json(text), number=number, repeat=5))
+        assert streamed(text) == extract_json(text)
+        print(f"{label:<20} {len(text):>6} {old / number * 1e6:>8.2f} {new / number * 1e6:>8.2f}  "
+              f"{keys(old_extract(text))} / {keys(extract_json(text))}")
+
+    # One rerun of a 100-message history
+    history = [{"role": "assistant", "content": text} for text in SAMPLES.values()] * 20
+    old = min(timeit.repeat(lambda: [old_extract(message["content"]) for message in history], number=200, repeat=5))
+    new = min(timeit.repeat(lambda: [message_json(message) for message in history], number=200, repeat=5))
+    print(f"\nrerun over {len(history)} messages: old {old / 200 * 1e3:.2f} ms, kept {new / 200 * 1e3:.3f} ms")
+
+    print(f"\n{'pasted text':<28} {'chars':>6} {'old ms':>8} {'new ms':>8}")
+    for label, text in PATHOLOGICAL.items():
+        old = min(timeit.repeat(lambda: old_extract(text), number=5, repeat=3)) / 5
+        new = min(timeit.repeat(lambda: extract_json(text), number=5, repeat=3)) / 5
+        print(f"{label:<28} {len(text):>6} {old * 1e3:>8.2f} {new * 1e3:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Concurrent sessions against a rate-limited mock Groq API.
+
+    python benchmarks/bench_scheduler.py --users 20 --requests 3 --rpm 30
+
+Starts benchmarks/mock_groq_server.py in-process, then has every simulated
+user send its requests at once, first straight through the client (how the
+apps behaved before the scheduler) and then through RequestScheduler.
+Prints how many requests failed on 429s, latency percentiles, and the
+scheduler's own queueing stats.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from groq import Groq, RateLimitError  # noqa: E402
+
+from groq_scheduler import RequestScheduler  # noqa: E402
+from mock_groq_server import build_parser as server_parser, start_server  # noqa: E402
+
+MESSAGES = [
+    {"role": "system", "content": "You are a supportive listener."},
+    {"role": "user", "content": "I've had a rough week at work and can't switch off."}
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run(create, users, requests_per_user):
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def session(user):
+        for _ in range(requests_per_user):
+            started = time.perf_counter()
+            try:
+                reply = create(user, model="llama-3.3-70b-versatile", messages=MESSAGES,
+                               max_tokens=60, stream=True)
+                for _ in reply:
+                    pass
+            except RateLimitError:
+                with lock:
+                    failures.append(user)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=session, args=(f"user-{i}",)) for i in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, failures
+
+
+def report(label, elapsed, latencies, failures):
+    print(f"\n{label}")
+    print(f"  completed  {len(latencies)}   failed on 429  {len(failures)}   wall  {elapsed:.1f}s")
+    print(f"  latency    p50 {percentile(latencies, 0.50):.2f}s   "
+          f"p95 {percentile(latencies, 0.95):.2f}s   max {percentile(latencies, 1.0):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=3, help="requests per user")
+    parser.add_argument("--rpm", type=int, default=30)
+    parser.add_argument("--tpm", type=int, default=12000)
+    args = parser.parse_args()
+
+    def fresh_server():
+        config = server_parser().parse_args(["--port", "0", "--rpm", str(args.rpm), "--tpm", str(args.tpm)])
+        return start_server(config)
+
+    server = fresh_server()
+    client = Groq(api_key="mock", base_url=server.base_url, max_retries=0)
+    elapsed, latencies, failures = run(
+        lambda user, **params: client.chat.completions.create(**params),
+        args.users, args.requests
+    )
+    report("Direct client (no scheduler)", elapsed, latencies, failures)
+    server.shutdown()
+
+    server = fresh_server()
+    client = Groq(api_key="mock", base_url=server.base_url, max_retries=0)
+    scheduler = RequestScheduler(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    elapsed, latencies, failures = run(
+        lambda user, **params: scheduler.create_completion(client, user, **params),
+        args.users, args.requests
+    )
+    report("RequestScheduler", elapsed, latencies, failures)
+    print(f"  server     {server.counts}")
+    for name, value in scheduler.stats().items():
+        print(f"  {name:<18} {value:.3f}" if isinstance(value, float) else f"  {name:<18} {value}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Import cost of cold starts, per module and for what an app loads up front.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --app app_auraglow.py --runs 5
+
+Every measurement runs in a fresh interpreter with ``python -X importtime``,
+so nothing is already cached in sys.modules. Two tables are printed:
+
+* each heavy dependency on its own (cumulative import time, best of runs)
+* the modules ``--app`` imports at the top of the file, i.e. what has to
+  load before the first element of the auth screen can render
+
+Compare the second table across commits to see what lazy imports save.
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = [
+    "streamlit",
+    "streamlit_oauth",
+    "requests",
+    "httpx",
+    "groq",
+    "firebase_admin",
+    "firebase_admin.firestore",
+    "groq_client",
+    "chat_store",
+    "firebase_setup",
+    "google_auth"
+]
+
+# "import time:       153 |        153 |   _io"
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+_STARTUP = []
+
+
+def _interpreter_startup():
+    if not _STARTUP:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"],
+                                cwd=ROOT, capture_output=True, text=True)
+        _STARTUP.extend(match.group(4) for match in map(_IMPORTTIME_LINE.match, result.stderr.splitlines())
+                        if match)
+    return _STARTUP
+
+
+def import_time(statements, runs):
+    """Best-of-``runs`` cumulative seconds for each top-level import in ``statements``"""
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statements],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        timings = {}
+        for line in result.stderr.splitlines():
+            match = _IMPORTTIME_LINE.match(line)
+            # Top-level entries have no indent; nested ones are counted in them
+            if match and len(match.group(3)) == 1:
+                timings[match.group(4)] = int(match.group(2)) / 1e6
+        # Drop what the interpreter itself loads before running -c
+        for name in _interpreter_startup():
+            timings.pop(name, None)
+        if best is None:
+            best = timings
+        else:
+            best = {name: min(seconds, best.get(name, seconds)) for name, seconds in timings.items()}
+    return best
+
+
+def top_level_imports(app_path):
+    """The import statements at module level of an app script, as source"""
+    with open(app_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def print_table(title, timings):
+    print(f"\n{title}")
+    for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        print(f"  {name:<28} {seconds * 1000:>8.1f} ms")
+    print(f"  {'total':<28} {sum(timings.values()) * 1000:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="app_with_auth.py")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per measurement")
+    args = parser.parse_args()
+
+    per_module = {}
+    for name in HEAVY_MODULES:
+        try:
+            timings = import_time(f"import {name}", args.runs)
+        except RuntimeError as e:
+            print(f"  skipping {name}: {e}")
+            continue
+        per_module[name] = timings.get(name, sum(timings.values()))
+    print_table("Heavy modules, each in a fresh interpreter", per_module)
+
+    statements = top_level_imports(os.path.join(ROOT, args.app))
+    timings = import_time("\n".join(statements), args.runs)
+    print_table(f"{args.app}: imports before the auth screen renders", timings)
+
+
+if __name__ == "__main__":
+    main()
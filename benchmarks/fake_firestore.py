@@ -0,0 +1,192 @@
+"""In-memory stand-in for the Firestore client, for load tests.
+
+    from fake_firestore import FakeFirestore
+    db = FakeFirestore(latency=0.02)
+
+Covers the calls chat_store, user_store and the apps make: documents and
+subcollections, get/set(merge)/update/create, batches, and queries with
+select/order_by/limit. SERVER_TIMESTAMP and DELETE_FIELD behave as on the
+server. Every call sleeps ``latency`` seconds to stand in for the network
+round-trip, and reads and writes are counted the way Firestore bills them
+(a query costs at least one read).
+
+firebase_admin still has to be installed: its sentinels and exceptions are
+what the app code passes and catches.
+"""
+import copy
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, NotFound
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+class DocumentReference:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path[-1]
+
+    def collection(self, name):
+        return CollectionReference(self._db, self.path + (name,))
+
+    def get(self):
+        self._db._round_trip()
+        return DocumentSnapshot(self, self._db._read(self.path))
+
+    def set(self, data, merge=False):
+        self._db._round_trip()
+        self._db._apply([(self.path, data, merge)])
+
+    def update(self, data):
+        self._db._round_trip()
+        with self._db._lock:
+            if self._db._read(self.path, count=False) is None:
+                raise NotFound(f"No document to update: {'/'.join(self.path)}")
+            self._db._apply([(self.path, data, True)])
+
+    def create(self, data):
+        self._db._round_trip()
+        with self._db._lock:
+            if self._db._read(self.path, count=False) is not None:
+                raise AlreadyExists(f"Document already exists: {'/'.join(self.path)}")
+            self._db._apply([(self.path, data, False)])
+
+
+class Query:
+    def __init__(self, db, path, fields=None, order=None, limit=None):
+        self._db = db
+        self.path = path
+        self._fields = fields
+        self._order = order
+        self._limit = limit
+
+    def _copy(self, **changes):
+        state = {"fields": self._fields, "order": self._order, "limit": self._limit, **changes}
+        return Query(self._db, self.path, **state)
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def order_by(self, field, direction=firestore.Query.ASCENDING):
+        return self._copy(order=(field, direction == firestore.Query.DESCENDING))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def stream(self):
+        self._db._round_trip()
+        with self._db._lock:
+            docs = list(self._db._collections.get(self.path, {}).items())
+            if self._order is not None:
+                field, descending = self._order
+                # Like Firestore, documents without the field don't match
+                docs = [(doc_id, data) for doc_id, data in docs if field in data]
+                docs.sort(key=lambda item: item[1][field], reverse=descending)
+            if self._limit is not None:
+                docs = docs[:self._limit]
+            self._db.reads += max(1, len(docs))
+            results = []
+            for doc_id, data in docs:
+                if self._fields is not None:
+                    data = {key: value for key, value in data.items() if key in self._fields}
+                results.append(DocumentSnapshot(DocumentReference(self._db, self.path + (doc_id,)),
+                                                copy.deepcopy(data)))
+        return iter(results)
+
+
+class CollectionReference(Query):
+    def __init__(self, db, path):
+        super().__init__(db, path)
+
+    def document(self, doc_id=None):
+        return DocumentReference(self._db, self.path + (doc_id or uuid.uuid4().hex[:20],))
+
+
+class WriteBatch:
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append((reference.path, data, merge))
+
+    def commit(self):
+        self._db._round_trip()
+        self._db._apply(self._writes)
+        self._writes = []
+
+
+class FakeFirestore:
+    """Thread-safe in-memory Firestore with simulated round-trip latency"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.reads = 0
+        self.writes = 0
+        self._lock = threading.RLock()
+        # Documents grouped by the path of their collection
+        self._collections = {}
+
+    def collection(self, name):
+        return CollectionReference(self, (name,))
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read(self, path, count=True):
+        with self._lock:
+            if count:
+                self.reads += 1
+            data = self._collections.get(path[:-1], {}).get(path[-1])
+            return copy.deepcopy(data)
+
+    def _apply(self, writes):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            for path, data, merge in writes:
+                collection = self._collections.setdefault(path[:-1], {})
+                doc = dict(collection.get(path[-1], {})) if merge else {}
+                for key, value in data.items():
+                    if value is firestore.DELETE_FIELD:
+                        doc.pop(key, None)
+                    elif value is firestore.SERVER_TIMESTAMP:
+                        doc[key] = now
+                    else:
+                        doc[key] = copy.deepcopy(value)
+                collection[path[-1]] = doc
+                self.writes += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "reads": self.reads,
+                "writes": self.writes,
+                "documents": sum(len(docs) for docs in self._collections.values())
+            }
@@ -0,0 +1,297 @@
+"""How many concurrent chat sessions one Streamlit process can take.
+
+    python benchmarks/load_test.py --users 200 --concurrency 50 --turns 3
+    python benchmarks/load_test.py --users 50 --latency 0.5 --tokens-per-second 100 --firestore-latency 0.03
+
+Every simulated user is a headless session of ``--app`` (streamlit.testing's
+AppTest), all in this one process so they share its caches, worker pools,
+Groq client and scheduler exactly as browser sessions would. Each user:
+
+1. logs in: the first signed-in run, with the user put straight into
+   session state, since Google OAuth can't run headless
+2. sends ``--turns`` chat messages, each run waiting for the full reply
+3. starts a new chat and reopens the previous one from Recent Chats
+
+Groq is replaced by benchmarks/mock_groq_server.py, with its latency and
+token rate configurable, or by recorded completions with ``--cassette``
+(see groq_cassette.py). Firestore is replaced by the in-memory
+benchmarks/fake_firestore.py, with a simulated round-trip time.
+
+Reported: throughput, latency percentiles per step, memory per session
+(RSS growth divided by sessions kept alive) and CPU use, plus the app's own
+per-stage metrics. AppTest always reruns the whole script, never just the
+chat_area fragment, so render costs are an upper bound.
+
+AppTest isn't built for concurrent sessions: each run installs its own
+``st.secrets`` and mock Runtime and clears them when it ends, which breaks
+any other session still running ("No secrets found", "Runtime hasn't been
+created!"), and each run compiles the script again, which on Python 3.11
+can fail when two threads parse at once ("AST constructor recursion depth
+mismatch"). share_apptest_globals() installs the secrets once for every
+session, keeps the last mock Runtime in place and compiles the app once.
+A step counts as failed if it raises or if the app raised, which AppTest
+records in ``at.exception`` instead of raising.
+"""
+import argparse
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st  # noqa: E402
+from streamlit.runtime import Runtime  # noqa: E402
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache  # noqa: E402
+from streamlit.runtime.secrets import Secrets  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import firebase_setup  # noqa: E402
+from fake_firestore import FakeFirestore  # noqa: E402
+from mock_groq_server import build_parser as server_parser, start_server  # noqa: E402
+
+SECRETS = {
+    "GROQ_API_KEY": "mock",
+    "firebase_warmup": False,
+    # The mock server throttles if asked to; the app shouldn't second-guess it
+    "GROQ_REQUESTS_PER_MINUTE": 1_000_000,
+    "GROQ_TOKENS_PER_MINUTE": 100_000_000
+}
+
+# Seconds a user waits for the chat they left to show up in Recent Chats;
+# it's listed once its background save lands
+HISTORY_WAIT = 10
+
+PROMPTS = [
+    "I can't switch off after work.",
+    "My sleep has been all over the place this week.",
+    "How do I stop overthinking conversations?",
+    "Any quick way to calm down before a meeting?"
+]
+
+
+def rss_bytes():
+    """Current resident set size, falling back to the peak off Linux"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Timings:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.steps = {}
+        self.errors = {}
+
+    def record(self, step, seconds):
+        with self._lock:
+            self.steps.setdefault(step, []).append(seconds)
+
+    def error(self, step, exc):
+        with self._lock:
+            self.errors.setdefault(step, []).append(repr(exc))
+
+    def timed(self, step, at, action):
+        """Run one step of a session; False if it raised or the app did.
+
+        AppTest doesn't raise for an exception in the script, it records it
+        in ``at.exception``, so that is checked after every step too.
+        """
+        started = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            self.error(step, e)
+            return False
+        if at.exception:
+            self.error(step, RuntimeError(at.exception[0].value))
+            return False
+        self.record(step, time.perf_counter() - started)
+        return True
+
+
+def share_apptest_globals():
+    """Make AppTest's per-run globals safe to share between concurrent sessions.
+
+    Sessions are given no secrets of their own, so AppTest leaves
+    ``st.secrets`` alone, ``Runtime.instance()`` falls back to the last
+    mock Runtime when another session's run has just cleared it, and every
+    run gets the same bytecode, compiled once under a lock.
+    """
+    secrets = Secrets()
+    secrets._secrets = dict(SECRETS)
+    st.secrets = secrets
+
+    instance = Runtime.instance.__func__
+    last = {}
+
+    def shared_instance(cls):
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+            return cls._instance
+        if "runtime" in last:
+            return last["runtime"]
+        return instance(cls)
+
+    Runtime.instance = classmethod(shared_instance)
+
+    get_bytecode = ScriptCache.get_bytecode
+    compiled = {}
+    compile_lock = threading.Lock()
+
+    def shared_bytecode(self, script_path):
+        script_path = os.path.abspath(script_path)
+        with compile_lock:
+            if script_path not in compiled:
+                compiled[script_path] = get_bytecode(self, script_path)
+            return compiled[script_path]
+
+    ScriptCache.get_bytecode = shared_bytecode
+
+
+def make_session(args, user_number):
+    at = AppTest.from_file(os.path.join(ROOT, args.app), default_timeout=args.timeout)
+    at.session_state["user"] = {
+        "id": f"load-user-{user_number}",
+        "email": f"load{user_number}@example.com",
+        "name": f"Load {user_number}",
+        "photo_url": "https://ui-avatars.com/api/?name=Load"
+    }
+    return at
+
+
+def find_previous_chat(at):
+    """The first Recent Chats entry, rerunning like a user would until it's listed"""
+    deadline = time.monotonic() + HISTORY_WAIT
+    while True:
+        previous = next((button for button in at.sidebar.button if (button.key or "").startswith("chat_")), None)
+        if previous is not None or time.monotonic() > deadline or at.exception:
+            return previous
+        time.sleep(0.1)
+        at.run()
+
+
+def run_user(args, user_number, timings, sessions):
+    at = make_session(args, user_number)
+    sessions.append(at)
+    if not timings.timed("login", at, at.run):
+        return
+
+    for turn in range(args.turns):
+        prompt = PROMPTS[(user_number + turn) % len(PROMPTS)]
+        if not timings.timed("chat_turn", at, lambda: at.chat_input[0].set_value(prompt).run()):
+            return
+
+    if not args.history:
+        return
+    # "New chat" in app_with_auth.py, "New Chat" in app_auraglow.py
+    new_chat = next((button for button in at.sidebar.button if "new chat" in button.label.lower()), None)
+    if new_chat is None:
+        timings.error("new_chat", RuntimeError("no New chat button in the sidebar"))
+        return
+    if not timings.timed("new_chat", at, lambda: new_chat.click().run()):
+        return
+    previous = find_previous_chat(at)
+    if previous is None:
+        timings.error("history_click", RuntimeError("previous chat missing from Recent Chats"))
+        return
+    if timings.timed("history_click", at, lambda: previous.click().run()) and \
+            len(at.session_state["messages"]) != 2 * args.turns:
+        timings.error("history_click", RuntimeError(
+            f"reopened chat has {len(at.session_state['messages'])} messages, expected {2 * args.turns}"))
+
+
+def print_report(args, timings, wall, cpu, rss_growth, server, db):
+    turns = len(timings.steps.get("chat_turn", []))
+    print(f"\n{args.app}: {args.users} users, {args.concurrency} at a time, {args.turns} turns each")
+    print(f"  wall time        {wall:>9.1f} s")
+    print(f"  throughput       {turns / wall:>9.2f} chat turns/s")
+    print(f"  CPU              {cpu:>9.1f} s  ({cpu / wall * 100:.0f}% of one core)")
+    print(f"  memory/session   {rss_growth / max(1, args.users) / 1024:>9.1f} KB RSS")
+
+    print(f"\n  {'step':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, values in timings.steps.items():
+        row = [percentile(values, q) * 1000 for q in (0.5, 0.95, 0.99)] + [max(values) * 1000]
+        print(f"  {step:<14}{len(values):>7}" + "".join(f"{value:>10.0f}" for value in row))
+    for step, errors in timings.errors.items():
+        print(f"  {step}: {len(errors)} failed, e.g. {errors[0]}")
+
+    print(f"\n  mock Groq: {server.counts['served']} replies served, {server.counts['rate_limited']} answered 429")
+    print(f"  fake Firestore: {db.stats()}")
+
+    # The app's own instrumentation lives in this process too
+    from metrics import get_metrics
+    rows = get_metrics().summary()
+    if rows:
+        print(f"\n  {'app stage':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for row in rows:
+            print(f"  {row['stage']:<18}{row['count']:>7}{row['p50_ms']:>10.0f}{row['p95_ms']:>10.0f}{row['p99_ms']:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="app_with_auth.py")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=25, help="sessions active at once")
+    parser.add_argument("--turns", type=int, default=3, help="chat messages per user")
+    parser.add_argument("--no-history", dest="history", action="store_false", help="skip the Recent Chats click")
+    parser.add_argument("--latency", type=float, default=0.3, help="mock Groq seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0, help="mock Groq streaming rate")
+    parser.add_argument("--rpm", type=int, default=1_000_000, help="mock Groq requests per minute before 429s")
+    parser.add_argument("--cassette", help="replay completions from this cassette instead of the mock server")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="cassette timing multiplier; 0 = no waits")
+    parser.add_argument("--firestore-latency", type=float, default=0.02, help="fake Firestore seconds per call")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds one script run may take")
+    args = parser.parse_args()
+
+    server = start_server(server_parser().parse_args([
+        "--port", "0",
+        "--rpm", str(args.rpm),
+        "--tpm", str(args.rpm * 1000),
+        "--latency", str(args.latency),
+        "--tokens-per-second", str(args.tokens_per_second)
+    ]))
+    os.environ["GROQ_BASE_URL"] = server.base_url
+    if args.cassette:
+        os.environ["GROQ_CASSETTE"] = os.path.abspath(args.cassette)
+        os.environ["GROQ_CASSETTE_MODE"] = "replay"
+        os.environ["GROQ_REPLAY_SPEED"] = str(args.replay_speed)
+    os.chdir(ROOT)
+    share_apptest_globals()
+
+    db = FakeFirestore(latency=args.firestore_latency)
+    # The apps look these up on every run, so the fake takes over everywhere
+    firebase_setup.get_db = lambda: db
+    firebase_setup.firebase_status = lambda: {"ready": True, "error": None, "init_seconds": 0.0, "warmup_seconds": None}
+
+    # Warm up once so imports and process-wide resources aren't billed to the first users
+    run_user(args, -1, Timings(), [])
+
+    timings = Timings()
+    sessions = []
+    rss_before = rss_bytes()
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for user_number in range(args.users):
+            pool.submit(run_user, args, user_number, timings, sessions)
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_before
+    rss_growth = rss_bytes() - rss_before
+
+    print_report(args, timings, wall, cpu, rss_growth, server, db)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Local stand-in for Groq's chat completions endpoint.
+
+    python benchmarks/mock_groq_server.py --port 8900 --rpm 30 --latency 0.3 --tokens-per-second 250
+
+Point a client at it with GROQ_BASE_URL=http://127.0.0.1:8900 (the Groq SDK
+reads it) or ``Groq(base_url=...)``. Serves plain and streamed (SSE)
+replies with the same x-ratelimit-* headers Groq sends, and answers 429
+with retry-after once the requests-per-minute or tokens-per-minute budget
+is spent, so the scheduler and load tests can run without an API key.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY_WORDS = (
+    "It sounds like you're carrying a lot right now. What feels heaviest "
+    "when you think about it? Sometimes naming it is the first step."
+).split()
+
+
+class RateWindow:
+    """Sliding one-minute window of requests and tokens"""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._events = deque()
+
+    def _expire(self, now):
+        while self._events and now - self._events[0][0] >= 60.0:
+            self._events.popleft()
+
+    def admit(self, tokens):
+        """Record a request, or return seconds to wait if over the limit"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            used_tokens = sum(count for _, count in self._events)
+            if (len(self._events) >= self.requests_per_minute
+                    or used_tokens + tokens > self.tokens_per_minute):
+                oldest = self._events[0][0] if self._events else now
+                return max(0.001, 60.0 - (now - oldest))
+            self._events.append((now, tokens))
+            return 0.0
+
+    def headers(self):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            used_tokens = sum(count for _, count in self._events)
+            oldest = self._events[0][0] if self._events else now
+            reset = 60.0 - (now - oldest)
+            return {
+                "x-ratelimit-limit-requests": str(self.requests_per_minute),
+                "x-ratelimit-remaining-requests": str(max(0, self.requests_per_minute - len(self._events))),
+                "x-ratelimit-reset-requests": f"{reset:.2f}s",
+                "x-ratelimit-limit-tokens": str(self.tokens_per_minute),
+                "x-ratelimit-remaining-tokens": str(max(0, self.tokens_per_minute - used_tokens)),
+                "x-ratelimit-reset-tokens": f"{reset:.2f}s"
+            }
+
+
+class MockGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/openai/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        config = self.server.config
+
+        prompt_tokens = sum(len(str(msg.get("content", "")).split()) for msg in request.get("messages", []))
+        completion_tokens = min(request.get("max_tokens") or config.reply_tokens, config.reply_tokens)
+        retry_after = self.server.window.admit(prompt_tokens + completion_tokens)
+        if retry_after:
+            self.server.count("rate_limited")
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                {"retry-after": f"{retry_after:.2f}", **self.server.window.headers()}
+            )
+            return
+        self.server.count("served")
+
+        time.sleep(config.latency)
+        words = [REPLY_WORDS[i % len(REPLY_WORDS)] for i in range(completion_tokens)]
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        reply_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = request.get("model", "mock")
+
+        if not request.get("stream"):
+            time.sleep(completion_tokens / config.tokens_per_second)
+            self._send_json(200, {
+                "id": reply_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }, self.server.window.headers())
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in self.server.window.headers().items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        def send_event(data):
+            payload = f"data: {data}\n\n".encode()
+            self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta, finish_reason=None, x_groq=None):
+            body = {
+                "id": reply_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            if x_groq is not None:
+                body["x_groq"] = x_groq
+            return json.dumps(body)
+
+        try:
+            send_event(chunk({"role": "assistant", "content": ""}))
+            for i, word in enumerate(words):
+                time.sleep(1.0 / config.tokens_per_second)
+                send_event(chunk({"content": word if i == 0 else " " + word}))
+            send_event(chunk({}, "stop", {"id": reply_id, "usage": usage}))
+            send_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped generating early
+            pass
+
+
+class MockGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, MockGroqHandler)
+        self.config = config
+        self.window = RateWindow(config.rpm, config.tpm)
+        self._lock = threading.Lock()
+        self.counts = {"served": 0, "rate_limited": 0}
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900, help="0 picks a free port")
+    parser.add_argument("--rpm", type=int, default=30, help="requests per minute before 429s")
+    parser.add_argument("--tpm", type=int, default=12000, help="tokens per minute before 429s")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--reply-tokens", type=int, default=60, help="words per reply (capped by max_tokens)")
+    return parser
+
+
+def start_server(config):
+    """Run the mock server on a daemon thread and return it"""
+    server = MockGroqServer((config.host, config.port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    config = build_parser().parse_args()
+    server = MockGroqServer((config.host, config.port), config)
+    print(f"Mock Groq API on {server.base_url} (rpm={config.rpm}, tpm={config.tpm})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_WRITES = 500
+
+# Chats being saved at once across all sessions; writes are network-bound
+MAX_CONCURRENT_SAVES = 8
+
+# Fields the "Recent Chats" sidebar needs; everything else loads on click
+INDEX_FIELDS = ['title', 'preview', 'message_count', 'created_at', 'updated_at']
+
+
+def _firestore():
+    """firebase_admin.firestore, imported on first use.
+
+    Keeps ``import chat_store`` cheap, so pages that never touch Firestore
+    don't load the Firebase SDK.
+    """
+    from firebase_admin import firestore
+    return firestore
+
+
+def chats_collection(db, user_id):
+    return db.collection('users').document(user_id).collection('chats')
+
+
+def message_doc_id(seq):
+    """Zero-padded so document ids sort in message order"""
+    return f"{seq:06d}"
+
+
+def make_preview(messages):
+    if not messages:
+        return "Empty chat"
+    return messages[0]['content'][:50] + "..."
+
+
+def make_title(messages):
+    """Short label for a chat: the opening words of its first user message"""
+    first = next((msg['content'] for msg in messages if msg['role'] == 'user'), "")
+    words = first.split()
+    if not words:
+        return "New chat"
+    title = " ".join(words[:6])
+    return title if len(words) <= 6 else title + "…"
+
+
+def index_fields(messages):
+    """Precomputed summary of a chat, stored on the chat document"""
+    return {
+        'title': make_title(messages),
+        'preview': make_preview(messages),
+        'message_count': len(messages),
+        'crisis_flagged': any(msg.get('flag') == 'crisis' for msg in messages)
+    }
+
+
+def _message_doc(message, seq):
+    doc = {
+        'role': message['role'],
+        'content': message['content'],
+        'seq': seq,
+        'created_at': _firestore().SERVER_TIMESTAMP
+    }
+    if message.get('flag'):
+        doc['flag'] = message['flag']
+    return doc
+
+
+def _write_messages(db, chat_ref, numbered, chat_fields):
+    """Write ``(seq, message)`` pairs to the chat's messages subcollection.
+
+    Each message lives at its sequence number, so re-sending the same turn
+    overwrites instead of duplicating. ``chat_fields`` are merged onto the
+    chat document in the final batch.
+    """
+    ops = [(chat_ref.collection('messages').document(message_doc_id(seq)), _message_doc(message, seq))
+           for seq, message in numbered]
+    ops.append((chat_ref, chat_fields))
+
+    for i in range(0, len(ops), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for ref, data in ops[i:i + MAX_BATCH_WRITES]:
+            batch.set(ref, data, merge=True)
+        batch.commit()
+    return len(ops)
+
+
+def new_chat_id():
+    """Id for a chat that's just starting, made locally.
+
+    Knowing the id up front means the first save doesn't have to finish
+    before the chat can be referred to, and saving the same chat twice
+    writes to the same document instead of creating a second one.
+    """
+    return uuid.uuid4().hex
+
+
+def save_chat(db, user_id, chat_id, messages, start=0):
+    """Persist ``messages[start:]`` of the chat with id ``chat_id``.
+
+    Every write lands on a document named by the chat id and message
+    sequence number, so repeating a save is harmless. ``start=0`` is the
+    chat's first save and also stamps ``created_at``. A turn costs one
+    write per new message plus a small update of the chat document,
+    regardless of how long the conversation already is. Returns the
+    number of documents written.
+    """
+    chat_ref = chats_collection(db, user_id).document(chat_id)
+    chat_fields = {'updated_at': _firestore().SERVER_TIMESTAMP, **index_fields(messages)}
+    if start == 0:
+        chat_fields['created_at'] = _firestore().SERVER_TIMESTAMP
+    return _write_messages(db, chat_ref, enumerate(messages[start:], start=start), chat_fields)
+
+
+def pending_chat_entry(chat_id, messages):
+    """A "Recent Chats" entry for a chat whose first save hasn't landed yet"""
+    return {'id': chat_id, 'created_at': None, **index_fields(messages)}
+
+
+def list_chats(db, user_id, limit=10):
+    """Most recent chats, reading only the index fields of each document"""
+    query = (chats_collection(db, user_id)
+             .select(INDEX_FIELDS)
+             .order_by('updated_at', direction=_firestore().Query.DESCENDING)
+             .limit(limit))
+    chat_list = []
+    for chat in query.stream():
+        chat_data = chat.to_dict()
+        chat_list.append({
+            'id': chat.id,
+            'title': chat_data.get('title') or "Untitled chat",
+            'preview': chat_data.get('preview') or "Empty chat",
+            'message_count': chat_data.get('message_count', 0),
+            'created_at': chat_data.get('created_at')
+        })
+    return chat_list
+
+
+def _merge_legacy(legacy, docs):
+    """A chat's transcript from its legacy array and its subcollection docs.
+
+    The array holds seq 0 to n-1. Turns added to an unmigrated chat are
+    saved after it, at seq n onwards, so the two are laid together by seq;
+    where both have a seq the subcollection is newer and wins.
+    """
+    by_seq = dict(enumerate(legacy))
+    for doc in docs:
+        by_seq[doc['seq']] = doc
+    return [by_seq[seq] for seq in sorted(by_seq)]
+
+
+def load_chat(db, user_id, chat_id):
+    """Load one chat's transcript and rolling summary.
+
+    Messages come from the subcollection in order, after any still in the
+    legacy ``messages`` array of a chat that hasn't been migrated yet.
+    """
+    chat_ref = chats_collection(db, user_id).document(chat_id)
+    data = chat_ref.get().to_dict() or {}
+
+    docs = [doc.to_dict() for doc in chat_ref.collection('messages').order_by('seq').stream()]
+    messages = [{key: message[key] for key in ('role', 'content', 'flag') if key in message}
+                for message in _merge_legacy(data.get('messages', []), docs)]
+
+    return {
+        'messages': messages,
+        'summary': {"text": data.get('summary', ''), "upto": data.get('summary_upto', 0)}
+    }
+
+
+def migrate_chat(db, chat_snapshot):
+    """Move a legacy ``messages`` array into the subcollection.
+
+    Also backfills the index fields on chats that predate them. Returns the
+    number of messages moved; 0 if the chat was already migrated.
+    Messages already in the subcollection are left as they are.
+    """
+    data = chat_snapshot.to_dict() or {}
+    messages = data.get('messages')
+    docs = [doc.to_dict() for doc in chat_snapshot.reference.collection('messages').order_by('seq').stream()]
+    if messages is None:
+        if 'title' not in data:
+            chat_snapshot.reference.update(index_fields(docs))
+        return 0
+
+    # Turns added since the app moved to the subcollection, or moved by an
+    # interrupted run, are already there
+    saved = {doc['seq'] for doc in docs}
+    missing = [(seq, message) for seq, message in enumerate(messages) if seq not in saved]
+    _write_messages(db, chat_snapshot.reference, missing, index_fields(_merge_legacy(messages, docs)))
+    # Drop the array only after every message is safely in the subcollection
+    chat_snapshot.reference.update({'messages': _firestore().DELETE_FIELD})
+    return len(missing)
+
+
+class ChatListCache:
+    """Read-through cache of each user's "Recent Chats" list.
+
+    Shared by every session in the process. Entries expire after ``ttl``
+    seconds as a safety net, but writers are expected to call
+    ``invalidate`` so the sidebar never shows a stale list.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generations = {}
+
+    def get(self, user_id, limit, loader):
+        """Return the cached list for ``user_id`` or call ``loader()`` to fill it"""
+        key = (user_id, limit)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generations.get(user_id, 0)
+
+        chats = loader()
+        with self._lock:
+            # Skip the fill if a write invalidated the user while we loaded
+            if self._generations.get(user_id, 0) == generation:
+                self._entries[key] = (now, chats)
+        return chats
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries)
+            }
+
+
+class ChatWriter:
+    """Saves chat turns in the background, in order per chat.
+
+    ``save`` returns at once, so neither a reply nor the "New chat" and
+    "Sign out" buttons wait on Firestore. Saves of one chat run one at a
+    time; if several queue up they are folded into a single write of the
+    newest transcript. A failed save is retried from where it started by
+    the chat's next save; until one succeeds its error is kept for
+    ``take_error``.
+    ``on_saved(user_id)`` runs after each successful write, before the
+    chat stops counting as pending. ``metrics``, if given, gets the time
+    and document count of every write (see metrics.AppMetrics).
+    """
+
+    def __init__(self, max_workers=MAX_CONCURRENT_SAVES, on_saved=None, metrics=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-save")
+        self._on_saved = on_saved
+        self._metrics = metrics
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._queues = {}
+        self._unsaved_from = {}
+        self._errors = {}
+        self.writes = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def save(self, db, user_id, chat_id, messages, start):
+        """Queue ``messages[start:]`` of a chat to be written.
+
+        ``messages`` must not be mutated afterwards; pass a copy.
+        """
+        key = (user_id, chat_id)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is not None:
+                queue.append((db, messages, start))
+                return
+            self._queues[key] = deque([(db, messages, start)])
+        self._executor.submit(self._drain, key)
+
+    def _drain(self, key):
+        user_id, chat_id = key
+        while True:
+            with self._lock:
+                queue = self._queues[key]
+                if not queue:
+                    del self._queues[key]
+                    self._drained.notify_all()
+                    return
+                # The newest transcript covers everything queued before it
+                db, messages, _ = queue[-1]
+                start = min(item[2] for item in queue)
+                start = min(start, self._unsaved_from.get(key, start))
+                self.coalesced += len(queue) - 1
+                queue.clear()
+            started = time.perf_counter()
+            try:
+                written = save_chat(db, user_id, chat_id, messages, start)
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                    self._unsaved_from[key] = start
+                    self._errors[key] = e
+                continue
+            with self._lock:
+                self.writes += 1
+                self._unsaved_from.pop(key, None)
+                # The failed messages made it after all
+                self._errors.pop(key, None)
+            if self._metrics is not None:
+                self._metrics.observe("firestore_write", time.perf_counter() - started)
+                self._metrics.count("firestore_writes_total", written)
+            if self._on_saved is not None:
+                self._on_saved(user_id)
+
+    def is_pending(self, user_id, chat_id):
+        """True while a save of the chat is queued or running"""
+        with self._lock:
+            return (user_id, chat_id) in self._queues
+
+    def wait(self, user_id, chat_id, timeout=None):
+        """Block until the chat has no save queued or running; False on timeout"""
+        with self._drained:
+            return self._drained.wait_for(lambda: (user_id, chat_id) not in self._queues, timeout)
+
+    def take_error(self, user_id, chat_id):
+        """The last failed save's exception for a chat, once, or None"""
+        with self._lock:
+            return self._errors.pop((user_id, chat_id), None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_chats': len(self._queues),
+                'writes': self.writes,
+                'coalesced': self.coalesced,
+                'failures': self.failures,
+                'unsaved_chats': len(self._unsaved_from)
+            }
@@ -0,0 +1,92 @@
+import re
+
+# Words, numbers and individual punctuation marks; close enough to the
+# Llama 3 tokenizer for budgeting without shipping the tokenizer itself.
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Role markers and separators the chat template adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+DEFAULT_CONTEXT_BUDGET = 3000
+
+OMITTED_NOTE = "Earlier messages in this conversation were omitted to stay within the context limit."
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def count_tokens(text):
+    """Estimate the number of tokens in a piece of text"""
+    tokens = 0
+    for match in _TOKEN_PATTERN.finditer(text or ""):
+        # Long words are split into several sub-word tokens (~4 chars each)
+        tokens += max(1, (len(match.group()) + 3) // 4)
+    return tokens
+
+
+def count_message_tokens(message):
+    """Estimate the tokens a single chat message costs, including overhead"""
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _truncate_to_budget(text, budget):
+    """Keep the tail of ``text`` that fits in ``budget`` tokens"""
+    kept = []
+    used = 0
+    for piece in reversed(re.split(r"(\s+)", text)):
+        cost = count_tokens(piece)
+        if used + cost > budget:
+            break
+        kept.append(piece)
+        used += cost
+    return "".join(reversed(kept)).lstrip()
+
+
+def build_context_messages(system_prompt, history, budget=DEFAULT_CONTEXT_BUDGET, summary=None):
+    """Build the message list sent to the model within a token budget.
+
+    The system prompt and the most recent turns are always kept; older turns
+    are dropped first. A short note tells the model when history was cut so
+    it doesn't assume the conversation started mid-way.
+
+    ``summary`` is an optional ``{"text", "upto"}`` rolling summary covering
+    the first ``upto`` messages; it is sent in place of those turns.
+    """
+    system_message = {"role": "system", "content": system_prompt}
+    remaining = budget - count_message_tokens(system_message)
+
+    summary_message = None
+    if summary and summary.get("text"):
+        summary_message = {"role": "system", "content": SUMMARY_PREFIX + summary["text"]}
+        remaining -= count_message_tokens(summary_message)
+        history = history[summary["upto"]:]
+    if sum(count_message_tokens(msg) for msg in history) > remaining:
+        # History will be cut, so leave room for the omission note
+        remaining -= count_tokens(OMITTED_NOTE) + MESSAGE_OVERHEAD_TOKENS
+
+    kept = []
+    for msg in reversed(history):
+        message = {"role": msg["role"], "content": msg["content"]}
+        cost = count_message_tokens(message)
+        if cost > remaining:
+            if not kept:
+                # The latest message alone is over budget; keep its tail
+                message["content"] = _truncate_to_budget(message["content"], max(remaining - MESSAGE_OVERHEAD_TOKENS, 0))
+                kept.append(message)
+            break
+        kept.append(message)
+        remaining -= cost
+    kept.reverse()
+
+    dropped = len(history) - len(kept)
+    # Don't open the window on a dangling assistant reply
+    while len(kept) > 1 and kept[0]["role"] == "assistant":
+        kept.pop(0)
+        dropped += 1
+
+    messages = [system_message]
+    if summary_message is not None:
+        messages.append(summary_message)
+    if dropped:
+        messages.append({"role": "system", "content": OMITTED_NOTE})
+    messages.extend(kept)
+    return messages
@@ -0,0 +1,61 @@
+import re
+
+# The fixed redirect the SYSTEM_PROMPT crisis protocol requires
+CRISIS_RESPONSE = "I'm really sorry you're feeling this way. You're not alone, and there are people who can help. Please reach out to a mental health professional or a crisis line in your area. I am not a substitute for professional help."
+
+CRISIS_RESOURCES = """**If you're in crisis:**
+
+- 🇺🇸 **US**: Call or text 988
+- 🌍 **International**: [findahelpline.com](https://findahelpline.com)
+- 🚨 **Emergency**: 911 or your local emergency number"""
+
+# First-person statements of suicidal intent or self-harm. Bare words like
+# "suicide" or "die" are left out on purpose: "that movie killed me" or a
+# question about suicide prevention should still reach the model. Phrases
+# that also describe other people ("my sister was thinking about suicide",
+# "signs of self-harm") need an "I" in front.
+_I = r"i(?:'?m| am| was|'?ve been| have been|'?ll| will)?"
+# Up to two words between subject and verb ("i just really want to die"),
+# but not a negation, nor someone else as the subject ("i think they want to")
+_ADVERB = (r"(?:(?!(?:not|never|no|dont|didnt|wont|he|she|they|we|you|it"
+           r"|people|someone|somebody|friends?|others)\b)\w+ ){0,2}")
+
+CRISIS_PHRASES = [
+    r"(?:kill|killing|hurt|hurting|harm|harming|cut|cutting|hang|hanging|shoot|shooting) myself",
+    r"(?:end|ending|take|taking) (?:my|my own) life",
+    # One subject for these, so it's tried once per position. "going to die"
+    # is left out: "i'm going to die of boredom"
+    rf"{_I} {_ADVERB}(?:"
+    r"(?:want|wanna|planning|plan|ready) (?:to )?die(?! (?:of|from|laughing)\b)"
+    r"|(?:thinking|think|having thoughts) (?:about|of) (?:committing )?suicide"
+    r"|(?:to )?commit(?:ting)? suicide"
+    r"|(?:to )?self(?:-| )?harm(?:ing|ed)?)",
+    r"wish (?:i was|i were|i'd be|to be) dead",
+    r"better off dead",
+    r"better off without me",
+    r"(?:i'?m|i am|feeling|feel|been) suicidal",
+    r"i (?:have|'?ve had|'?ve been having|keep having|get) suicidal thoughts",
+    r"(?:no|not any) (?:reason|point) (?:to|in) (?:live|living|go on|going on)",
+    r"don'?t want to (?:live|be alive|exist|wake up)",
+    r"end(?:ing)? it all",
+    r"my self(?:-| )?harm(?:ing|ed)?",
+    r"overdos(?:e|ing) on purpose",
+]
+
+# Matched against lowercased text; IGNORECASE makes the alternation ~5x
+# slower. Spaces in the phrases accept any run of whitespace.
+_CRISIS_PATTERN = re.compile(r"\b(?:" + "|".join(CRISIS_PHRASES).replace(" ", r"\s+") + r")\b")
+
+
+def normalize_message(text):
+    """Lowercased, with typographic apostrophes from mobile keyboards ("don’t") made plain"""
+    return text.lower().replace("\u2019", "'")
+
+
+def is_crisis_message(text):
+    """True when a message confidently signals crisis or self-harm.
+
+    Runs locally on every prompt before the model is called, so a match can
+    be answered with CRISIS_RESPONSE without waiting on a round-trip.
+    """
+    return _CRISIS_PATTERN.search(normalize_message(text)) is not None
@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+
+import streamlit as st
+
+DEFAULT_CREDENTIALS_FILE = "firebase-credentials.json"
+
+# Keys of the service account table in secrets.toml
+_SERVICE_ACCOUNT_KEYS = [
+    "type", "project_id", "private_key_id", "private_key", "client_email", "client_id",
+    "auth_uri", "token_uri", "auth_provider_x509_cert_url", "client_x509_cert_url"
+]
+
+
+def load_credentials():
+    """Service account credentials from secrets, or from the JSON key file.
+
+    Returns None when neither is configured.
+    """
+    from firebase_admin import credentials
+
+    if "firebase_credentials" in st.secrets:
+        secret = st.secrets["firebase_credentials"]
+        cred_dict = {key: secret[key] for key in _SERVICE_ACCOUNT_KEYS}
+        # TOML strings often carry the key's newlines escaped
+        cred_dict["private_key"] = cred_dict["private_key"].replace('\\n', '\n')
+        if "universe_domain" in secret:
+            cred_dict["universe_domain"] = secret["universe_domain"]
+        return credentials.Certificate(cred_dict)
+
+    path = st.secrets.get("firebase_credentials_path", DEFAULT_CREDENTIALS_FILE)
+    if os.path.exists(path):
+        return credentials.Certificate(path)
+    return None
+
+
+@st.cache_resource
+def _connect():
+    """Initialise the Firebase app and Firestore client once per process"""
+    started = time.perf_counter()
+    # Imported here so the auth screen renders without the Firebase SDK
+    import firebase_admin
+    from firebase_admin import firestore
+
+    status = {"db": None, "error": None, "init_seconds": None, "warmup_seconds": None}
+    try:
+        if not firebase_admin._apps:
+            cred = load_credentials()
+            if cred is None:
+                status["error"] = "Firebase credentials not found"
+                return status
+            firebase_admin.initialize_app(cred)
+        status["db"] = firestore.client()
+    except Exception as e:
+        status["error"] = f"Firebase initialization issue: {str(e)}"
+    finally:
+        status["init_seconds"] = time.perf_counter() - started
+    return status
+
+
+def get_db():
+    """The shared Firestore client, or None if Firebase isn't configured.
+
+    Created on first use, so pages that never touch Firestore (the auth
+    screen) don't pay for it.
+    """
+    return _connect()["db"]
+
+
+def firebase_status():
+    """Whether Firestore is ready, why not if it isn't, and how long setup took"""
+    status = _connect()
+    return {
+        "ready": status["db"] is not None,
+        "error": status["error"],
+        "init_seconds": status["init_seconds"],
+        "warmup_seconds": status["warmup_seconds"]
+    }
+
+
+def _warm_up():
+    started = time.perf_counter()
+    db = get_db()
+    if db is None:
+        return
+    try:
+        # Any RPC opens the gRPC channel and fetches an access token; a
+        # missing document costs a single read
+        db.collection('users').document('_warmup').get()
+    except Exception:
+        return
+    _connect()["warmup_seconds"] = time.perf_counter() - started
+
+
+@st.cache_resource
+def start_firebase_warmup():
+    """Initialise Firestore and open its channel on a background thread.
+
+    Runs once per process, on the first script run, so the first user to
+    sign in doesn't wait for credential parsing and the gRPC handshake.
+    """
+    thread = threading.Thread(target=_warm_up, name="firebase-warmup", daemon=True)
+    thread.start()
+    return thread
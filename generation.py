@@ -0,0 +1,147 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+# Replies are network-bound, so one thread per concurrent reply is cheap
+MAX_CONCURRENT_REPLIES = 32
+
+# Finished jobs nobody came back for are dropped after this many seconds
+FINISHED_JOB_TTL = 600
+
+
+class GenerationJob:
+    """One assistant reply being generated in the background.
+
+    The worker appends text chunks as they arrive; any script run can attach
+    with ``stream()`` and replay what was produced so far before following
+    the rest live.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.text = ""
+        self.ttft = None
+        self.total_time = None
+        self.usage = None
+        self.error = None
+        self.result = {}
+        self.finished_at = None
+        self._chunks = []
+        self._changed = threading.Condition()
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _append(self, chunk):
+        with self._changed:
+            self._chunks.append(chunk)
+            self._changed.notify_all()
+
+    def _finish(self):
+        with self._changed:
+            self.text = "".join(self._chunks)
+            self.finished_at = time.monotonic()
+            self._done.set()
+            self._changed.notify_all()
+
+    def stream(self, poll_interval=0.25):
+        """Yield every chunk of the reply, blocking until the job finishes"""
+        sent = 0
+        while True:
+            with self._changed:
+                if sent == len(self._chunks) and not self._done.is_set():
+                    self._changed.wait(poll_interval)
+                chunks = self._chunks[sent:]
+                finished = self._done.is_set()
+            yield from chunks
+            sent += len(chunks)
+            if finished and sent == len(self._chunks):
+                return
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+
+class GenerationWorker:
+    """Runs replies off the script thread so they survive Streamlit reruns.
+
+    Jobs are keyed by ``(session_key, chat_key)``: a rerun of the same
+    session on the same chat finds and re-attaches to its in-flight reply.
+    """
+
+    def __init__(self, max_workers=MAX_CONCURRENT_REPLIES):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reply")
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def submit(self, key, start_reply, on_complete=None):
+        """Start a reply in the background.
+
+        ``start_reply()`` returns an iterable of text chunks (a StreamedReply);
+        ``on_complete(job)`` then runs in the worker thread, e.g. to persist
+        the reply even if no session is attached any more.
+        """
+        job = GenerationJob(key)
+        with self._lock:
+            self._prune()
+            previous = self._jobs.get(key)
+            if previous is not None and not previous.done:
+                previous.cancel()
+            self._jobs[key] = job
+        self._executor.submit(self._run, job, start_reply, on_complete)
+        return job
+
+    def _run(self, job, start_reply, on_complete):
+        try:
+            reply = start_reply()
+            try:
+                for chunk in reply:
+                    if job.cancelled:
+                        break
+                    job._append(chunk)
+            finally:
+                job.ttft = getattr(reply, "ttft", None)
+                job.total_time = getattr(reply, "total_time", None)
+                job.usage = getattr(reply, "usage", None)
+                close = getattr(reply, "close", None)
+                if close is not None:
+                    close()
+            if on_complete is not None:
+                job.text = "".join(job._chunks)
+                on_complete(job)
+        except Exception as e:
+            job.error = e
+        finally:
+            job._finish()
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def discard(self, key):
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [key for key, job in self._jobs.items()
+                    if job.done and now - job.finished_at > FINISHED_JOB_TTL]:
+            del self._jobs[key]
+
+
+@st.cache_resource
+def get_generation_worker():
+    """The process-wide reply worker shared by every session"""
+    return GenerationWorker()
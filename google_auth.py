@@ -0,0 +1,235 @@
+import hashlib
+import re
+import threading
+import time
+
+import jwt
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from streamlit_oauth import OAuth2Component
+from urllib3.util.retry import Retry
+
+AUTHORIZE_URL = "https://accounts.google.com/o/oauth2/v2/auth"
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+USERINFO_URL = "https://www.googleapis.com/oauth2/v1/userinfo"
+CERTS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+# (connect, read) seconds; the login click waits on this call
+USERINFO_TIMEOUT = (3.05, 10)
+USERINFO_RETRIES = 2
+
+# Reruns during login reuse the answer for the same access token
+USERINFO_CACHE_TTL = 300
+USERINFO_CACHE_SIZE = 1024
+
+# Used when Google's certs response has no usable Cache-Control
+DEFAULT_KEYS_MAX_AGE = 3600
+# An unknown key id forces a refresh, but at most this often
+MIN_KEYS_REFRESH_INTERVAL = 60
+# Allowed clock drift when checking exp/iat
+ID_TOKEN_LEEWAY = 60
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+@st.cache_resource
+def _oauth_component(client_id, client_secret):
+    return OAuth2Component(client_id, client_secret, AUTHORIZE_URL, TOKEN_URL, TOKEN_URL)
+
+
+def get_oauth_component():
+    """The Google OAuth2Component, built once per process and reused by every render"""
+    return _oauth_component(st.secrets["oauth"]["client_id"], st.secrets["oauth"]["client_secret"])
+
+
+@st.cache_resource
+def get_http_session():
+    """Pooled HTTP session for Google APIs, shared by all sessions.
+
+    Idempotent GETs are retried on connection errors and 429/5xx with a
+    short backoff.
+    """
+    retry = Retry(
+        total=USERINFO_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+
+class UserinfoCache:
+    """Short-lived userinfo answers keyed by a hash of the access token.
+
+    The token itself is never stored.
+    """
+
+    def __init__(self, ttl=USERINFO_CACHE_TTL, max_entries=USERINFO_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @staticmethod
+    def key(access_token):
+        return hashlib.sha256(access_token.encode()).hexdigest()
+
+    def get(self, access_token):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(self.key(access_token))
+            if entry is not None and now - entry[0] < self.ttl:
+                return entry[1]
+            return None
+
+    def put(self, access_token, user_info):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                for key in [key for key, entry in self._entries.items() if now - entry[0] >= self.ttl]:
+                    del self._entries[key]
+            if len(self._entries) >= self.max_entries:
+                # Still full of live entries: drop the oldest
+                del self._entries[min(self._entries, key=lambda key: self._entries[key][0])]
+            self._entries[self.key(access_token)] = (now, user_info)
+
+
+@st.cache_resource
+def get_userinfo_cache():
+    return UserinfoCache()
+
+
+def fetch_userinfo(access_token):
+    """Google profile (id, email, name, picture) for an access token.
+
+    Raises requests.RequestException if Google can't be reached or
+    rejects the token.
+    """
+    cache = get_userinfo_cache()
+    user_info = cache.get(access_token)
+    if user_info is None:
+        response = get_http_session().get(
+            USERINFO_URL,
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=USERINFO_TIMEOUT
+        )
+        response.raise_for_status()
+        user_info = response.json()
+        cache.put(access_token, user_info)
+    return user_info
+
+
+def cache_max_age(headers, default=DEFAULT_KEYS_MAX_AGE):
+    """Seconds a response may be cached for, from Cache-Control and Age"""
+    cache_control = headers.get("Cache-Control", "")
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    match = _MAX_AGE.search(cache_control)
+    if match is None:
+        return default
+    try:
+        age = int(headers.get("Age", 0))
+    except ValueError:
+        age = 0
+    return max(0, int(match.group(1)) - age)
+
+
+class SigningKeys:
+    """Google's ID-token signing keys (a JWKS), refreshed as Google says.
+
+    ``fetch()`` returns ``(jwks_dict, max_age_seconds)``. Keys are reused
+    until max-age runs out; a token signed with a key id we haven't seen
+    triggers an early refresh, since Google rotates keys.
+    """
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = None
+
+    def _refresh(self, now):
+        jwks, max_age = self._fetch()
+        self._keys = {key.key_id: key for key in jwt.PyJWKSet.from_dict(jwks).keys}
+        self._fetched_at = now
+        self._expires_at = now + max_age
+
+    def get(self, key_id):
+        """The key with ``key_id``; raises jwt.PyJWKError if Google has none"""
+        now = time.monotonic()
+        with self._lock:
+            expired = now >= self._expires_at
+            unknown = key_id not in self._keys
+            may_refetch = self._fetched_at is None or now - self._fetched_at >= MIN_KEYS_REFRESH_INTERVAL
+            if expired or (unknown and may_refetch):
+                self._refresh(now)
+            key = self._keys.get(key_id)
+        if key is None:
+            raise jwt.PyJWKError(f"No Google signing key with id {key_id!r}")
+        return key
+
+
+def _fetch_google_keys():
+    response = get_http_session().get(CERTS_URL, timeout=USERINFO_TIMEOUT)
+    response.raise_for_status()
+    return response.json(), cache_max_age(response.headers)
+
+
+@st.cache_resource
+def get_signing_keys():
+    return SigningKeys(_fetch_google_keys)
+
+
+def verify_id_token(id_token, client_id, signing_keys):
+    """Check an ID token's signature, audience, issuer and expiry locally.
+
+    Returns the claims. Raises jwt.PyJWTError if the token isn't valid.
+    """
+    header = jwt.get_unverified_header(id_token)
+    key = signing_keys.get(header.get("kid"))
+    claims = jwt.decode(
+        id_token,
+        key=key.key,
+        algorithms=["RS256"],
+        audience=client_id,
+        leeway=ID_TOKEN_LEEWAY,
+        options={"require": ["exp", "iat", "iss", "aud", "sub"]}
+    )
+    if claims["iss"] not in ISSUERS:
+        raise jwt.InvalidIssuerError(f"Unexpected issuer {claims['iss']!r}")
+    return claims
+
+
+def user_info_from_claims(claims):
+    """ID-token claims in the shape of the userinfo response"""
+    user_info = {"id": claims["sub"], "verified_email": claims.get("email_verified", False)}
+    # Leave out what the token doesn't carry so callers' defaults apply
+    for field in ("email", "name", "picture"):
+        if claims.get(field):
+            user_info[field] = claims[field]
+    return user_info
+
+
+def google_user_info(token):
+    """Profile of the user behind an OAuth token response.
+
+    The ID token from the ``openid`` scope is verified locally, so login
+    needs no extra round-trip to Google. Falls back to the userinfo
+    endpoint if there is no ID token or it can't be checked (e.g. the
+    signing keys can't be fetched).
+    """
+    id_token = token.get("id_token")
+    if id_token:
+        try:
+            claims = verify_id_token(id_token, st.secrets["oauth"]["client_id"], get_signing_keys())
+            return user_info_from_claims(claims)
+        except (jwt.PyJWTError, requests.RequestException):
+            pass
+    return fetch_userinfo(token["access_token"])
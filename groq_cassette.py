@@ -0,0 +1,220 @@
+"""Record Groq chat completions to a JSONL cassette and replay them offline.
+
+    GROQ_CASSETTE=cassettes/chat.jsonl GROQ_CASSETTE_MODE=record streamlit run app_with_auth.py
+    GROQ_CASSETTE=cassettes/chat.jsonl GROQ_CASSETTE_MODE=replay GROQ_REPLAY_SPEED=0 python benchmarks/load_test.py
+
+The same settings can live in secrets as ``groq_cassette``,
+``groq_cassette_mode`` and ``groq_replay_speed``; environment variables
+win, and the mode defaults to replay. get_groq_client() picks them up, so
+the apps need no changes.
+
+Each cassette line is one ``chat.completions.create`` call: the request,
+and either the streamed chunks with their offset in seconds from the
+request, or the whole response with its duration. Replay needs no API key
+or network. A request is answered by a recording of the same request if
+there is one, otherwise by the next recording in turn, so a cassette from
+a short session can drive a long benchmark. ``GROQ_REPLAY_SPEED`` scales
+the recorded timing: 1 replays it as recorded, 2 twice as fast, 0 without
+waiting.
+"""
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+
+import streamlit as st
+
+MODES = ("record", "replay")
+
+# Request parameters that decide what the model says
+_KEY_PARAMS = ("model", "messages", "temperature", "max_tokens", "stream")
+
+
+def cassette_settings():
+    """``(path, mode, speed)`` from the environment or secrets; mode None when off"""
+    def setting(name, default=None):
+        return os.environ.get(name.upper(), st.secrets.get(name.lower(), default))
+
+    path = setting("GROQ_CASSETTE")
+    mode = setting("GROQ_CASSETTE_MODE", "replay")
+    if not path or mode not in MODES:
+        return None, None, 1.0
+    return path, mode, float(setting("GROQ_REPLAY_SPEED", 1.0))
+
+
+def request_key(params):
+    """Stable hash of the parameters that decide a completion"""
+    request = {name: params.get(name) for name in _KEY_PARAMS}
+    return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _dump(model):
+    return model.model_dump(mode="json") if hasattr(model, "model_dump") else model
+
+
+class _Completions:
+    def __init__(self, create):
+        self.create = create
+
+
+class _Chat:
+    def __init__(self, create):
+        self.completions = _Completions(create)
+
+
+class Recorder:
+    """Appends recordings to a cassette file, one JSON line each"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, entry):
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class _RecordingStream:
+    """Passes a streamed response through while noting each chunk's timing"""
+
+    def __init__(self, stream, entry, started, recorder):
+        self._stream = stream
+        self._entry = entry
+        self._started = started
+        self._recorder = recorder
+        self._written = False
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._entry["chunks"].append({"t": time.perf_counter() - self._started, "data": _dump(chunk)})
+            yield chunk
+        self._entry["complete"] = True
+        self._write()
+
+    def _write(self):
+        if not self._written:
+            self._written = True
+            self._recorder.write(self._entry)
+
+    def close(self):
+        try:
+            if hasattr(self._stream, "close"):
+                self._stream.close()
+        finally:
+            # A reply stopped early is still a valid recording of what was sent
+            self._write()
+
+
+class RecordingClient:
+    """Wraps a Groq client (or ScheduledClient) and records every completion"""
+
+    def __init__(self, client, recorder):
+        self.client = client
+        self._recorder = recorder
+        self.chat = _Chat(self._create)
+
+    def _create(self, **params):
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(**params)
+        entry = {"key": request_key(params), "request": params}
+        if params.get("stream"):
+            entry.update(chunks=[], complete=False)
+            return _RecordingStream(response, entry, started, self._recorder)
+        entry.update(response=_dump(response), t=time.perf_counter() - started)
+        self._recorder.write(entry)
+        return response
+
+
+class Cassette:
+    """Recordings loaded from a cassette, handed out per request key"""
+
+    def __init__(self, entries):
+        if not entries:
+            raise ValueError("Cassette has no recordings")
+        self._lock = threading.Lock()
+        self._by_key = {}
+        for entry in entries:
+            self._by_key.setdefault(entry["key"], []).append(entry)
+        self._by_key = {key: itertools.cycle(matches) for key, matches in self._by_key.items()}
+        # Streamed requests fall back to streamed recordings, and vice versa
+        self._in_turn = {}
+        for streamed in (True, False):
+            same_kind = [entry for entry in entries if ("chunks" in entry) == streamed]
+            self._in_turn[streamed] = itertools.cycle(same_kind or entries)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls([json.loads(line) for line in f if line.strip()])
+
+    def pick(self, params):
+        """The recording for these parameters, or the next one in turn"""
+        with self._lock:
+            matches = self._by_key.get(request_key(params))
+            if matches is not None:
+                self.hits += 1
+                return next(matches)
+            self.misses += 1
+            return next(self._in_turn[bool(params.get("stream"))])
+
+
+class _ReplayStream:
+    def __init__(self, chunks, speed):
+        self._chunks = chunks
+        self._speed = speed
+        self._started = time.perf_counter()
+        self._closed = False
+
+    def __iter__(self):
+        from groq.types.chat import ChatCompletionChunk
+
+        for chunk in self._chunks:
+            if self._closed:
+                return
+            if self._speed:
+                delay = self._started + chunk["t"] / self._speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            yield ChatCompletionChunk.model_validate(chunk["data"])
+
+    def close(self):
+        self._closed = True
+
+
+class ReplayClient:
+    """Answers completions from a cassette instead of the network"""
+
+    def __init__(self, cassette, speed=1.0):
+        self.cassette = cassette
+        self.speed = speed
+        self.chat = _Chat(self._create)
+
+    def _create(self, **params):
+        entry = self.cassette.pick(params)
+        if "chunks" in entry:
+            return _ReplayStream(entry["chunks"], self.speed)
+        if self.speed:
+            time.sleep(entry["t"] / self.speed)
+        from groq.types.chat import ChatCompletion
+        return ChatCompletion.model_validate(entry["response"])
+
+
+@st.cache_resource
+def get_recorder(path):
+    """One recorder per cassette file, shared by every session"""
+    return Recorder(path)
+
+
+@st.cache_resource
+def load_cassette(path):
+    """A cassette read once per process and shared by every session"""
+    return Cassette.load(path)
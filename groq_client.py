@@ -0,0 +1,131 @@
+import threading
+
+import httpx
+import streamlit as st
+from groq import Groq
+
+from groq_cassette import RecordingClient, ReplayClient, cassette_settings, get_recorder, load_cassette
+from groq_scheduler import scheduled_client
+
+# One pool serves every session in the process. Keep enough warm connections
+# for a burst of concurrent replies and let idle ones live long enough to be
+# reused between turns.
+MAX_CONNECTIONS = 64
+MAX_KEEPALIVE_CONNECTIONS = 32
+KEEPALIVE_EXPIRY = 120.0
+
+REQUEST_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    """Response body that reports back to the transport once it is closed"""
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """HTTP transport that keeps usage counters for the connection pool"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self.requests_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def handle_request(self, request):
+        with self._lock:
+            self.requests_total += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = super().handle_request(request)
+        except Exception:
+            self._release()
+            raise
+        # Streamed replies hold their connection until the body is read
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, self._release),
+            extensions=response.extensions
+        )
+
+    def stats(self):
+        connections = list(getattr(self._pool, "connections", []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        with self._lock:
+            return {
+                "requests_total": self.requests_total,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "connections_open": len(connections),
+                "connections_idle": idle,
+                "connections_active": len(connections) - idle,
+                "max_connections": MAX_CONNECTIONS
+            }
+
+
+@st.cache_resource
+def _create_groq_client(api_key):
+    transport = PooledTransport(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        )
+    )
+    http_client = httpx.Client(transport=transport, timeout=REQUEST_TIMEOUT)
+    # Retries are owned by the request scheduler so they queue fairly
+    return Groq(api_key=api_key, http_client=http_client, max_retries=0), transport
+
+
+def get_groq_client():
+    """A session's handle on the process-wide Groq client.
+
+    The underlying client and connection pool are shared by every session;
+    the handle routes requests through the rate-limit scheduler under its
+    own queue. Raises KeyError when GROQ_API_KEY is missing from the secrets.
+
+    With a cassette configured (see groq_cassette) completions are recorded
+    on the way through, or replayed from it with no key or network at all.
+    """
+    path, mode, speed = cassette_settings()
+    if mode == "replay":
+        return ReplayClient(load_cassette(path), speed)
+    client, _ = _create_groq_client(st.secrets["GROQ_API_KEY"])
+    handle = scheduled_client(client)
+    if mode == "record":
+        return RecordingClient(handle, get_recorder(path))
+    return handle
+
+
+def groq_pool_stats():
+    """Connection pool usage of the shared client.
+
+    A replayed cassette never opens a connection, so there is no pool to
+    report on, and no API key to build one with.
+    """
+    path, mode, _ = cassette_settings()
+    if mode == "replay":
+        return {"mode": "replay", "cassette": path}
+    _, transport = _create_groq_client(st.secrets["GROQ_API_KEY"])
+    return transport.stats()
@@ -0,0 +1,276 @@
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+
+import streamlit as st
+from groq import APIConnectionError, InternalServerError, RateLimitError
+
+from context_window import count_message_tokens
+
+# Defaults for llama-3.3-70b-versatile on the free tier; Groq's response
+# headers refine the token budget as soon as the first reply comes back.
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_TOKENS_PER_MINUTE = 12000
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+
+# The shared client runs with max_retries=0, so the scheduler owns retries
+RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_reset(value):
+    """Parse Groq's reset durations ("7.66s", "2m59.56s", "120ms") to seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Budget refilled continuously at ``capacity`` units per minute"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now):
+        rate = self.capacity / 60.0
+        self.available = min(self.capacity, self.available + (now - self._updated) * rate)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until ``amount`` can be spent (0 if it can be now)"""
+        self._refill(now)
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        # A single request larger than the whole budget waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / (self.capacity / 60.0)
+
+    def spend(self, amount, now):
+        self._refill(now)
+        self.available -= min(amount, self.capacity)
+
+    def sync(self, limit, remaining, reset, now):
+        """Align with the server's view of the budget from response headers"""
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.available = min(self.available, float(remaining))
+            if remaining <= 0 and reset:
+                self._blocked_until = max(self._blocked_until, now + reset)
+
+    def block_for(self, seconds, now):
+        self._refill(now)
+        self.available = 0.0
+        self._blocked_until = max(self._blocked_until, now + seconds)
+
+
+class RequestScheduler:
+    """Central gate in front of chat.completions.create.
+
+    Requests wait in one FIFO queue per user and are released round-robin
+    across users, so one busy session can't starve the rest, and only when
+    both the requests-per-minute and tokens-per-minute budgets allow. 429s
+    are retried with jittered exponential backoff, honouring retry-after.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE, max_retries=MAX_RETRIES):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._queues = {}
+        self._turns = deque()
+        self._metrics = {
+            "requests": 0,
+            "rate_limited": 0,
+            "retries": 0,
+            "failed": 0,
+            "max_queue_depth": 0
+        }
+        self._waits = deque(maxlen=1000)
+
+    # -- queueing -----------------------------------------------------------
+
+    def _head(self):
+        return self._queues[self._turns[0]][0] if self._turns else None
+
+    def _queue_depth(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _acquire(self, user_key, estimated_tokens):
+        ticket = object()
+        enqueued = time.monotonic()
+        with self._cond:
+            if user_key not in self._queues:
+                self._queues[user_key] = deque()
+                self._turns.append(user_key)
+            self._queues[user_key].append(ticket)
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._queue_depth())
+
+            while True:
+                now = time.monotonic()
+                if self._head() is ticket:
+                    wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait(1.0)
+
+            self.requests.spend(1, now)
+            self.tokens.spend(estimated_tokens, now)
+            queue = self._queues[user_key]
+            queue.popleft()
+            # Round-robin: this user goes to the back of the line
+            self._turns.popleft()
+            if queue:
+                self._turns.append(user_key)
+            else:
+                del self._queues[user_key]
+            self._waits.append(now - enqueued)
+            self._cond.notify_all()
+
+    def _observe(self, headers):
+        # Only the token headers are per minute; Groq's request headers
+        # describe the daily quota, so the RPM bucket stays config-driven.
+        now = time.monotonic()
+        with self._cond:
+            self.tokens.sync(
+                _int_header(headers, "x-ratelimit-limit-tokens"),
+                _int_header(headers, "x-ratelimit-remaining-tokens"),
+                parse_reset(headers.get("x-ratelimit-reset-tokens")),
+                now
+            )
+            self._cond.notify_all()
+
+    def _backoff(self, attempt, headers):
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+        # Full jitter spreads out sessions that were throttled together
+        delay = random.uniform(delay / 2, delay)
+        retry_after = parse_reset(headers.get("retry-after")) if headers is not None else None
+        return max(delay, retry_after or 0.0)
+
+    # -- public API ---------------------------------------------------------
+
+    def create_completion(self, client, user_key, **params):
+        """Queue, rate-limit and retry one chat completion request"""
+        estimated_tokens = sum(count_message_tokens(msg) for msg in params.get("messages", []))
+        estimated_tokens += params.get("max_tokens") or 0
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire(user_key, estimated_tokens)
+            with self._cond:
+                self._metrics["requests"] += 1
+            try:
+                raw = client.chat.completions.with_raw_response.create(**params)
+            except RETRYABLE_ERRORS as e:
+                response = getattr(e, "response", None)
+                headers = response.headers if response is not None else {}
+                delay = self._backoff(attempt, headers)
+                with self._cond:
+                    if isinstance(e, RateLimitError):
+                        self._metrics["rate_limited"] += 1
+                        self.tokens.sync(
+                            _int_header(headers, "x-ratelimit-limit-tokens"),
+                            _int_header(headers, "x-ratelimit-remaining-tokens"),
+                            parse_reset(headers.get("x-ratelimit-reset-tokens")),
+                            time.monotonic()
+                        )
+                        # Hold everyone back, not just this request
+                        self.requests.block_for(delay, time.monotonic())
+                        self._cond.notify_all()
+                    if attempt == self.max_retries:
+                        self._metrics["failed"] += 1
+                        raise
+                    self._metrics["retries"] += 1
+                if not isinstance(e, RateLimitError):
+                    time.sleep(delay)
+                continue
+            self._observe(raw.headers)
+            return raw.parse()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                **self._metrics,
+                "queue_depth": self._queue_depth(),
+                "waiting_users": len(self._turns),
+                "wait_avg_s": sum(waits) / len(waits) if waits else 0.0,
+                "wait_p95_s": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                "wait_max_s": waits[-1] if waits else 0.0,
+                "tokens_available": round(self.tokens.available),
+                "tokens_per_minute": self.tokens.capacity
+            }
+
+
+def _int_header(headers, name):
+    value = headers.get(name)
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class _ScheduledCompletions:
+    def __init__(self, client, scheduler, user_key):
+        self._client = client
+        self._scheduler = scheduler
+        self._user_key = user_key
+
+    def create(self, **params):
+        return self._scheduler.create_completion(self._client, self._user_key, **params)
+
+
+class _ScheduledChat:
+    def __init__(self, completions):
+        self.completions = completions
+
+
+class ScheduledClient:
+    """Drop-in for the Groq client whose completions go through the scheduler.
+
+    Cheap to create: each session gets one so the scheduler can queue its
+    requests fairly, while the underlying client and pool stay shared.
+    """
+
+    def __init__(self, client, scheduler, user_key):
+        self.client = client
+        self.user_key = user_key
+        self.chat = _ScheduledChat(_ScheduledCompletions(client, scheduler, user_key))
+
+
+@st.cache_resource
+def get_request_scheduler():
+    """The process-wide scheduler shared by every session"""
+    return RequestScheduler(
+        requests_per_minute=st.secrets.get("GROQ_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE),
+        tokens_per_minute=st.secrets.get("GROQ_TOKENS_PER_MINUTE", DEFAULT_TOKENS_PER_MINUTE)
+    )
+
+
+def scheduled_client(client, user_key=None):
+    """Wrap the shared client for one session (or user)"""
+    return ScheduledClient(client, get_request_scheduler(), user_key or uuid.uuid4().hex)
@@ -0,0 +1,97 @@
+"""Local intents recognised in a prompt before the model is called.
+
+route_intents() finds every intent in one pass of a single compiled
+alternation. Each intent is a named group of phrases with word boundaries,
+so "reset" doesn't fire inside an unrelated sentence the way the old
+substring scan did ("I don't want to reset my life goals"). A command
+intent is also dropped when a negation comes right before it in the same
+clause ("please don't clear the chat"). Crisis phrases come from crisis.py
+and are never negated: "I don't want to live" is itself a crisis phrase.
+"""
+import re
+
+from crisis import CRISIS_PHRASES, normalize_message
+
+RESET = "reset"
+BREATHING = "breathing"
+MOOD_CHECKIN = "mood_checkin"
+JOURNAL = "journal"
+CRISIS = "crisis"
+
+# "chat" or "conversation" meaning this one, not one with someone or about
+# something ("start a new conversation with my boss", "a new chat app")
+_THIS_CHAT = r"(?:chat|conversation)(?: history)?(?! (?:with|about|between|app|apps|feature|group)\b)"
+
+# A reset has to ask for it and name the chat; bare "start over", "reset" or
+# "new chat" only counts as the whole message (see RESET_COMMANDS), since
+# people start over in life too
+INTENT_PHRASES = {
+    CRISIS: CRISIS_PHRASES,
+    RESET: [
+        rf"(?:reset|clear|restart|wipe|erase) (?:the |this |our |my )?{_THIS_CHAT}",
+        rf"(?:start|begin|open) (?:a )?(?:new|fresh) {_THIS_CHAT}",
+        rf"(?:start|begin) (?:over|again) (?:with )?(?:the |this |our )?{_THIS_CHAT}",
+    ],
+    BREATHING: [
+        r"breathing (?:exercise|technique|practice)s?",
+        r"(?:box|square|4-7-8|deep|guided) breathing",
+        r"breathwork",
+        r"help me (?:breathe|calm my breathing)",
+    ],
+    MOOD_CHECKIN: [
+        r"mood check(?:-| )?in",
+        r"check(?:-| )?in on my mood",
+        r"(?:track|log|rate|record) (?:my|today'?s) mood",
+    ],
+    JOURNAL: [
+        r"journal(?:ing)? (?:prompt|entry)s?",
+        r"(?:start|write|open) (?:a |my |in my )?journal",
+        r"help me journal",
+        r"journal about",
+    ],
+}
+
+# Whole-message commands: "reset", "let's start over", "new chat please"
+RESET_COMMANDS = (r"(?:please )?(?:let'?s |can we )?"
+                  r"(?:reset|start over|start again|begin again|clear(?: chat)?|(?:a )?new (?:chat|conversation))"
+                  r"(?: please)?")
+
+# A negation up to three words before a command, in the same clause
+_NEGATED = re.compile(r"\b(?:not|never|no|don'?t|do not|doesn'?t|didn'?t|won'?t|wouldn'?t|can'?t|cannot)\b(?:\s+\w+){0,3}\s*$")
+
+_CLAUSE_BREAK = re.compile(r"[.!?;,\n]")
+
+
+def _phrases(phrases):
+    # Spaces in the phrases accept any run of whitespace, as in crisis.py
+    return "|".join(phrases).replace(" ", r"\s+")
+
+
+# One leading \b shared by every group, so mid-word positions fail on the
+# first test instead of once per alternative. Crisis goes first: at any one
+# position the first alternative that matches wins.
+_INTENT_PATTERN = re.compile(
+    r"\b(?:" + "|".join(rf"(?P<{intent}>{_phrases(phrases)})" for intent, phrases in INTENT_PHRASES.items()) + r")\b"
+    + rf"|(?P<reset_command>^\W*{_phrases([RESET_COMMANDS])}\W*$)"
+)
+
+_GROUP_INTENTS = {**{intent: intent for intent in INTENT_PHRASES}, "reset_command": RESET}
+
+
+def _negated(text, start):
+    clause_start = 0
+    for match in _CLAUSE_BREAK.finditer(text, 0, start):
+        clause_start = match.end()
+    return _NEGATED.search(text, clause_start, start) is not None
+
+
+def route_intents(text):
+    """The set of local intents in a message, found in one pass"""
+    normalized = normalize_message(text)
+    intents = set()
+    for match in _INTENT_PATTERN.finditer(normalized):
+        intent = _GROUP_INTENTS[match.lastgroup]
+        if intent != CRISIS and _negated(normalized, match.start()):
+            continue
+        intents.add(intent)
+    return intents
@@ -0,0 +1,145 @@
+"""Find the first JSON object in a model reply, nested objects included.
+
+JsonScanner reads text in one pass and can be fed a reply piece by piece
+as it streams in. It tracks whether it is inside a JSON string, so braces
+in string values don't count, and keeps the positions of the braces still
+open on a stack, so every balanced ``{...}`` is known the moment its
+closing brace arrives. It jumps between the characters that matter with
+one regex search instead of looking at every character in Python. Only
+text from the first open brace onwards is kept.
+
+Parsing waits until an outermost object closes, then tries it and the
+objects inside it, earliest first. A brace in the prose that never
+closes ("I feel :-{") can throw the string tracking off for the rest of
+the text, so at the end the text after it is scanned again. At most
+MAX_PARSE_ATTEMPTS parses and MAX_RESCANS rescans are made, so text full
+of braces costs a few linear passes, not one per brace.
+
+message_json() keeps the result on the chat message, so the history loop
+parses each message once instead of on every rerun.
+"""
+import json
+import re
+
+# Per text, before giving up
+MAX_PARSE_ATTEMPTS = 16
+MAX_RESCANS = 3
+
+# Outside strings only braces and quotes matter; inside, quotes and escapes
+_OUTSIDE_STRING = re.compile(r'[{}"]')
+_INSIDE_STRING = re.compile(r'["\\]')
+
+
+class JsonScanner:
+    """Single-pass, incremental scanner for the first top-level JSON object"""
+
+    def __init__(self):
+        self.result = None
+        self.done = False
+        self._attempts = 0
+        self._rescans = 0
+        self._reset()
+
+    def _reset(self):
+        self._in_string = False
+        self._escaped = False
+        # Positions, from the start of the outermost object, of open braces
+        self._open = []
+        # (start, end) of every balanced object inside the outermost one
+        self._closed = []
+        # Pieces of the outermost object from earlier chunks, and their length
+        self._parts = []
+        self._length = 0
+
+    def feed(self, text):
+        """Scan the next piece of text; returns the object once one is found"""
+        if self.done:
+            return self.result
+        # Where the outermost object's text starts in this chunk, and the
+        # offset from chunk positions to positions in that object
+        start = 0
+        offset = self._length
+        i = 0
+        while i < len(text):
+            if not self._open:
+                start = text.find("{", i)
+                if start < 0:
+                    return None
+                self._open.append(0)
+                offset = -start
+                i = start + 1
+            elif self._escaped:
+                self._escaped = False
+                i += 1
+            elif self._in_string:
+                match = _INSIDE_STRING.search(text, i)
+                if match is None:
+                    break
+                if match.group() == "\\":
+                    self._escaped = True
+                else:
+                    self._in_string = False
+                i = match.end()
+            else:
+                match = _OUTSIDE_STRING.search(text, i)
+                if match is None:
+                    break
+                char = match.group()
+                i = match.end()
+                if char == '"':
+                    self._in_string = True
+                elif char == "{":
+                    self._open.append(match.start() + offset)
+                else:
+                    self._closed.append((self._open.pop(), i + offset))
+                    if not self._open:
+                        outermost = "".join(self._parts) + text[start:i]
+                        if self._parse(outermost):
+                            return self.result
+                        self._reset()
+        if self._open:
+            self._parts.append(text[start:])
+            self._length += len(text) - start
+        return None
+
+    def _parse(self, text):
+        """Try the balanced objects found in ``text``, earliest first"""
+        for begin, end in sorted(self._closed):
+            if self._attempts >= MAX_PARSE_ATTEMPTS:
+                self.done = True
+                return True
+            self._attempts += 1
+            try:
+                self.result = json.loads(text[begin:end])
+            except (ValueError, RecursionError):
+                continue
+            self.done = True
+            return True
+        return False
+
+    def finish(self):
+        """End of the text: try what's inside an object that never closed"""
+        while not self.done and self._open:
+            pending = "".join(self._parts)
+            if self._parse(pending) or self._rescans >= MAX_RESCANS:
+                self.done = True
+                break
+            # Scan again from just past the unclosed brace
+            self._rescans += 1
+            self._reset()
+            self.feed(pending[1:])
+        return self.result
+
+
+def extract_json(text):
+    """The first JSON object in text, or None"""
+    scanner = JsonScanner()
+    scanner.feed(text)
+    return scanner.finish()
+
+
+def message_json(message):
+    """The JSON object in a chat message, parsed once and kept on the message"""
+    if "json" not in message:
+        message["json"] = extract_json(message["content"])
+    return message["json"]
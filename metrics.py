@@ -0,0 +1,230 @@
+"""Where a chat turn's time goes, per app variant.
+
+Each stage (``ttft``, ``llm``, ``firestore_read``, ``firestore_write``,
+``render``) feeds a latency histogram labelled with the app that recorded
+it; counters track model tokens and Firestore reads and writes. Everything
+is kept in memory for the process and can be read two ways:
+
+* ``Metrics.summary()``: p50/p95/p99 per app and stage, for the Diagnostics
+  expander
+* ``start_metrics_server(port)``: a Prometheus text endpoint at ``/metrics``
+  on a background thread (``metrics_port`` in secrets)
+"""
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+PREFIX = "clarity"
+
+# Upper bounds in seconds, from a cache hit to a slow model reply; finer
+# around 0.5-3s, where replies land and p95 has to be read
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10, 30)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_UNSAFE_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus exposes it"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the +Inf overflow
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimated ``q`` quantile, interpolated within its bucket like
+        Prometheus' histogram_quantile(); None when nothing was observed"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def _metric_name(*parts):
+    return _UNSAFE_NAME.sub("_", "_".join(parts))
+
+
+class Metrics:
+    """Process-wide latency histograms, counters and stats collectors.
+
+    Thread-safe: stages are recorded from script runs and from the reply
+    and chat-save workers alike.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = {}
+
+    def observe(self, app, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get((app, stage))
+            if histogram is None:
+                histogram = self._histograms[(app, stage)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_collector(self, name, stats):
+        """Export the numbers in ``stats()`` (a dict) as gauges on every scrape"""
+        with self._lock:
+            self._collectors[name] = stats
+
+    def summary(self):
+        """One row per app and stage with its count and p50/p95/p99 in ms"""
+        with self._lock:
+            rows = []
+            for (app, stage), histogram in sorted(self._histograms.items()):
+                row = {"app": app, "stage": stage, "count": histogram.count}
+                for q in QUANTILES:
+                    row[f"p{round(q * 100)}_ms"] = round(histogram.quantile(q) * 1000, 1)
+                rows.append(row)
+            return rows
+
+    def counters(self):
+        with self._lock:
+            return {name + _labels(dict(labels)): value for (name, labels), value in sorted(self._counters.items())}
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            collectors = sorted(self._collectors.items())
+
+        name = f"{PREFIX}_stage_seconds"
+        lines = [f"# HELP {name} Wall-clock time of each stage of a chat turn.", f"# TYPE {name} histogram"]
+        for (app, stage), histogram in histograms:
+            labels = {"app": app, "stage": stage}
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), histogram.counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+        typed = set()
+        for (counter, labels), value in counters:
+            name = _metric_name(PREFIX, counter)
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_labels(dict(labels))} {value}")
+
+        for collector, stats in collectors:
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    name = _metric_name(PREFIX, collector, key)
+                    lines.append(f"# TYPE {name} gauge")
+                    lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class AppMetrics:
+    """A Metrics registry bound to one app variant's label"""
+
+    def __init__(self, registry, app):
+        self.registry = registry
+        self.app = app
+
+    def observe(self, stage, seconds):
+        self.registry.observe(self.app, stage, seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def count(self, name, amount=1, **labels):
+        self.registry.increment(name, amount, app=self.app, **labels)
+
+    def record_usage(self, usage):
+        """Token counts from a completion's ``usage`` (may be None)"""
+        for kind in ("prompt", "completion"):
+            tokens = getattr(usage, f"{kind}_tokens", None)
+            if tokens:
+                self.count("llm_tokens_total", tokens, kind=kind)
+
+
+@st.cache_resource
+def get_metrics():
+    """The process-wide registry shared by every session and app"""
+    return Metrics()
+
+
+def metrics_for(app):
+    return AppMetrics(get_metrics(), app)
+
+
+@st.cache_resource
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve ``/metrics`` in Prometheus text format from a daemon thread.
+
+    Started once per process. Returns the server, or None if the port
+    can't be bound.
+    """
+    registry = get_metrics()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,58 @@
+"""Move chat transcripts from the ``messages`` array into a subcollection.
+
+Chats used to keep their whole transcript in one ``messages`` array that was
+rewritten on every reply. They now store one document per message under
+``users/{uid}/chats/{chat_id}/messages``. Run this once against existing data:
+
+    python migrate_chat_messages.py --credentials firebase-credentials.json
+    python migrate_chat_messages.py --dry-run
+
+The migration is idempotent: messages are written at their sequence number
+and the array is only removed once they are all stored, so it is safe to
+re-run after an interruption. Chats that are missing the sidebar index
+fields (``title``, ``preview``, ``message_count``) get them backfilled.
+"""
+import argparse
+
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+from chat_store import migrate_chat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--credentials", default="firebase-credentials.json",
+                        help="path to the Firebase service account JSON")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="report what would be migrated without writing")
+    args = parser.parse_args()
+
+    firebase_admin.initialize_app(credentials.Certificate(args.credentials))
+    db = firestore.client()
+
+    chats_seen = chats_migrated = messages_moved = 0
+    for chat in db.collection_group('chats').stream():
+        chats_seen += 1
+        data = chat.to_dict() or {}
+        legacy = data.get('messages')
+        if legacy is None:
+            if 'title' not in data and not args.dry_run:
+                # Already in the subcollection, only missing its index fields
+                migrate_chat(db, chat)
+            continue
+        if args.dry_run:
+            print(f"would migrate {chat.reference.path} ({len(legacy)} messages)")
+            chats_migrated += 1
+            messages_moved += len(legacy)
+            continue
+        messages_moved += migrate_chat(db, chat)
+        chats_migrated += 1
+        print(f"migrated {chat.reference.path} ({len(legacy)} messages)")
+
+    action = "would move" if args.dry_run else "moved"
+    print(f"{chats_seen} chats scanned, {chats_migrated} migrated, {action} {messages_moved} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import importlib
+import threading
+import time
+
+import streamlit as st
+
+# What a signed-in session needs, in the order it needs it: the Google
+# button and userinfo call on the auth screen, then Firestore and Groq
+PREWARM_MODULES = (
+    "google_auth",
+    "firebase_admin.firestore",
+    "groq_client",
+    "groq_scheduler"
+)
+
+
+def _import_all(modules, timings):
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        timings[name] = time.perf_counter() - started
+
+
+@st.cache_resource
+def start_import_prewarm(modules=PREWARM_MODULES):
+    """Import the heavy modules on a background thread, once per process.
+
+    The app imports them lazily where they're used; this gets them into
+    sys.modules while the first visitor is still on the auth screen.
+    Returns the per-module import times (seconds) as they complete.
+    """
+    timings = {}
+    threading.Thread(target=_import_all, args=(modules, timings), name="import-prewarm", daemon=True).start()
+    return timings
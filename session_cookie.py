@@ -0,0 +1,108 @@
+"""Signed, expiring session token kept in a browser cookie.
+
+Lets a reload or redeploy restore ``st.session_state.user`` without
+another OAuth round-trip. The token is ``<payload>.<signature>``: the
+payload is the user's profile plus an expiry, base64url-encoded JSON, and
+the signature is an HMAC-SHA256 of it under ``st.secrets["session_secret"]``.
+Without that secret the feature is off, and so it is when the secret is
+shorter than MIN_SECRET_LENGTH, as placeholders like "change-me" are:
+anyone who can guess it can sign a cookie for any user id.
+
+The cookie is written from the page with JavaScript (Streamlit can't set
+response headers), so it can't be HttpOnly; it only ever carries what the
+sidebar already shows, and a forged or expired one is ignored.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import streamlit as st
+
+SESSION_COOKIE = "clarity_session"
+SESSION_TTL = 7 * 24 * 3600
+
+# secrets.token_urlsafe(32) gives 43 characters
+MIN_SECRET_LENGTH = 32
+
+_USER_FIELDS = ("id", "email", "name", "photo_url")
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(payload, secret):
+    return _b64encode(hmac.new(secret.encode(), payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def sign_session(user, secret, ttl=SESSION_TTL, now=None):
+    """Session token for ``user`` that expires ``ttl`` seconds from now"""
+    now = time.time() if now is None else now
+    body = {"user": {field: user.get(field) for field in _USER_FIELDS}, "exp": int(now + ttl)}
+    payload = _b64encode(json.dumps(body, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_signature(payload, secret)}"
+
+
+def verify_session(token, secret, now=None):
+    """The user in a session token, or None if it's forged, malformed or expired"""
+    now = time.time() if now is None else now
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _signature(payload, secret)):
+            return None
+        body = json.loads(_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(body, dict) or body.get("exp", 0) <= now:
+        return None
+    user = body.get("user")
+    if not isinstance(user, dict) or not user.get("id"):
+        return None
+    return user
+
+
+def _session_secret():
+    """The signing secret, or None if it's missing or too weak to sign with"""
+    secret = st.secrets.get("session_secret")
+    if not secret or len(secret) < MIN_SECRET_LENGTH:
+        return None
+    return secret
+
+
+def _set_cookie_html(value, max_age):
+    return f"""<script>
+(function () {{
+    const secure = window.parent.location.protocol === "https:" ? "; Secure" : "";
+    window.parent.document.cookie = "{SESSION_COOKIE}={value}; Max-Age={max_age}; Path=/; SameSite=Lax" + secure;
+}})();
+</script>"""
+
+
+def restore_session_user():
+    """The user from this browser's session cookie, if it holds a valid token"""
+    secret = _session_secret()
+    if not secret:
+        return None
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if not token:
+        return None
+    return verify_session(token, secret)
+
+
+def remember_session_user(user):
+    """Store a signed token for ``user`` in the browser"""
+    secret = _session_secret()
+    if not secret:
+        return
+    st.iframe(_set_cookie_html(sign_session(user, secret), SESSION_TTL), height=1)
+
+
+def forget_session_user():
+    """Expire the session cookie, e.g. on sign-out"""
+    st.iframe(_set_cookie_html("", 0), height=1)
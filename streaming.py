@@ -0,0 +1,67 @@
+import time
+
+
+class StreamedReply:
+    """Iterable over the text deltas of a chat completion.
+
+    Pass it straight to ``st.write_stream``. While it is consumed it records
+    time-to-first-token and total generation time, and once exhausted
+    ``text`` holds the full reply so it can be persisted.
+    """
+
+    def __init__(self, response, started_at, streaming=True):
+        self._response = response
+        self._streaming = streaming
+        self.started_at = started_at
+        self.ttft = None
+        self.total_time = None
+        self.usage = None
+        self.text = ""
+
+    def __iter__(self):
+        parts = []
+        if self._streaming:
+            for chunk in self._response:
+                # Groq reports token usage on the final chunk under x_groq
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                    self.usage = x_groq.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - self.started_at
+                parts.append(delta)
+                yield delta
+        else:
+            content = self._response.choices[0].message.content or ""
+            self.usage = getattr(self._response, "usage", None)
+            self.ttft = time.perf_counter() - self.started_at
+            parts.append(content)
+            yield content
+        self.text = "".join(parts)
+        self.total_time = time.perf_counter() - self.started_at
+
+    def close(self):
+        """Stop generating early and release the HTTP connection"""
+        if self._streaming and hasattr(self._response, "close"):
+            self._response.close()
+
+
+def stream_reply(client, messages, model="llama-3.3-70b-versatile", temperature=0.7, max_tokens=200, stream=True):
+    """Start a chat completion and return a StreamedReply over its tokens.
+
+    With ``stream=False`` the request is made the old way and the whole reply
+    is yielded as a single chunk, so callers can keep one code path.
+    """
+    started_at = time.perf_counter()
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=stream
+    )
+    return StreamedReply(response, started_at, streaming=stream)
@@ -0,0 +1,128 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+# Small, fast model: summaries are background work, not user-facing replies
+SUMMARY_MODEL = "llama-3.1-8b-instant"
+
+# Start folding once this many messages sit outside the summary...
+SUMMARIZE_AFTER_MESSAGES = 16
+# ...and always leave this many recent messages verbatim
+KEEP_RECENT_MESSAGES = 8
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an AI assistant.
+Merge the previous summary with the new messages into one updated summary.
+Keep the user's emotional state and how it changed, recurring themes, important facts they shared, and anything the assistant suggested or promised.
+Write in the third person, in plain text, in at most 120 words."""
+
+
+class SummaryStore:
+    """Latest rolling summary per chat, shared by every session in the process.
+
+    Background jobs write here; the next script run picks the result up and
+    sends it with the following request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries = {}
+        self._pending = set()
+
+    def get(self, chat_id):
+        with self._lock:
+            return self._summaries.get(chat_id)
+
+    def put(self, chat_id, text, upto):
+        with self._lock:
+            current = self._summaries.get(chat_id)
+            # Jobs can finish out of order; never regress to an older summary
+            if current is None or upto >= current["upto"]:
+                self._summaries[chat_id] = {"text": text, "upto": upto}
+
+    def claim(self, chat_id):
+        """Mark a chat as being summarized; False if a job is already running"""
+        with self._lock:
+            if chat_id in self._pending:
+                return False
+            self._pending.add(chat_id)
+            return True
+
+    def release(self, chat_id):
+        with self._lock:
+            self._pending.discard(chat_id)
+
+
+@st.cache_resource
+def get_summary_store():
+    return SummaryStore()
+
+
+@st.cache_resource
+def get_summary_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary")
+
+
+def needs_summary(messages, summary_upto):
+    """True once enough messages have piled up past the current summary"""
+    return len(messages) - summary_upto > SUMMARIZE_AFTER_MESSAGES
+
+
+def fold_into_summary(client, previous_summary, messages):
+    """Ask the model to merge ``messages`` into ``previous_summary``"""
+    transcript = "\n".join(f"{msg['role'].capitalize()}: {msg['content']}" for msg in messages)
+    response = client.chat.completions.create(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Previous summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"}
+        ],
+        temperature=0.2,
+        max_tokens=250
+    )
+    return response.choices[0].message.content.strip()
+
+
+def schedule_summary_update(client, chat_id, messages, summary, on_saved=None):
+    """Fold older turns into the chat's summary in a background thread.
+
+    ``summary`` is the chat's current ``{"text", "upto"}`` state, where
+    ``upto`` is the number of leading messages it already covers. Returns
+    False when nothing needs doing or a job for this chat is in flight.
+    ``on_saved(text, upto)`` runs in the worker to persist the result.
+    """
+    if not chat_id or not needs_summary(messages, summary["upto"]):
+        return False
+
+    store = get_summary_store()
+    if not store.claim(chat_id):
+        return False
+
+    upto = len(messages) - KEEP_RECENT_MESSAGES
+    new_messages = [dict(msg) for msg in messages[summary["upto"]:upto]]
+    previous = summary["text"]
+
+    def run():
+        try:
+            text = fold_into_summary(client, previous, new_messages)
+            store.put(chat_id, text, upto)
+            if on_saved is not None:
+                on_saved(text, upto)
+        except Exception:
+            # Best effort: the next turn simply retries with the raw history
+            pass
+        finally:
+            store.release(chat_id)
+
+    get_summary_executor().submit(run)
+    return True
+
+
+def latest_summary(chat_id, summary):
+    """Return whichever is newer: the session's summary or a finished job's"""
+    if not chat_id:
+        return summary
+    stored = get_summary_store().get(chat_id)
+    if stored is not None and stored["upto"] > summary["upto"]:
+        return stored
+    return summary
@@ -0,0 +1,40 @@
+"""Labelled messages for the local crisis detector."""
+import pytest
+
+from crisis import is_crisis_message
+
+# Must get the fixed redirect
+CRISIS = [
+    "I just want to die",
+    "I do want to die",
+    "I just really want to die",
+    "I've been thinking about suicide a lot",
+    "I have suicidal thoughts most nights",
+    "I've been self harming again",
+    "I'm going to commit suicide",
+    "I don’t want to live anymore",
+]
+
+# About crisis, or hyperbole, but not a first-person crisis: these go to the model
+NOT_CRISIS = [
+    "What are the warning signs of self-harm?",
+    "How do I support my friend who is self harming?",
+    "My sister was thinking about suicide last year, how do I talk to her?",
+    "I am going to die of boredom in this meeting",
+    "I'm not thinking about suicide, just exhausted",
+    "Why do people commit suicide?",
+    "I could die laughing at that video",
+    "I do not want to die",
+    "I think they want to die in that show",
+    "I have friends thinking about suicide",
+]
+
+
+@pytest.mark.parametrize("text", CRISIS)
+def test_crisis_detected(text):
+    assert is_crisis_message(text)
+
+
+@pytest.mark.parametrize("text", NOT_CRISIS)
+def test_not_crisis(text):
+    assert not is_crisis_message(text)
@@ -0,0 +1,197 @@
+"""Local Google ID-token verification, with no network access.
+
+Tokens are signed with RSA keys generated on the spot and served as a JWKS
+through SigningKeys, as Google's certs endpoint would.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+import google_auth
+from google_auth import (
+    DEFAULT_KEYS_MAX_AGE,
+    MIN_KEYS_REFRESH_INTERVAL,
+    SigningKeys,
+    cache_max_age,
+    verify_id_token
+)
+
+CLIENT_ID = "check-client.apps.googleusercontent.com"
+
+
+class Clock:
+    """Stands in for the time module in google_auth, moved by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class KeyServer:
+    """A local JWKS endpoint: ``fetch()`` returns (jwks, max_age) and is counted"""
+
+    def __init__(self, max_age=DEFAULT_KEYS_MAX_AGE):
+        self.max_age = max_age
+        self.keys = {}
+        self.fetches = 0
+
+    def add_key(self, key_id):
+        self.keys[key_id] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        return self.keys[key_id]
+
+    def fetch(self):
+        self.fetches += 1
+        jwks = []
+        for key_id, private_key in self.keys.items():
+            jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+            jwk.update(kid=key_id, alg="RS256", use="sig")
+            jwks.append(jwk)
+        return {"keys": jwks}, self.max_age
+
+
+def claims(**overrides):
+    now = int(time.time())
+    base = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "sub": "1234567890",
+        "email": "check@example.com",
+        "email_verified": True,
+        "iat": now,
+        "exp": now + 3600
+    }
+    base.update(overrides)
+    return base
+
+
+def sign(server, key_id, payload):
+    return jwt.encode(payload, server.keys[key_id], algorithm="RS256", headers={"kid": key_id})
+
+
+def hs256_with_public_key(server, key_id):
+    """Key confusion: an HS256 token whose HMAC secret is the published public key.
+
+    Built by hand, since PyJWT won't sign with a key that looks like one.
+    """
+    def b64(data):
+        return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+    public_pem = server.keys[key_id].public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    signing_input = b64(json.dumps({"alg": "HS256", "typ": "JWT", "kid": key_id}).encode()) + b"." + \
+        b64(json.dumps(claims()).encode())
+    return (signing_input + b"." + b64(hmac.new(public_pem, signing_input, hashlib.sha256).digest())).decode()
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = KeyServer()
+    server.add_key("key-1")
+    return server
+
+
+@pytest.fixture
+def keys(server):
+    return SigningKeys(server.fetch)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(google_auth, "time", clock)
+    return clock
+
+
+def test_valid_token_accepted(server, keys):
+    assert verify_id_token(sign(server, "key-1", claims()), CLIENT_ID, keys)["sub"] == "1234567890"
+
+
+def test_issuer_without_https_accepted(server, keys):
+    verify_id_token(sign(server, "key-1", claims(iss="accounts.google.com")), CLIENT_ID, keys)
+
+
+@pytest.mark.parametrize("payload", [
+    claims(aud="someone-else"),
+    claims(iss="https://evil.example.com"),
+    claims(iat=int(time.time()) - 7200, exp=int(time.time()) - 3600),
+    {name: value for name, value in claims().items() if name != "sub"}
+], ids=["wrong audience", "wrong issuer", "expired", "missing sub"])
+def test_bad_claims_rejected(server, keys, payload):
+    with pytest.raises(jwt.PyJWTError):
+        verify_id_token(sign(server, "key-1", payload), CLIENT_ID, keys)
+
+
+def test_unknown_key_id_rejected(keys):
+    token = jwt.encode(claims(), rsa.generate_private_key(public_exponent=65537, key_size=2048),
+                       algorithm="RS256", headers={"kid": "not-published"})
+    with pytest.raises(jwt.PyJWTError):
+        verify_id_token(token, CLIENT_ID, keys)
+
+
+def test_hs256_token_rejected(server, keys):
+    with pytest.raises(jwt.PyJWTError):
+        verify_id_token(hs256_with_public_key(server, "key-1"), CLIENT_ID, keys)
+
+
+def test_unsigned_token_rejected(keys):
+    token = jwt.encode(claims(), None, algorithm="none", headers={"kid": "key-1"})
+    with pytest.raises(jwt.PyJWTError):
+        verify_id_token(token, CLIENT_ID, keys)
+
+
+def test_keys_refreshed_after_max_age(clock):
+    server = KeyServer(max_age=300)
+    server.add_key("key-1")
+    keys = SigningKeys(server.fetch)
+
+    keys.get("key-1")
+    keys.get("key-1")
+    assert server.fetches == 1
+
+    clock.now += 301
+    keys.get("key-1")
+    assert server.fetches == 2
+
+
+def test_unknown_key_id_refetches_at_most_once_per_interval(clock):
+    server = KeyServer(max_age=300)
+    server.add_key("key-1")
+    keys = SigningKeys(server.fetch)
+    keys.get("key-1")
+
+    for _ in range(5):
+        with pytest.raises(jwt.PyJWKError):
+            keys.get("unknown")
+    assert server.fetches == 1
+
+    # A rotated key is picked up once the interval has passed, for one fetch
+    server.add_key("key-2")
+    clock.now += MIN_KEYS_REFRESH_INTERVAL
+    assert keys.get("key-2").key_id == "key-2"
+    assert server.fetches == 2
+
+
+@pytest.mark.parametrize("headers, max_age", [
+    ({"Cache-Control": "public, max-age=21600"}, 21600),
+    ({"Cache-Control": "max-age=21600", "Age": "600"}, 21000),
+    ({"Cache-Control": "max-age=60", "Age": "120"}, 0),
+    ({"Cache-Control": "max-age=60", "Age": "soon"}, 60),
+    ({"Cache-Control": "no-store, max-age=60"}, 0),
+    ({"Cache-Control": "no-cache"}, 0),
+    ({}, DEFAULT_KEYS_MAX_AGE)
+])
+def test_cache_max_age(headers, max_age):
+    assert cache_max_age(headers) == max_age
@@ -0,0 +1,32 @@
+"""Labelled messages for the reset intent in route_intents."""
+import pytest
+
+from intents import RESET, route_intents
+
+# Must wipe the conversation
+RESET_MESSAGES = [
+    "new chat",
+    "Let's start over",
+    "Can we start a new conversation?",
+    "please clear the chat",
+]
+
+# Mention a chat or a reset, but must not wipe anything
+NOT_RESET_MESSAGES = [
+    "I don't want to reset my life goals",
+    "I'm thinking about a new chat app for work",
+    "any tips on the new chat feature?",
+    "How do I start a new conversation with my boss?",
+    "I need to clear my history with him",
+    "please don't clear the chat",
+]
+
+
+@pytest.mark.parametrize("text", RESET_MESSAGES)
+def test_reset(text):
+    assert RESET in route_intents(text)
+
+
+@pytest.mark.parametrize("text", NOT_RESET_MESSAGES)
+def test_not_reset(text):
+    assert RESET not in route_intents(text)
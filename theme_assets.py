@@ -0,0 +1,127 @@
+"""Theme CSS served as cached static files.
+
+The app stylesheets live in styles/. Each one is minified and written to
+static/css/<name>.<hash>.css, which Streamlit serves from /app/static when
+server.enableStaticServing is on (see .streamlit/config.toml). Reruns only
+send a small loader that pulls the file into the page once; the browser
+keeps it in its HTTP cache, and the content hash in the name means an
+edited stylesheet is never mixed up with a cached old one.
+
+    python theme_assets.py        # rebuild every stylesheet up front
+
+Missing or stale files are also rebuilt on demand the first time an app
+asks for them.
+"""
+import hashlib
+import os
+import re
+from pathlib import Path
+
+import streamlit as st
+
+ROOT = Path(__file__).resolve().parent
+STYLES_DIR = ROOT / "styles"
+CSS_OUTPUT_DIR = ROOT / "static" / "css"
+
+# The URL Streamlit serves the static/ folder under
+STATIC_URL_PREFIX = "app/static/css/"
+
+# Strings and comments first so whitespace inside strings is left alone
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)|(\s+)', re.S)
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from a stylesheet"""
+    strings = []
+
+    def replace(match):
+        string, comment, _ = match.groups()
+        if string:
+            strings.append(string)
+            return f"\0{len(strings) - 1}\0"
+        return "" if comment else " "
+
+    css = _CSS_TOKENS.sub(replace, css)
+    css = _CSS_PUNCTUATION.sub(r"\1", css)
+    # "color: red" -> "color:red"; a space *before* a colon is a selector
+    # combinator (".a :hover") and has to stay
+    css = css.replace(": ", ":").replace(";}", "}")
+    css = re.sub(r"\0(\d+)\0", lambda m: strings[int(m.group(1))], css)
+    return css.strip()
+
+
+def build_css_asset(name):
+    """Minify styles/<name>.css into static/css and return the file name"""
+    css = minify_css((STYLES_DIR / f"{name}.css").read_text(encoding="utf-8"))
+    digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+    filename = f"{name}.{digest}.css"
+    target = CSS_OUTPUT_DIR / filename
+    if not target.exists():
+        CSS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        # Write then rename so a concurrent request never sees half a file
+        partial = target.with_suffix(f".{os.getpid()}.tmp")
+        partial.write_text(css, encoding="utf-8")
+        partial.replace(target)
+        for stale in CSS_OUTPUT_DIR.glob(f"{name}.*.css"):
+            if stale != target and re.fullmatch(rf"{re.escape(name)}\.[0-9a-f]{{12}}\.css", stale.name):
+                stale.unlink(missing_ok=True)
+    return filename, css
+
+
+@st.cache_resource
+def _css_asset(name, modified):
+    # ``modified`` keys the cache on the source's mtime so edits are picked up
+    return build_css_asset(name)
+
+
+def _loader_html(name, filename):
+    return f"""<script>
+(function () {{
+    const doc = window.parent.document;
+    const id = "theme-{name}";
+    const current = doc.getElementById(id);
+    if (current && current.dataset.file === "{filename}") return;
+    fetch(new URL("{STATIC_URL_PREFIX}{filename}", doc.baseURI), {{cache: "force-cache"}})
+        .then(function (response) {{ return response.text(); }})
+        .then(function (css) {{
+            const style = doc.createElement("style");
+            style.id = id;
+            style.dataset.file = "{filename}";
+            style.textContent = css;
+            if (current) current.remove();
+            doc.head.appendChild(style);
+        }});
+}})();
+</script>"""
+
+
+def inject_theme(name):
+    """Apply styles/<name>.css to the page.
+
+    Falls back to an inline <style> block when static serving is off or
+    the built file can't be written, so the app always gets its theme.
+    """
+    source = STYLES_DIR / f"{name}.css"
+    try:
+        filename, css = _css_asset(name, source.stat().st_mtime)
+    except OSError:
+        st.markdown(f"<style>{minify_css(source.read_text(encoding='utf-8'))}</style>", unsafe_allow_html=True)
+        return
+    if not st.get_option("server.enableStaticServing"):
+        st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+        return
+    # Streamlit serves .css as text/plain, which browsers refuse as a
+    # <link> stylesheet, so the loader fetches it and inlines it once.
+    # st.iframe refuses a height of 0; one blank pixel is the least it takes
+    st.iframe(_loader_html(name, filename), height=1)
+
+
+def main():
+    for source in sorted(STYLES_DIR.glob("*.css")):
+        filename, css = build_css_asset(source.stem)
+        print(f"{source.name:<28} {source.stat().st_size:>7} -> {filename} {len(css):>7} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import streamlit as st
+
+# Messages drawn on a full run before "Load earlier messages" is needed
+TRANSCRIPT_PAGE_SIZE = 30
+
+_SCROLL_TO_ANCHOR = """<script>
+const anchor = window.parent.document.getElementById("transcript-anchor");
+if (anchor) anchor.scrollIntoView({block: "start"});
+</script>"""
+
+
+def _load_earlier(view, oldest_shown, page_size):
+    view["window"] += page_size
+    # Come back to the message the reader was looking at, not the top
+    view["anchor"] = oldest_shown
+
+
+def render_transcript(messages, chat_key, page_size=TRANSCRIPT_PAGE_SIZE):
+    """Draw the newest ``page_size`` messages, paging older ones in on demand.
+
+    A long chat would otherwise rebuild one chat_message container per
+    message on every full run. The window widens a page at a time and
+    resets when ``chat_key`` changes. Returns the number of messages
+    covered, i.e. ``len(messages)``.
+    """
+    view = st.session_state.get("transcript_view")
+    if view is None or view["chat_key"] != chat_key:
+        view = {"chat_key": chat_key, "window": page_size, "anchor": None}
+        st.session_state.transcript_view = view
+
+    start = max(0, len(messages) - view["window"])
+    if start > 0:
+        st.button(
+            f"⬆️ Load earlier messages ({start} more)",
+            key="load_earlier_messages",
+            on_click=_load_earlier,
+            args=(view, start, page_size),
+            use_container_width=True
+        )
+
+    for index in range(start, len(messages)):
+        if index == view["anchor"]:
+            st.markdown('<div id="transcript-anchor"></div>', unsafe_allow_html=True)
+        with st.chat_message(messages[index]["role"]):
+            st.markdown(messages[index]["content"])
+
+    if view["anchor"] is not None:
+        st.iframe(_SCROLL_TO_ANCHOR, height=1)
+        view["anchor"] = None
+    return len(messages)
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import streamlit as st
+
+# last_login is a coarse "recently active" marker, not an audit log
+LAST_LOGIN_TOUCH_INTERVAL = 15 * 60
+
+# Users remembered per process; the oldest are forgotten first
+MAX_KNOWN_USERS = 10000
+
+
+class KnownUsers:
+    """Which users this process knows have a document, and when it last
+    wrote their last_login.
+
+    Login consults it to skip Firestore writes entirely when the user was
+    seen recently. Forgetting a user only costs one extra write later.
+    """
+
+    def __init__(self, touch_interval=LAST_LOGIN_TOUCH_INTERVAL, max_entries=MAX_KNOWN_USERS):
+        self.touch_interval = touch_interval
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._touched = {}
+        self.skipped = 0
+        self.writes = 0
+
+    def is_known(self, user_id):
+        with self._lock:
+            return user_id in self._touched
+
+    def needs_touch(self, user_id, now):
+        with self._lock:
+            touched = self._touched.get(user_id)
+            if touched is not None and now - touched < self.touch_interval:
+                self.skipped += 1
+                return False
+            return True
+
+    def record(self, user_id, now):
+        with self._lock:
+            self.writes += 1
+            # Re-insert so dict order stays oldest-touched first
+            self._touched.pop(user_id, None)
+            self._touched[user_id] = now
+            while len(self._touched) > self.max_entries:
+                del self._touched[next(iter(self._touched))]
+
+    def stats(self):
+        with self._lock:
+            return {'known_users': len(self._touched), 'writes': self.writes, 'skipped': self.skipped}
+
+
+@st.cache_resource
+def get_known_users():
+    """The process-wide known-users cache shared by every session"""
+    return KnownUsers()
+
+
+def ensure_user(db, user_id, profile, known_users=None):
+    """Make sure ``users/{user_id}`` exists and its last_login is roughly current.
+
+    A new user is created once with ``created_at``; later logins only
+    update the profile and ``last_login``, and not at all if this process
+    did so within the touch interval. Returns the number of writes made.
+    """
+    from firebase_admin import firestore
+    from google.api_core.exceptions import AlreadyExists
+
+    known_users = known_users or get_known_users()
+    now = time.monotonic()
+    if not known_users.needs_touch(user_id, now):
+        return 0
+
+    user_ref = db.collection('users').document(user_id)
+    touch = {**profile, 'last_login': firestore.SERVER_TIMESTAMP}
+    if not known_users.is_known(user_id):
+        try:
+            # Fails without writing if the document is already there
+            user_ref.create({**touch, 'created_at': firestore.SERVER_TIMESTAMP})
+            known_users.record(user_id, now)
+            return 1
+        except AlreadyExists:
+            pass
+    user_ref.update(touch)
+    known_users.record(user_id, now)
+    return 1